@@ -0,0 +1,113 @@
+"""Cross-genre preference correlations computed with NumPy.
+
+Replaces the CROSS_GENRE_PREFERENCES self-join: per-user genre totals are
+loaded once into a dense user x genre matrix (with a mask for cells below
+the per-genre rating threshold) and every genre pair's Pearson correlation
+and shared-user count come out of a handful of matrix products.
+"""
+import numpy as np
+from app.analytics.stats import masked_pearson
+from app.queries.genres import GET_DATASET_VERSION
+from app.queries.movies import LIST_GENRES
+from app.queries.ratings import USER_GENRE_RATING_TOTALS
+from app.utils.cache import VersionedCache
+
+MIN_GENRE_RATINGS = 5  # per user, per genre (HAVING COUNT(*) >= 5)
+MIN_SHARED_USERS = 20  # per genre pair (HAVING COUNT(*) >= 20)
+FETCH_SIZE = 100_000
+
+_cache = VersionedCache()
+
+
+def load_user_genre_totals(conn, genre_ids):
+    """Return (sums, counts) as (users x genres) arrays.
+
+    genre_ids must be sorted; columns follow its order.
+    """
+    user_chunks, genre_chunks, sum_chunks, count_chunks = [], [], [], []
+    with conn.cursor(name="user_genre_totals") as cur:
+        cur.itersize = FETCH_SIZE
+        cur.execute(USER_GENRE_RATING_TOTALS)
+        while True:
+            rows = cur.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            user_ids, row_genres, sums, counts = zip(*rows)
+            user_chunks.append(np.array(user_ids, dtype=np.int64))
+            genre_chunks.append(np.array(row_genres, dtype=np.int64))
+            sum_chunks.append(np.array(sums, dtype=np.float64))
+            count_chunks.append(np.array(counts, dtype=np.int64))
+
+    n_genres = len(genre_ids)
+    if not user_chunks:
+        return np.zeros((0, n_genres)), np.zeros((0, n_genres), dtype=np.int64)
+
+    users = np.concatenate(user_chunks)
+    _, user_idx = np.unique(users, return_inverse=True)
+    genre_idx = np.searchsorted(genre_ids, np.concatenate(genre_chunks))
+    n_users = int(user_idx.max()) + 1
+
+    sums = np.zeros((n_users, n_genres), dtype=np.float64)
+    counts = np.zeros((n_users, n_genres), dtype=np.int64)
+    sums[user_idx, genre_idx] = np.concatenate(sum_chunks)
+    counts[user_idx, genre_idx] = np.concatenate(count_chunks)
+    return sums, counts
+
+
+def correlate(sums, counts, min_ratings: int = MIN_GENRE_RATINGS):
+    """Pairwise Pearson correlation of per-user genre averages.
+
+    Only users with at least ``min_ratings`` ratings in both genres of a pair
+    contribute to it.  Returns (corr, shared) as (genres x genres) arrays;
+    corr is NaN where it is undefined.
+    """
+    mask = counts >= min_ratings
+    avg = sums / np.maximum(counts, 1)
+    return masked_pearson(avg, mask, avg, mask)
+
+
+def build_report(genre_ids, names: dict, sums, counts) -> list[dict]:
+    corr, shared = correlate(sums, counts)
+    labels = [names[g] for g in genre_ids.tolist()]
+    rows = []
+    for a in range(len(labels)):
+        for b in range(len(labels)):
+            if labels[a] >= labels[b] or shared[a, b] < MIN_SHARED_USERS:
+                continue
+            value = corr[a, b]
+            rows.append({
+                "genre_a": labels[a],
+                "genre_b": labels[b],
+                "correlation": None if np.isnan(value) else round(float(value), 3),
+                "shared_users": int(shared[a, b]),
+            })
+    rows.sort(key=lambda r: (r["correlation"] is None, -(r["correlation"] or 0.0)))
+    return rows
+
+
+def compute_cross_genre_preferences(conn) -> list[dict]:
+    with conn.cursor() as cur:
+        cur.execute(LIST_GENRES)
+        names = dict(cur.fetchall())
+    genre_ids = np.array(sorted(names), dtype=np.int64)
+    sums, counts = load_user_genre_totals(conn, genre_ids)
+    return build_report(genre_ids, names, sums, counts)
+
+
+def cross_genre_preferences(connect) -> list[dict]:
+    """Report rows, recomputed only when the ratings dataset version changes.
+
+    ``connect`` opens a connection context (e.g. ``get_db``).  The version
+    check and the rebuild each take one only for as long as they need it.
+    """
+    with connect() as conn:
+        with conn.cursor() as cur:
+            cur.execute(GET_DATASET_VERSION, ("ratings",))
+            row = cur.fetchone()
+    version = row[0] if row else None
+
+    def rebuild():
+        with connect() as conn:
+            return compute_cross_genre_preferences(conn)
+
+    return _cache.get_or_compute(version, rebuild)
@@ -0,0 +1,221 @@
+"""Biased matrix factorisation for rating prediction.
+
+The model is r(u, i) ~ mu + b_u + b_i + p_u . q_i, trained offline with
+alternating least squares (db/train_model.py) and written to disk as a
+versioned set of NumPy arrays:
+
+    <model_dir>/mf/<version>/factors.npz
+    <model_dir>/mf/<version>/meta.json
+    <model_dir>/mf/CURRENT            -- name of the version to serve
+
+The API loads the CURRENT version once at startup; a prediction is then two
+dict lookups and a k-length dot product.
+"""
+import json
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+
+import numpy as np
+from app.queries.predictions import TRAINING_RATINGS
+
+logger = logging.getLogger(__name__)
+
+MIN_RATING = 0.5
+MAX_RATING = 5.0
+FETCH_SIZE = 100_000
+
+
+class MFModel:
+    def __init__(self, user_ids, item_ids, user_factors, item_factors,
+                 user_bias, item_bias, global_mean: float, meta: dict | None = None):
+        self.user_ids = np.asarray(user_ids, dtype=np.int64)
+        self.item_ids = np.asarray(item_ids, dtype=np.int64)
+        self.user_factors = np.ascontiguousarray(user_factors, dtype=np.float32)
+        self.item_factors = np.ascontiguousarray(item_factors, dtype=np.float32)
+        self.user_bias = np.asarray(user_bias, dtype=np.float32)
+        self.item_bias = np.asarray(item_bias, dtype=np.float32)
+        self.global_mean = float(global_mean)
+        self.meta = meta or {}
+        self._user_index = {u: i for i, u in enumerate(self.user_ids.tolist())}
+        self._item_index = {m: i for i, m in enumerate(self.item_ids.tolist())}
+
+    @property
+    def version(self) -> str | None:
+        return self.meta.get("version")
+
+    def predict(self, user_id: int, movie_id: int) -> float | None:
+        """Predicted rating, or None if the user or movie was not trained on."""
+        u = self._user_index.get(user_id)
+        i = self._item_index.get(movie_id)
+        if u is None or i is None:
+            return None
+        value = (self.global_mean + float(self.user_bias[u]) + float(self.item_bias[i])
+                 + float(self.user_factors[u] @ self.item_factors[i]))
+        return min(MAX_RATING, max(MIN_RATING, value))
+
+    def predict_many(self, user_idx, item_idx):
+        """Vectorised predictions for arrays of internal user/item indices."""
+        values = (self.global_mean + self.user_bias[user_idx] + self.item_bias[item_idx]
+                  + np.einsum("ij,ij->i", self.user_factors[user_idx], self.item_factors[item_idx]))
+        return np.clip(values, MIN_RATING, MAX_RATING)
+
+    # -- persistence ---------------------------------------------------------
+
+    def save(self, model_dir: str, version: str | None = None) -> str:
+        """Write a new version under model_dir/mf and point CURRENT at it."""
+        version = version or datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        root = os.path.join(model_dir, "mf")
+        path = os.path.join(root, version)
+        os.makedirs(path, exist_ok=True)
+        np.savez(
+            os.path.join(path, "factors.npz"),
+            user_ids=self.user_ids,
+            item_ids=self.item_ids,
+            user_factors=self.user_factors,
+            item_factors=self.item_factors,
+            user_bias=self.user_bias,
+            item_bias=self.item_bias,
+            global_mean=np.float64(self.global_mean),
+        )
+        self.meta = {**self.meta, "version": version}
+        with open(os.path.join(path, "meta.json"), "w") as f:
+            json.dump(self.meta, f, indent=2)
+        # Swap the pointer atomically so a starting API never sees a partial name.
+        tmp = os.path.join(root, "CURRENT.tmp")
+        with open(tmp, "w") as f:
+            f.write(version)
+        os.replace(tmp, os.path.join(root, "CURRENT"))
+        return version
+
+    @classmethod
+    def load(cls, model_dir: str, version: str | None = None) -> "MFModel":
+        root = os.path.join(model_dir, "mf")
+        if version is None:
+            with open(os.path.join(root, "CURRENT")) as f:
+                version = f.read().strip()
+        path = os.path.join(root, version)
+        with np.load(os.path.join(path, "factors.npz")) as data:
+            arrays = {name: data[name] for name in data.files}
+        with open(os.path.join(path, "meta.json")) as f:
+            meta = json.load(f)
+        meta["version"] = version
+        return cls(
+            arrays["user_ids"], arrays["item_ids"],
+            arrays["user_factors"], arrays["item_factors"],
+            arrays["user_bias"], arrays["item_bias"],
+            float(arrays["global_mean"]), meta,
+        )
+
+
+def load_ratings(conn):
+    """Stream the ratings table into (user_ids, movie_ids, ratings) arrays."""
+    users, movies, ratings = [], [], []
+    with conn.cursor(name="train_ratings") as cur:
+        cur.itersize = FETCH_SIZE
+        cur.execute(TRAINING_RATINGS)
+        while True:
+            rows = cur.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            u, m, r = zip(*rows)
+            users.append(np.array(u, dtype=np.int64))
+            movies.append(np.array(m, dtype=np.int64))
+            ratings.append(np.array(r, dtype=np.float32))
+    if not users:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return np.concatenate(users), np.concatenate(movies), np.concatenate(ratings)
+
+
+def _solve_side(indptr, other_idx, residual, other_factors, reg):
+    """One ALS half-step: solve every row's [bias, factors] given the other side.
+
+    Rows are described in CSR form (indptr, other_idx, residual) where
+    residual is the rating minus the global mean and the other side's bias.
+    Regularisation is weighted by each row's rating count.
+    """
+    n_rows = len(indptr) - 1
+    k = other_factors.shape[1]
+    augmented = np.hstack([np.ones((other_factors.shape[0], 1)), other_factors])
+    penalty = np.eye(k + 1)
+    solution = np.zeros((n_rows, k + 1))
+    for row in range(n_rows):
+        start, end = indptr[row], indptr[row + 1]
+        if start == end:
+            continue
+        y = augmented[other_idx[start:end]]
+        a = y.T @ y + reg * (end - start) * penalty
+        solution[row] = np.linalg.solve(a, y.T @ residual[start:end])
+    return solution[:, 0], solution[:, 1:]
+
+
+def _csr(row_idx, col_idx, values, n_rows):
+    order = np.argsort(row_idx, kind="stable")
+    indptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(row_idx, minlength=n_rows), out=indptr[1:])
+    return indptr, col_idx[order], values[order]
+
+
+def train_als(user_ids, movie_ids, ratings, factors: int = 32, reg: float = 0.1,
+              iterations: int = 12, seed: int = 42, log=None) -> MFModel:
+    """Fit a biased MF model to (user_id, movie_id, rating) arrays."""
+    ratings = np.asarray(ratings, dtype=np.float64)
+    users, user_idx = np.unique(np.asarray(user_ids, dtype=np.int64), return_inverse=True)
+    items, item_idx = np.unique(np.asarray(movie_ids, dtype=np.int64), return_inverse=True)
+    n_users, n_items = len(users), len(items)
+    mu = float(ratings.mean()) if len(ratings) else 0.0
+
+    rng = np.random.default_rng(seed)
+    p = rng.normal(0, 0.1, (n_users, factors))
+    q = rng.normal(0, 0.1, (n_items, factors))
+    bu = np.zeros(n_users)
+    bi = np.zeros(n_items)
+
+    by_user = _csr(user_idx, item_idx, ratings, n_users)
+    by_item = _csr(item_idx, user_idx, ratings, n_items)
+
+    for iteration in range(iterations):
+        indptr, cols, values = by_user
+        bu, p = _solve_side(indptr, cols, values - mu - bi[cols], q, reg)
+        indptr, cols, values = by_item
+        bi, q = _solve_side(indptr, cols, values - mu - bu[cols], p, reg)
+        if log:
+            predicted = mu + bu[user_idx] + bi[item_idx] + np.einsum("ij,ij->i", p[user_idx], q[item_idx])
+            rmse = float(np.sqrt(np.mean((predicted - ratings) ** 2)))
+            log(f"  iteration {iteration + 1}/{iterations}: train RMSE {rmse:.4f}")
+
+    meta = {
+        "factors": factors,
+        "reg": reg,
+        "iterations": iterations,
+        "n_users": n_users,
+        "n_items": n_items,
+        "n_ratings": int(len(ratings)),
+    }
+    return MFModel(users, items, p, q, bu, bi, mu, meta)
+
+
+# ---------------------------------------------------------------------------
+# Process-wide model, loaded once at startup
+# ---------------------------------------------------------------------------
+
+_model: MFModel | None = None
+_model_lock = threading.Lock()
+
+
+def load_model(model_dir: str) -> MFModel | None:
+    """(Re)load the CURRENT model version; returns None if none is trained yet."""
+    global _model
+    with _model_lock:
+        try:
+            _model = MFModel.load(model_dir)
+            logger.info("Loaded rating model %s", _model.version)
+        except FileNotFoundError:
+            _model = None
+            logger.info("No trained rating model under %s; predictions use genre overlap", model_dir)
+    return _model
+
+
+def get_model() -> MFModel | None:
+    return _model
@@ -0,0 +1,227 @@
+"""Top-K similar films, computed in vectorised blocks.
+
+A neighbour's score combines three similarities to the target movie:
+
+    genre   -- Jaccard index of the two genre sets
+    rating  -- 1 / (1 + |avg_a - avg_b|), as in SIMILAR_FILMS (0 if unrated)
+    tags    -- cosine of the binary movie x tag vectors (tag co-occurrence)
+
+Feature matrices are built once; each worker scores a block of target movies
+against the whole catalogue with a few matrix products and keeps the top K
+with argpartition.  db/compute_neighbours.py drives this and stores the
+result in movie_neighbours.
+
+Tag vectors are kept sparse (BinaryRows): on the full catalogue a dense
+movies x 2048 float32 matrix is ~700 MB, copied into every worker, while the
+nonzeros are a few MB.  Blocks are small because each one allocates several
+(block x movies) float32 temporaries.
+"""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from app.queries.predictions import (
+    NEIGHBOUR_MOVIE_FEATURES,
+    NEIGHBOUR_MOVIE_GENRES,
+    NEIGHBOUR_MOVIE_TAGS,
+)
+
+TOP_K = 50
+GENRE_WEIGHT = 0.5
+TAG_WEIGHT = 0.3
+RATING_WEIGHT = 0.2
+MAX_TAGS = 2048  # tag vocabulary: the most widely used tags
+BLOCK_SIZE = 64  # ~22 MB per (block x movies) float32 temporary at 87k movies
+MAX_WORKERS = 4  # default cap; each worker holds its own copy of the features
+
+
+class BinaryRows:
+    """0/1 matrix stored as the sorted column indices of each row's ones.
+
+    CSR without the data array.  ``shared_counts`` gives the dot products of
+    some rows with every row, i.e. ``m[rows] @ m.T`` without densifying.
+    """
+
+    def __init__(self, indptr, indices, n_columns: int):
+        self.indptr = indptr
+        self.indices = indices
+        self.shape = (len(indptr) - 1, n_columns)
+        self._by_column: BinaryRows | None = None
+
+    @classmethod
+    def from_pairs(cls, n_rows: int, rows, columns, n_columns: int) -> "BinaryRows":
+        pairs = np.unique(np.asarray(rows, dtype=np.int64) * n_columns + np.asarray(columns, dtype=np.int64))
+        rows, columns = np.divmod(pairs, n_columns)
+        indptr = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=n_rows), out=indptr[1:])
+        return cls(indptr, columns.astype(np.int32), n_columns)
+
+    def row_sums(self):
+        return np.diff(self.indptr).astype(np.float32)
+
+    def transpose(self) -> "BinaryRows":
+        counts = np.diff(self.indptr)
+        rows = np.repeat(np.arange(self.shape[0], dtype=np.int64), counts)
+        return BinaryRows.from_pairs(self.shape[1], self.indices, rows, self.shape[0])
+
+    def _gather(self, which):
+        """(position in which, column) for every one in rows ``which``."""
+        starts = self.indptr[which]
+        lengths = self.indptr[which + 1] - starts
+        offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+        owner = np.repeat(np.arange(len(which)), lengths)
+        return owner, self.indices[offsets + np.arange(lengths.sum())]
+
+    def shared_counts(self, rows):
+        """float32 (len(rows) x n_rows): ones each of ``rows`` shares with every row."""
+        if self._by_column is None:
+            self._by_column = self.transpose()
+        owner, columns = self._gather(rows)
+        column_pos, others = self._by_column._gather(columns)
+        n = self.shape[0]
+        counts = np.bincount(owner[column_pos] * n + others, minlength=len(rows) * n)
+        return counts.reshape(len(rows), n).astype(np.float32)
+
+
+class MovieFeatures:
+    """Dense per-movie feature arrays, rows ordered by movie_id."""
+
+    def __init__(self, movie_ids, rating_counts, rating_sums, avg_ratings, genres, tags):
+        self.movie_ids = movie_ids
+        self.rating_counts = rating_counts
+        self.rating_sums = rating_sums
+        self.avg_ratings = avg_ratings  # float32, NaN if unrated
+        self.genres = genres  # float32 (movies x genres), 0/1
+        self.tags = tags  # BinaryRows (movies x tags)
+
+    def index_of(self, movie_ids):
+        return np.searchsorted(self.movie_ids, np.asarray(movie_ids, dtype=np.int64))
+
+
+def _key_columns(row_keys, max_columns=None):
+    """Column of each key (-1 if dropped) and the column count, keeping the
+    ``max_columns`` most frequent keys."""
+    keys, key_idx, key_counts = np.unique(row_keys, return_inverse=True, return_counts=True)
+    if max_columns is not None and len(keys) > max_columns:
+        keep = np.argsort(-key_counts, kind="stable")[:max_columns]
+        remap = np.full(len(keys), -1)
+        remap[keep] = np.arange(len(keep))
+        key_idx = remap[key_idx]
+        n_columns = len(keep)
+    else:
+        n_columns = len(keys)
+    return key_idx, n_columns
+
+
+def _one_hot(movie_ids, row_movies, row_keys):
+    """Dense binary (movies x keys) float32 matrix from (movie, key) pairs."""
+    key_idx, n_columns = _key_columns(row_keys)
+    matrix = np.zeros((len(movie_ids), n_columns), dtype=np.float32)
+    matrix[np.searchsorted(movie_ids, row_movies), key_idx] = 1.0
+    return matrix
+
+
+def _sparse_one_hot(movie_ids, row_movies, row_keys, max_columns=None) -> BinaryRows:
+    """BinaryRows (movies x keys) from (movie, key) pairs, keeping the
+    ``max_columns`` most frequent keys."""
+    if not len(row_keys):
+        return BinaryRows(np.zeros(len(movie_ids) + 1, dtype=np.int64), np.zeros(0, dtype=np.int32), 0)
+    key_idx, n_columns = _key_columns(row_keys, max_columns)
+    present = key_idx >= 0
+    rows = np.searchsorted(movie_ids, row_movies[present])
+    return BinaryRows.from_pairs(len(movie_ids), rows, key_idx[present], n_columns)
+
+
+def load_features(conn, max_tags: int = MAX_TAGS) -> MovieFeatures:
+    with conn.cursor() as cur:
+        cur.execute(NEIGHBOUR_MOVIE_FEATURES)
+        rows = cur.fetchall()
+        movie_ids = np.array([r[0] for r in rows], dtype=np.int64)
+        rating_counts = [r[1] for r in rows]
+        rating_sums = [r[2] for r in rows]  # Decimal, stored back verbatim
+        avg_ratings = np.array([np.nan if r[3] is None else r[3] for r in rows], dtype=np.float32)
+
+        cur.execute(NEIGHBOUR_MOVIE_GENRES)
+        pairs = cur.fetchall()
+        genre_movies = np.array([p[0] for p in pairs], dtype=np.int64)
+        genre_ids = np.array([p[1] for p in pairs], dtype=np.int64)
+
+        cur.execute(NEIGHBOUR_MOVIE_TAGS)
+        pairs = cur.fetchall()
+        tag_movies = np.array([p[0] for p in pairs], dtype=np.int64)
+        tag_names = np.array([p[1] for p in pairs], dtype=object)
+
+    genres = _one_hot(movie_ids, genre_movies, genre_ids)
+    tags = _sparse_one_hot(movie_ids, tag_movies, tag_names.astype(str), max_tags)
+    return MovieFeatures(movie_ids, rating_counts, rating_sums, avg_ratings, genres, tags)
+
+
+# ---------------------------------------------------------------------------
+# Block scoring (runs in worker processes)
+# ---------------------------------------------------------------------------
+
+_features: MovieFeatures | None = None
+
+
+def _init_worker(features: MovieFeatures):
+    global _features
+    _features = features
+
+
+def score_block(features: MovieFeatures, rows, top_k: int = TOP_K):
+    """Top-k neighbours for the movies at ``rows``.
+
+    Returns (neighbour_rows, score, genre_sim, rating_sim, tag_sim), each a
+    (len(rows) x k) array ordered best first.  Candidates sharing neither a
+    genre nor a tag are never returned; short lists are padded with -1.
+    """
+    rows = np.asarray(rows)
+    g, t, avg = features.genres, features.tags, features.avg_ratings
+
+    genre_counts = g.sum(axis=1)
+    inter = g[rows] @ g.T
+    union = genre_counts[rows, None] + genre_counts[None, :] - inter
+    genre_sim = np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+    tag_sim = t.shared_counts(rows)
+    norms = np.sqrt(t.row_sums())
+    denom = norms[rows, None] * norms[None, :]
+    tag_sim = np.divide(tag_sim, denom, out=np.zeros_like(tag_sim), where=denom > 0)
+
+    rating_sim = 1.0 / (1.0 + np.abs(avg[rows, None] - avg[None, :]))
+    rating_sim = np.nan_to_num(rating_sim, nan=0.0)
+
+    score = GENRE_WEIGHT * genre_sim + TAG_WEIGHT * tag_sim + RATING_WEIGHT * rating_sim
+    score[(genre_sim == 0) & (tag_sim == 0)] = -np.inf
+    score[np.arange(len(rows)), rows] = -np.inf  # never your own neighbour
+
+    k = min(top_k, score.shape[1] - 1)
+    top = np.argpartition(-score, k - 1, axis=1)[:, :k] if k > 0 else np.zeros((len(rows), 0), dtype=np.int64)
+    top_scores = np.take_along_axis(score, top, axis=1)
+    order = np.argsort(-top_scores, axis=1, kind="stable")
+    top = np.take_along_axis(top, order, axis=1)
+    top_scores = np.take_along_axis(top_scores, order, axis=1)
+    top[~np.isfinite(top_scores)] = -1
+
+    def pick(values):
+        return np.take_along_axis(values, np.maximum(top, 0), axis=1)
+
+    return top, top_scores, pick(genre_sim), pick(rating_sim), pick(tag_sim)
+
+
+def _score_block_worker(args):
+    rows, top_k = args
+    return rows, score_block(_features, rows, top_k)
+
+
+def compute_neighbours(features: MovieFeatures, rows, top_k: int = TOP_K,
+                       workers: int = 1, block_size: int = BLOCK_SIZE):
+    """Yield (rows, score_block result) for ``rows`` in blocks, in parallel."""
+    rows = np.asarray(rows)
+    blocks = [(rows[i:i + block_size], top_k) for i in range(0, len(rows), block_size)]
+    if workers <= 1:
+        for block, k in blocks:
+            yield block, score_block(features, block, k)
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(features,)) as pool:
+        yield from pool.map(_score_block_worker, blocks)
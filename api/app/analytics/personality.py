@@ -0,0 +1,197 @@
+"""Big Five personality reports computed with NumPy.
+
+Replaces PERSONALITY_GENRE_CORRELATION and PERSONALITY_CLUSTERS: profiles
+are loaded once into a dense float32 users x traits matrix, personality
+ratings into user x genre sum/count matrices, and every trait-genre
+correlation comes out of a single masked matrix product.  Cluster aggregates
+are grouped reductions (np.bincount) over the same arrays.
+"""
+import numpy as np
+from app.analytics.stats import masked_pearson
+from app.queries.genres import GET_DATASET_VERSION
+from app.queries.movies import LIST_GENRES
+from app.queries.personality import (
+    PERSONALITY_PROFILE_MATRIX,
+    PERSONALITY_USER_GENRE_TOTALS,
+    PERSONALITY_USER_RATING_TOTALS,
+)
+from app.utils.cache import VersionedCache
+
+TRAITS = ("openness", "agreeableness", "emotional_stability", "conscientiousness", "extraversion")
+MIN_GENRE_RATINGS = 5  # per user, per genre (HAVING COUNT(*) >= 5)
+MIN_SAMPLE_SIZE = 20  # users per genre (HAVING COUNT(*) >= 20)
+
+_correlation_cache = VersionedCache()
+_cluster_cache = VersionedCache()
+
+
+def load_profiles(conn):
+    """Return (user_ids, traits, metrics, conditions).
+
+    traits is a float32 (users x 5) array with NaN for missing scores;
+    user_ids is sorted.
+    """
+    with conn.cursor() as cur:
+        cur.execute(PERSONALITY_PROFILE_MATRIX)
+        rows = cur.fetchall()
+    if not rows:
+        return np.zeros(0, dtype=np.int64), np.zeros((0, len(TRAITS)), dtype=np.float32), [], []
+    user_ids = np.array([r[0] for r in rows], dtype=np.int64)
+    traits = np.array([r[1:6] for r in rows], dtype=np.float64)  # None -> NaN
+    metrics = [r[6] for r in rows]
+    conditions = [r[7] for r in rows]
+    return user_ids, traits.astype(np.float32), metrics, conditions
+
+
+def load_user_genre_totals(conn, user_ids, genre_ids):
+    """Return (sums, counts) as (users x genres) arrays aligned with user_ids."""
+    sums = np.zeros((len(user_ids), len(genre_ids)), dtype=np.float64)
+    counts = np.zeros((len(user_ids), len(genre_ids)), dtype=np.int64)
+    with conn.cursor() as cur:
+        cur.execute(PERSONALITY_USER_GENRE_TOTALS)
+        rows = cur.fetchall()
+    if rows:
+        users, genres, row_sums, row_counts = (np.array(col) for col in zip(*rows))
+        user_idx = np.searchsorted(user_ids, users.astype(np.int64))
+        genre_idx = np.searchsorted(genre_ids, genres.astype(np.int64))
+        sums[user_idx, genre_idx] = row_sums.astype(np.float64)
+        counts[user_idx, genre_idx] = row_counts.astype(np.int64)
+    return sums, counts
+
+
+def load_user_rating_totals(conn, user_ids):
+    """Return (sums, sums_sq, counts) per user, aligned with user_ids."""
+    totals = np.zeros((3, len(user_ids)), dtype=np.float64)
+    with conn.cursor() as cur:
+        cur.execute(PERSONALITY_USER_RATING_TOTALS)
+        rows = cur.fetchall()
+    if rows:
+        data = np.array(rows, dtype=np.float64)
+        user_idx = np.searchsorted(user_ids, data[:, 0].astype(np.int64))
+        totals[:, user_idx] = data[:, 1:].T
+    return totals[0], totals[1], totals[2].astype(np.int64)
+
+
+def _round(value, digits):
+    return None if value is None or np.isnan(value) else round(float(value), digits)
+
+
+def build_correlation_report(genre_ids, names: dict, traits, sums, counts) -> list[dict]:
+    genre_mask = counts >= MIN_GENRE_RATINGS
+    avg = sums / np.maximum(counts, 1)
+    corr, _ = masked_pearson(traits, ~np.isnan(traits), avg, genre_mask)  # traits x genres
+    sample_size = genre_mask.sum(axis=0)
+
+    rows = []
+    for g, genre_id in enumerate(genre_ids.tolist()):
+        if sample_size[g] < MIN_SAMPLE_SIZE:
+            continue
+        row = {"genre": names[genre_id]}
+        for t, trait in enumerate(TRAITS):
+            row[f"{trait}_corr"] = _round(corr[t, g], 3)
+        row["sample_size"] = int(sample_size[g])
+        rows.append(row)
+    rows.sort(key=lambda r: r["genre"])
+    return rows
+
+
+def build_cluster_report(traits, metrics, conditions, rating_sums, rating_sums_sq, rating_counts) -> list[dict]:
+    keys = sorted(
+        set(zip(metrics, conditions)),
+        key=lambda k: (k[0] is None, k[0] or "", k[1] is None, k[1] or ""),
+    )
+    if not keys:
+        return []
+    group_of = {key: i for i, key in enumerate(keys)}
+    group = np.array([group_of[k] for k in zip(metrics, conditions)], dtype=np.int64)
+    n_groups = len(keys)
+
+    def grouped(weights):
+        return np.bincount(group, weights=weights, minlength=n_groups)
+
+    users = np.bincount(group, minlength=n_groups)
+    n = grouped(rating_counts.astype(np.float64))
+    total = grouped(rating_sums)
+    total_sq = grouped(rating_sums_sq)
+
+    # The LEFT JOIN in PERSONALITY_CLUSTERS repeats each profile once per
+    # rating (once if unrated), so trait averages are weighted the same way.
+    row_weight = np.maximum(rating_counts, 1).astype(np.float64)
+    present = ~np.isnan(traits)
+    trait_values = np.where(present, traits, 0.0).astype(np.float64)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        avg_rating = total / n
+        var = (total_sq - total * total / n) / (n - 1)
+        stddev = np.sqrt(np.maximum(var, 0.0))
+        avg_traits = [
+            grouped(trait_values[:, t] * row_weight) / grouped(present[:, t] * row_weight)
+            for t in range(len(TRAITS))
+        ]
+
+    rows = []
+    for i, (metric, condition) in enumerate(keys):
+        row = {
+            "assigned_metric": metric,
+            "assigned_condition": condition,
+            "user_count": int(users[i]),
+            "avg_rating": _round(avg_rating[i], 2),
+            "stddev_rating": _round(stddev[i], 2) if n[i] > 1 else None,
+            "total_ratings": int(n[i]),
+        }
+        for t, trait in enumerate(TRAITS):
+            row[f"avg_{trait}"] = _round(avg_traits[t][i], 3)
+        rows.append(row)
+    return rows
+
+
+def compute_personality_genre_correlation(conn) -> list[dict]:
+    with conn.cursor() as cur:
+        cur.execute(LIST_GENRES)
+        names = dict(cur.fetchall())
+    genre_ids = np.array(sorted(names), dtype=np.int64)
+    user_ids, traits, _, _ = load_profiles(conn)
+    sums, counts = load_user_genre_totals(conn, user_ids, genre_ids)
+    return build_correlation_report(genre_ids, names, traits, sums, counts)
+
+
+def compute_personality_clusters(conn) -> list[dict]:
+    user_ids, traits, metrics, conditions = load_profiles(conn)
+    sums, sums_sq, counts = load_user_rating_totals(conn, user_ids)
+    return build_cluster_report(traits, metrics, conditions, sums, sums_sq, counts)
+
+
+def _dataset_versions(conn, *datasets):
+    with conn.cursor() as cur:
+        versions = []
+        for dataset in datasets:
+            cur.execute(GET_DATASET_VERSION, (dataset,))
+            row = cur.fetchone()
+            versions.append(row[0] if row else None)
+    return tuple(versions)
+
+
+def _cached(cache, connect, datasets, compute):
+    """Serve cache, rebuilding with compute on a connection of its own."""
+    with connect() as conn:
+        version = _dataset_versions(conn, *datasets)
+
+    def rebuild():
+        with connect() as conn:
+            return compute(conn)
+
+    return cache.get_or_compute(version, rebuild)
+
+
+def personality_genre_correlation(connect) -> list[dict]:
+    """Report rows, recomputed when personality data or genre links change.
+
+    ``connect`` opens a connection context (e.g. ``get_db``).
+    """
+    # movie_genres writes bump the 'ratings' version.
+    return _cached(_correlation_cache, connect, ("personality", "ratings"), compute_personality_genre_correlation)
+
+
+def personality_clusters(connect) -> list[dict]:
+    """Report rows, recomputed only when the personality dataset version changes."""
+    return _cached(_cluster_cache, connect, ("personality",), compute_personality_clusters)
@@ -0,0 +1,34 @@
+"""Masked Pearson correlation shared by the analytics engines."""
+import numpy as np
+
+
+def masked_pearson(x, x_mask, y, y_mask):
+    """Pearson correlation between every column of x and every column of y.
+
+    x is (n x a), y is (n x b); the masks are boolean arrays of the same
+    shapes marking which cells hold a value.  For each column pair only rows
+    present in both columns contribute, as with SQL CORR over an inner join.
+    Returns (corr, n) as (a x b) arrays; corr is NaN where undefined.
+    """
+    mx = x_mask.astype(np.float64)
+    my = y_mask.astype(np.float64)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        # Centre each column on its own mean; Pearson is shift-invariant and
+        # this keeps the sums of squares well conditioned.
+        x = np.where(x_mask, x, 0.0).astype(np.float64)
+        y = np.where(y_mask, y, 0.0).astype(np.float64)
+        x = (x - x.sum(axis=0) / np.maximum(mx.sum(axis=0), 1)) * mx
+        y = (y - y.sum(axis=0) / np.maximum(my.sum(axis=0), 1)) * my
+
+        n = mx.T @ my
+        sx = x.T @ my  # sx[a, b] = sum of x_a over rows present in a and b
+        sy = mx.T @ y
+        sxx = (x * x).T @ my
+        syy = mx.T @ (y * y)
+        sxy = x.T @ y
+
+        cov = n * sxy - sx * sy
+        var = (n * sxx - sx * sx) * (n * syy - sy * sy)
+        corr = cov / np.sqrt(var)
+    corr[~np.isfinite(corr)] = np.nan
+    return corr, n.astype(np.int64)
@@ -3,11 +3,36 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     database_url: str = "postgresql://moviesdb:moviesdb@db:5432/moviesdb"
+    db_pool_min_size: int = 2
+    db_pool_max_size: int = 10
+    db_pool_timeout: float = 5.0  # seconds a request may wait for a connection
+    db_pool_max_lifetime: float = 1800.0  # recycle connections after 30 minutes
+    db_pool_health_check_after: float = 30.0  # ping connections idle this long
+    db_async_pool_min_size: int = 1  # psycopg 3 pool behind the async auth routes
+    db_async_pool_max_size: int = 4
+    db_prepare_statements: bool = True  # run app.queries.prepared() statements via PREPARE / EXECUTE
+    database_replica_urls: str = ""  # comma-separated read replicas for get_db(readonly=True)
+    replica_max_lag_seconds: float = 5.0  # replicas further behind than this are skipped
+    replica_check_interval: float = 5.0  # seconds between replica health / lag checks
+    replica_checkout_timeout: float = 0.5  # wait this long for a replica connection, then use the primary
     jwt_secret: str  # Required — no default; must be set via env var
     jwt_algorithm: str = "HS256"
     jwt_expire_minutes: int = 1440  # 24 hours
+    bcrypt_workers: int = 2  # processes hashing passwords
+    bcrypt_max_queue: int = 16  # hashes allowed to wait before logins get 503
+    user_cache_seconds: float = 60.0  # token -> user lookups served from memory
+    user_cache_size: int = 4096
     tmdb_api_key: str = ""
     omdb_api_key: str = ""
+    movie_total_cache_seconds: int = 300
+    slow_query_ms: float = 200.0  # log statements slower than this, and sample their plans
+    slow_query_log_size: int = 50  # slowest statements kept for /api/admin/slow-queries
+    slow_query_window_seconds: float = 3600.0  # ...over this trailing window
+    slow_query_explain_sample: float = 0.1  # fraction of slow statements re-run under EXPLAIN ANALYZE
+    slow_query_explain_interval: float = 60.0  # at most one plan per query name this often
+    admin_token: str = ""  # X-Admin-Token for /api/admin; admin routes are off when empty
+    stream_chunk_rows: int = 5000  # rows per fetch for NDJSON / CSV report streams
+    model_dir: str = "models"  # trained prediction models (db/train_model.py)
     allowed_origins: str = "http://localhost:5173,http://localhost:3000"
 
     model_config = {"env_file": ".env", "extra": "ignore"}
@@ -1,43 +1,434 @@
+import asyncio
 import logging
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+
+import psycopg
 import psycopg2
-from psycopg2 import pool
-from contextlib import contextmanager
+from psycopg2 import extensions
+from psycopg2.pool import PoolError
+from psycopg_pool import AsyncConnectionPool
+from psycopg_pool import PoolTimeout as AsyncPoolTimeout
+from app import metrics
 from app.config import settings
+from app.db_prepared import prepared_statements
+from app.db_replicas import REPLICA_CONNECT_TIMEOUT, Replica, ReplicaRouter
+from app.db_slowlog import slow_queries
+from app.queries import is_prepared, query_name
 
 logger = logging.getLogger(__name__)
 
-_pool: pool.SimpleConnectionPool | None = None
 
+class PoolTimeout(Exception):
+    """No connection became available within the configured wait."""
+
+
+class _TimedCursorMixin:
+    """Records each execute() in the per-query duration histogram and the
+    slow-query log, and runs prepared() queries as prepared statements."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        succeeded = False
+        try:
+            # Named (server-side) cursors cannot DECLARE ... FOR EXECUTE
+            if prepared_statements.enabled and self.name is None and is_prepared(query):
+                result = prepared_statements.execute(self, super().execute, query, vars)
+            else:
+                result = super().execute(query, vars)
+            succeeded = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            name = query_name(query)
+            metrics.db_query_duration.observe(elapsed, name)
+            slow_queries.observe(self, query, vars, name, elapsed, succeeded)
+
+
+_timed_cursor_classes: dict[type, type] = {}
+
+
+def _timed(cursor_class: type) -> type:
+    timed = _timed_cursor_classes.get(cursor_class)
+    if timed is None:
+        timed = type(f"Timed{cursor_class.__name__}", (_TimedCursorMixin, cursor_class), {})
+        _timed_cursor_classes[cursor_class] = timed
+    return timed
+
+
+class InstrumentedConnection(extensions.connection):
+    """psycopg2 connection whose cursors, of any cursor_factory, are timed.
+
+    Also remembers which prepared statements exist in its session, and the
+    DSN it was opened with, for the slow-query log's EXPLAIN connection.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.source_dsn: str | None = None  # the pool's DSN, with credentials
+        self.prepared: set[str] = set()
+        self.plan_counts: dict[str, tuple[int, int]] = {}
+        self.plans_read_at = time.monotonic()
+
+    def cursor(self, *args, **kwargs):
+        factory = kwargs.get("cursor_factory") or self.cursor_factory or extensions.cursor
+        kwargs["cursor_factory"] = _timed(factory)
+        return super().cursor(*args, **kwargs)
+
+
+class ConnectionPool:
+    """Thread-safe psycopg2 pool with bounded waits.
+
+    Unlike psycopg2's SimpleConnectionPool, callers that find every
+    connection checked out queue on a condition variable for up to
+    ``timeout`` seconds before PoolTimeout is raised.  Connections older
+    than ``max_lifetime`` are recycled on return, and connections that sat
+    idle longer than ``health_check_after`` are pinged before reuse.
+    ``readonly`` pools open their connections in read-only sessions.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        minconn: int,
+        maxconn: int,
+        timeout: float,
+        max_lifetime: float,
+        health_check_after: float,
+        readonly: bool = False,
+        connect_timeout: int | None = None,
+    ):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.readonly = readonly
+        self.connect_timeout = connect_timeout
+        self.closed = False
+
+        self._cond = threading.Condition()
+        self._idle: deque = deque()  # (conn, returned_at), most recent last
+        self._born: dict[int, float] = {}
+        self._size = 0
+        self._waiting = 0
+        self._checkouts = 0
+        self._timeouts = 0
+        self._wait_seconds = 0.0
+
+        for _ in range(minconn):
+            self._size += 1
+            self._idle.append((self._connect(), time.monotonic()))
+
+    def _connect(self):
+        kwargs = {} if self.connect_timeout is None else {"connect_timeout": self.connect_timeout}
+        conn = psycopg2.connect(self.dsn, connection_factory=InstrumentedConnection, **kwargs)
+        conn.source_dsn = self.dsn
+        if self.readonly:
+            conn.set_session(readonly=True)
+        self._born[id(conn)] = time.monotonic()
+        return conn
+
+    def _discard(self, conn):
+        self._born.pop(id(conn), None)
+        prepared_statements.collect(conn, force=True)
+        try:
+            conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _is_healthy(self, conn, returned_at: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.health_check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self, timeout: float | None = None):
+        """Check out a connection, waiting up to ``timeout`` seconds."""
+        started = time.monotonic()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        while True:
+            with self._cond:
+                while True:
+                    if self.closed:
+                        raise PoolError("connection pool is closed")
+                    if self._idle:
+                        conn, returned_at = self._idle.pop()
+                        break
+                    if self._size < self.maxconn:
+                        self._size += 1
+                        conn = None
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._timeouts += 1
+                        raise PoolTimeout(
+                            f"no database connection available after {time.monotonic() - started:.1f}s"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+            if conn is None:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._is_healthy(conn, returned_at):
+                logger.warning("Discarding unhealthy pooled connection")
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._checkouts += 1
+                self._wait_seconds += waited
+            metrics.db_pool_wait.observe(waited)
+            return conn
+
+    def putconn(self, conn, close: bool = False):
+        """Return a connection; broken, expired or dirty ones are closed."""
+        prepared_statements.collect(conn)
+        if not close and not conn.closed:
+            status = conn.get_transaction_status()
+            if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                close = True
+            elif status != extensions.TRANSACTION_STATUS_IDLE:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    close = True
+        expired = time.monotonic() - self._born.get(id(conn), 0.0) > self.max_lifetime
+        if close or expired or conn.closed or self.closed:
+            self._discard(conn)
+            return
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def closeall(self):
+        with self._cond:
+            self.closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify_all()
+        for conn in idle:
+            self._discard(conn)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "waiting": self._waiting,
+                "max_size": self.maxconn,
+                "checkouts": self._checkouts,
+                "timeouts": self._timeouts,
+                "wait_seconds_total": self._wait_seconds,
+            }
+
+
+_pool: ConnectionPool | None = None
+_replicas: ReplicaRouter | None = None
+_pool_lock = threading.Lock()
 
-def get_pool() -> pool.SimpleConnectionPool:
-    global _pool
-    if _pool is None or _pool.closed:
-        _pool = pool.SimpleConnectionPool(
-            minconn=2,
-            maxconn=10,
-            dsn=settings.database_url,
-        )
+
+def get_pool() -> ConnectionPool:
+    global _pool, _replicas
+    with _pool_lock:
+        if _pool is None or _pool.closed:
+            _pool = ConnectionPool(
+                dsn=settings.database_url,
+                minconn=settings.db_pool_min_size,
+                maxconn=settings.db_pool_max_size,
+                timeout=settings.db_pool_timeout,
+                max_lifetime=settings.db_pool_max_lifetime,
+                health_check_after=settings.db_pool_health_check_after,
+            )
+            replica_urls = [u.strip() for u in settings.database_replica_urls.split(",") if u.strip()]
+            if replica_urls and _replicas is None:
+                _replicas = ReplicaRouter(
+                    [
+                        ConnectionPool(
+                            url,
+                            minconn=0,
+                            maxconn=settings.db_pool_max_size,
+                            timeout=settings.db_pool_timeout,
+                            max_lifetime=settings.db_pool_max_lifetime,
+                            health_check_after=settings.db_pool_health_check_after,
+                            readonly=True,
+                            connect_timeout=REPLICA_CONNECT_TIMEOUT,
+                        )
+                        for url in replica_urls
+                    ],
+                    max_lag=settings.replica_max_lag_seconds,
+                    check_interval=settings.replica_check_interval,
+                    checkout_timeout=settings.replica_checkout_timeout,
+                )
     return _pool
 
 
+def replica_stats() -> dict | None:
+    """Replica health and routing counts, or None when none are configured."""
+    return _replicas.stats() if _replicas is not None else None
+
+
+metrics.register_pool(lambda: _pool.stats() if _pool is not None else {})
+metrics.register(metrics.CallbackMetric(
+    "db_replicas_routable", "Read replicas currently receiving read-only traffic.", "gauge",
+    lambda: sum(r.healthy for r in _replicas.replicas) if _replicas is not None else None,
+))
+metrics.register(metrics.CallbackMetric(
+    "db_replica_fallbacks_total", "Read-only checkouts sent to the primary because no replica was usable.", "counter",
+    lambda: _replicas.stats()["fallbacks"] if _replicas is not None else None,
+))
+
+
 def close_pool():
-    global _pool
-    if _pool and not _pool.closed:
-        _pool.closeall()
+    global _pool, _replicas
+    with _pool_lock:
+        if _pool and not _pool.closed:
+            _pool.closeall()
         _pool = None
+        if _replicas is not None:
+            _replicas.close()
+        _replicas = None
+    slow_queries.close()
+
+
+def _checkout(readonly: bool) -> tuple[ConnectionPool, Replica | None, object]:
+    primary = get_pool()
+    router = _replicas
+    if readonly and router is not None:
+        replica = router.pick()
+        if replica is not None:
+            try:
+                conn = replica.pool.getconn(router.checkout_timeout)
+            except PoolTimeout:
+                router.fell_back()
+            except psycopg2.OperationalError as e:
+                logger.warning("Replica %s unavailable, reading from the primary", replica.label)
+                router.mark_down(replica, str(e).strip())
+                router.fell_back()
+            else:
+                router.routed(replica)
+                return replica.pool, replica, conn
+    return primary, None, primary.getconn()
 
 
 @contextmanager
-def get_db():
-    """Yield a connection from the pool, auto-commit on success, rollback on error."""
-    p = get_pool()
-    conn = p.getconn()
+def get_db(readonly: bool = False):
+    """Yield a connection from the pool, auto-commit on success, rollback on error.
+
+    With ``readonly=True`` the connection may come from a read replica
+    (DATABASE_REPLICA_URLS) within REPLICA_MAX_LAG_SECONDS of the primary,
+    so use it only for reads that can tolerate that staleness; anything that
+    must see the caller's own writes stays on the primary.
+    """
+    p, replica, conn = _checkout(readonly)
     try:
         yield conn
         conn.commit()
-    except Exception:
-        conn.rollback()
+    except Exception as e:
+        if not conn.closed:
+            conn.rollback()
+        elif replica is not None and isinstance(e, psycopg2.OperationalError):
+            _replicas.mark_down(replica, str(e).strip())
         logger.exception("Database operation failed")
         raise
     finally:
         p.putconn(conn)
+
+
+# ---------------------------------------------------------------------------
+# Async variant (psycopg 3) for ``async def`` routes
+# ---------------------------------------------------------------------------
+
+class TimedAsyncCursor(psycopg.AsyncCursor):
+    """psycopg 3 cursor recording execute() in the same query histogram and
+    slow-query log as the psycopg2 cursors."""
+
+    async def execute(self, query, params=None, **kwargs):
+        started = time.perf_counter()
+        succeeded = False
+        try:
+            result = await super().execute(query, params, **kwargs)
+            succeeded = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - started
+            name = query_name(query)
+            metrics.db_query_duration.observe(elapsed, name)
+            slow_queries.observe(self, query, params, name, elapsed, succeeded)
+
+
+_async_pool: AsyncConnectionPool | None = None
+_async_pool_lock = asyncio.Lock()
+
+
+async def get_async_pool() -> AsyncConnectionPool:
+    global _async_pool
+    async with _async_pool_lock:
+        if _async_pool is None or _async_pool.closed:
+            _async_pool = AsyncConnectionPool(
+                conninfo=settings.database_url,
+                min_size=settings.db_async_pool_min_size,
+                max_size=settings.db_async_pool_max_size,
+                timeout=settings.db_pool_timeout,
+                max_lifetime=settings.db_pool_max_lifetime,
+                kwargs={"cursor_factory": TimedAsyncCursor},
+                check=AsyncConnectionPool.check_connection,
+                open=False,
+            )
+            await _async_pool.open()
+    return _async_pool
+
+
+async def close_async_pool():
+    global _async_pool
+    async with _async_pool_lock:
+        if _async_pool is not None and not _async_pool.closed:
+            await _async_pool.close()
+        _async_pool = None
+
+
+@asynccontextmanager
+async def get_async_db():
+    """Async counterpart of get_db: commit on success, rollback on error.
+
+    Always the primary; the auth routes that use it read their own writes.
+    """
+    p = await get_async_pool()
+    try:
+        conn = await p.getconn()
+    except AsyncPoolTimeout as e:
+        raise PoolTimeout(str(e)) from e
+    try:
+        yield conn
+        await conn.commit()
+    except Exception:
+        if not conn.closed:
+            await conn.rollback()
+        logger.exception("Database operation failed")
+        raise
+    finally:
+        await p.putconn(conn)
@@ -0,0 +1,141 @@
+"""
+Prepared statements for app.db: runs the queries marked with
+app.queries.prepared() via PREPARE / EXECUTE and tracks their plan counts.
+"""
+import logging
+import threading
+import time
+
+import psycopg2
+from psycopg2 import errors, extensions
+from app.config import settings
+from app.queries import positional, query_name
+
+logger = logging.getLogger(__name__)
+
+PLAN_STATS_INTERVAL = 30.0  # seconds between plan-count reads per connection
+
+PREPARED_PLAN_COUNTS = """
+    SELECT name, generic_plans, custom_plans
+      FROM pg_prepared_statements
+     WHERE name = ANY(%s)
+"""
+
+
+class PreparedStatements:
+    """Runs the statements marked with app.queries.prepared() by name.
+
+    The first time a connection executes one, it is sent as ``PREPARE`` (in a
+    savepoint, so a statement Postgres cannot prepare falls back to a plain
+    execute without aborting the caller's transaction); after that only
+    ``EXECUTE name (params)`` goes over the wire and the server skips
+    parsing and, once it settles on a generic plan, planning.  Postgres picks
+    custom or generic plans per statement and connection; the counts are
+    read from pg_prepared_statements as connections are returned (at most
+    every PLAN_STATS_INTERVAL seconds) and closed, and summed in stats().
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._statements: dict[str, tuple[str, str, str] | None] = {}  # sql -> (name, prepare, execute)
+        self._counts: dict[str, dict] = {}
+        self._track_plans = True
+
+    def _statement(self, sql: str) -> tuple[str, str, str] | None:
+        try:
+            return self._statements[sql]
+        except KeyError:
+            pass
+        converted = positional(sql)
+        statement = None
+        if converted is not None:
+            body, nparams = converted
+            name = query_name(sql).lower()
+            args = f" ({', '.join(['%s'] * nparams)})" if nparams else ""
+            statement = (name, f"PREPARE {name} AS {body}", f"EXECUTE {name}{args}")
+        with self._lock:
+            self._statements[sql] = statement
+            if statement is not None:
+                self._counts.setdefault(statement[0], {
+                    "prepares": 0, "executions": 0, "generic_plans": 0, "custom_plans": 0,
+                })
+        return statement
+
+    def _count(self, name: str, key: str, amount: int = 1):
+        with self._lock:
+            self._counts[name][key] += amount
+
+    def execute(self, cursor, execute, query, vars):
+        """Run query on cursor with execute (the unwrapped cursor.execute)."""
+        statement = self._statement(query)
+        if statement is None:
+            return execute(query, vars)
+        name, prepare, run = statement
+        conn = cursor.connection
+        if name not in conn.prepared:
+            if not self._prepare(conn, execute, name, prepare, query):
+                return execute(query, vars)
+            conn.prepared.add(name)
+            self._count(name, "prepares")
+        self._count(name, "executions")
+        return execute(run, vars)
+
+    def _prepare(self, conn, execute, name: str, prepare: str, query: str) -> bool:
+        if conn.autocommit:
+            execute(prepare)
+            return True
+        try:
+            execute(f"SAVEPOINT prepare_{name}; {prepare}; RELEASE SAVEPOINT prepare_{name}")
+            return True
+        except psycopg2.OperationalError:
+            raise
+        except psycopg2.Error as e:
+            execute(f"ROLLBACK TO SAVEPOINT prepare_{name}; RELEASE SAVEPOINT prepare_{name}")
+            logger.warning("Cannot prepare %s, running it unprepared: %s", name, str(e).strip())
+            with self._lock:
+                self._statements[query] = None
+            return False
+
+    def collect(self, conn, force: bool = False):
+        """Add conn's generic / custom plan counts since the last read.
+
+        Called as connections go back to the pool or are closed.
+        """
+        if not self._track_plans or not conn.prepared or conn.closed:
+            return
+        if not force and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+            return
+        now = time.monotonic()
+        if not force and now - conn.plans_read_at < PLAN_STATS_INTERVAL:
+            return
+        conn.plans_read_at = now
+        try:
+            with extensions.cursor(conn) as cur:
+                cur.execute(PREPARED_PLAN_COUNTS, (list(conn.prepared),))
+                rows = cur.fetchall()
+            conn.rollback()
+        except errors.UndefinedColumn:
+            # Plan counters arrived in PostgreSQL 14
+            self._track_plans = False
+            conn.rollback()
+            return
+        except psycopg2.Error:
+            logger.debug("Could not read prepared statement plan counts", exc_info=True)
+            return
+        for name, generic, custom in rows:
+            seen_generic, seen_custom = conn.plan_counts.get(name, (0, 0))
+            conn.plan_counts[name] = (generic, custom)
+            self._count(name, "generic_plans", generic - seen_generic)
+            self._count(name, "custom_plans", custom - seen_custom)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "plan_counts_every_seconds": PLAN_STATS_INTERVAL,
+                "statements": {name: dict(counts) for name, counts in sorted(self._counts.items())},
+            }
+
+
+prepared_statements = PreparedStatements(enabled=settings.db_prepare_statements)
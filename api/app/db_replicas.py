@@ -0,0 +1,187 @@
+"""
+Read replicas for app.db: health / lag checks and routing of read-only
+checkouts across replica connection pools.
+"""
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+# Seconds the replica is behind the primary: zero when it is streaming from
+# the primary and has replayed everything it has received, otherwise the age
+# of the last replayed transaction.  NULL (unknown) until it has replayed
+# anything, and whenever its WAL receiver is not streaming: a disconnected
+# replica replays what it already has and then reports equal LSNs however
+# far behind it falls.  A server that is not in recovery is a primary and
+# never lags.
+REPLICA_LAG = """
+SELECT pg_is_in_recovery(),
+       streaming,
+       CASE
+           WHEN NOT pg_is_in_recovery() THEN 0
+           WHEN NOT streaming THEN NULL
+           WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+           ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+       END
+  FROM (SELECT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') AS streaming) r
+"""
+REPLICA_CONNECT_TIMEOUT = 2  # seconds, for replica pools and health checks
+
+
+def _dsn_label(dsn: str, index: int) -> str:
+    """host:port/dbname for logs and /health/db, without credentials."""
+    try:
+        params = extensions.parse_dsn(dsn)
+    except psycopg2.ProgrammingError:
+        return f"replica{index}"
+    return f"{params.get('host', 'localhost')}:{params.get('port', 5432)}/{params.get('dbname', '')}"
+
+
+class Replica:
+    def __init__(self, label: str, pool):
+        self.label = label
+        self.pool = pool
+        self.healthy = False  # until the first check says otherwise
+        self.in_recovery: bool | None = None
+        self.lag: float | None = None
+        self.error: str | None = None
+        self.checked_at: float | None = None
+        self.routed = 0
+
+
+class ReplicaRouter:
+    """Spreads read-only checkouts over replicas that are up and caught up.
+
+    A daemon thread polls each replica every ``check_interval`` seconds on a
+    connection of its own, so a replica whose pool is exhausted is still
+    checked.  Replicas more than ``max_lag`` seconds behind, or that failed
+    their last check, get no traffic until a later check passes; callers
+    then use the primary.  ``pools`` are app.db ConnectionPools, one per
+    replica.
+    """
+
+    def __init__(self, pools: list, max_lag: float, check_interval: float, checkout_timeout: float):
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.checkout_timeout = checkout_timeout
+        self.replicas = [Replica(_dsn_label(pool.dsn, i), pool) for i, pool in enumerate(pools)]
+        self._lock = threading.Lock()
+        self._fallbacks = 0
+        self._check_conns: dict[int, object] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="replica-check", daemon=True)
+        self._thread.start()
+
+    # -- health ------------------------------------------------------------
+
+    def _run(self):
+        while not self._stop.is_set():
+            for i, replica in enumerate(self.replicas):
+                self._check(i, replica)
+            self._stop.wait(self.check_interval)
+
+    def _check(self, i: int, replica: Replica):
+        try:
+            conn = self._check_conns.get(i)
+            if conn is None or conn.closed:
+                conn = self._check_conns[i] = psycopg2.connect(
+                    replica.pool.dsn, connect_timeout=REPLICA_CONNECT_TIMEOUT
+                )
+                conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute(REPLICA_LAG)
+                in_recovery, streaming, lag = cur.fetchone()
+        except psycopg2.Error as e:
+            conn = self._check_conns.pop(i, None)
+            if conn is not None:
+                conn.close()
+            self._set(replica, healthy=False, error=str(e).strip() or type(e).__name__)
+            return
+        lag = float(lag) if lag is not None else None
+        if lag is not None:
+            error = None
+        elif in_recovery and not streaming:
+            error = "WAL receiver not streaming from the primary"
+        else:
+            error = "replication lag unknown"
+        self._set(
+            replica,
+            healthy=lag is not None and lag <= self.max_lag,
+            error=error,
+            in_recovery=in_recovery,
+            lag=lag,
+        )
+
+    def _set(self, replica: Replica, healthy: bool, error: str | None, **state):
+        with self._lock:
+            if healthy != replica.healthy or replica.checked_at is None:
+                if healthy:
+                    logger.info("Replica %s is routable (lag %.1fs)", replica.label, state["lag"])
+                else:
+                    logger.warning("Replica %s taken out of rotation: %s", replica.label,
+                                   error or f"lag {state['lag']:.1f}s over {self.max_lag:.1f}s")
+            replica.healthy = healthy
+            replica.error = error
+            replica.checked_at = time.time()
+            for key, value in state.items():
+                setattr(replica, key, value)
+
+    def mark_down(self, replica: Replica, error: str):
+        """Stop routing to ``replica`` until its next successful check."""
+        self._set(replica, healthy=False, error=error)
+
+    # -- routing -----------------------------------------------------------
+
+    def pick(self) -> Replica | None:
+        """The healthy replica with the fewest connections checked out."""
+        best, best_load = None, None
+        for replica in self.replicas:
+            if not replica.healthy:
+                continue
+            load = replica.pool.stats()["in_use"]
+            if best is None or load < best_load:
+                best, best_load = replica, load
+        if best is None:
+            self.fell_back()
+        return best
+
+    def routed(self, replica: Replica):
+        with self._lock:
+            replica.routed += 1
+
+    def fell_back(self):
+        with self._lock:
+            self._fallbacks += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            replicas = [
+                {
+                    "replica": r.label,
+                    "healthy": r.healthy,
+                    "in_recovery": r.in_recovery,
+                    "lag_seconds": r.lag,
+                    "error": r.error,
+                    "checked_at": datetime.fromtimestamp(r.checked_at, timezone.utc).isoformat() if r.checked_at else None,
+                    "routed": r.routed,
+                }
+                for r in self.replicas
+            ]
+            fallbacks = self._fallbacks
+        for entry, replica in zip(replicas, self.replicas):
+            entry["pool"] = replica.pool.stats()
+        return {"max_lag_seconds": self.max_lag, "fallbacks": fallbacks, "replicas": replicas}
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=REPLICA_CONNECT_TIMEOUT + 1)
+        for replica in self.replicas:
+            replica.pool.closeall()
+        for conn in self._check_conns.values():
+            conn.close()
+        self._check_conns.clear()
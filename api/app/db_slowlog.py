@@ -0,0 +1,246 @@
+"""
+Slow-query log for app.db: the slowest recent statements, with EXPLAIN
+plans sampled on a background thread.
+"""
+import hashlib
+import heapq
+import itertools
+import logging
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import psycopg
+import psycopg2
+from psycopg2 import extensions
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Only plain reads are re-run under EXPLAIN ANALYZE; anything that might write
+# (including SELECT ... FOR UPDATE) is left alone.
+_READ_ONLY_SQL = re.compile(r"^\s*(SELECT|WITH)\b", re.IGNORECASE)
+_WRITE_KEYWORDS = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|TRUNCATE|CREATE|DROP|ALTER|COPY)\b", re.IGNORECASE)
+EXPLAIN_TIMEOUT_MS = 30000
+MAX_PENDING_EXPLAINS = 4
+
+
+def _fingerprint(vars) -> str | None:
+    """Short stable hash of a statement's parameters; values are not kept."""
+    if vars is None:
+        return None
+    return hashlib.blake2b(repr(vars).encode(), digest_size=6).hexdigest()
+
+
+def _param_types(vars) -> list[str] | None:
+    if vars is None:
+        return None
+    values = vars.values() if isinstance(vars, dict) else vars
+    return [type(v).__name__ for v in values]
+
+
+def _mogrify(cursor, query, vars) -> str:
+    """The statement as sent, parameters inlined, from either driver's cursor."""
+    if isinstance(cursor, psycopg.AsyncCursor):
+        return psycopg.AsyncClientCursor(cursor.connection).mogrify(query, vars)
+    encoding = extensions.encodings.get(cursor.connection.encoding, "utf-8")
+    return cursor.mogrify(query, vars).decode(encoding, "replace")
+
+
+class SlowQueryLog:
+    """The ``size`` slowest statements executed in the last ``window`` seconds.
+
+    Entries sit in a min-heap on duration, so once the log is full a
+    statement faster than the current minimum is rejected with a single
+    comparison and no lock.  Statements over ``threshold_ms`` are also
+    logged, and a ``explain_sample`` fraction of them (at most one per query
+    name every ``explain_interval`` seconds) are re-run under
+    ``EXPLAIN (ANALYZE, BUFFERS)`` on a background thread with its own
+    read-only connection to the server that ran them (the ``source_dsn`` of
+    the cursor's connection, else ``dsn``), so the request that was slow is
+    not made slower.
+    """
+
+    def __init__(
+        self,
+        dsn: str,
+        size: int = 50,
+        window: float = 3600.0,
+        threshold_ms: float = 200.0,
+        explain_sample: float = 0.1,
+        explain_interval: float = 60.0,
+        plans_kept: int = 20,
+    ):
+        self.dsn = dsn
+        self.size = size
+        self.window = window
+        self.threshold_ms = threshold_ms
+        self.explain_sample = explain_sample
+        self.explain_interval = explain_interval
+        self._lock = threading.Lock()
+        self._heap: list[tuple[float, int, dict]] = []
+        self._seq = itertools.count()
+        self._floor = 0.0  # fastest duration still in a full log
+        self._floor_until = 0.0  # ...until this time, when its oldest entry expires
+        self._expired_at = 0.0
+        self._plans: deque[dict] = deque(maxlen=plans_kept)
+        self._last_explained: dict[str, float] = {}
+        self._explaining = 0
+        self._executor: ThreadPoolExecutor | None = None
+        self._explain_conns: dict[str, object] = {}  # dsn -> connection
+
+    # -- recording ---------------------------------------------------------
+
+    def observe(self, cursor, query, vars, name: str, seconds: float, succeeded: bool = True):
+        """Called after every execute(); cheap unless the statement qualifies."""
+        # Lock-free reject while the log is full and none of it has expired
+        if seconds <= self._floor and time.time() < self._floor_until:
+            return
+        entry = self._record(query, vars, name, seconds)
+        if entry is None or seconds * 1000 < self.threshold_ms:
+            return
+        logger.warning("Slow query %s took %.0f ms (params %s)", name, seconds * 1000, entry["params_fingerprint"])
+        if succeeded and isinstance(query, str):
+            self._maybe_explain(cursor, query, vars, name, entry)
+
+    def _record(self, query, vars, name: str, seconds: float) -> dict | None:
+        now = time.time()
+        with self._lock:
+            self._expire(now, force=now >= self._floor_until)
+            if len(self._heap) >= self.size and seconds <= self._heap[0][0]:
+                return None
+            entry = {
+                "query": name,
+                "duration_ms": round(seconds * 1000, 2),
+                "at": datetime.fromtimestamp(now, timezone.utc).isoformat(),
+                "params_fingerprint": _fingerprint(vars),
+                "param_types": _param_types(vars),
+                "plan": None,
+                "_recorded": now,
+            }
+            item = (seconds, next(self._seq), entry)
+            if len(self._heap) >= self.size:
+                heapq.heapreplace(self._heap, item)
+            else:
+                heapq.heappush(self._heap, item)
+            self._set_floor()
+            return entry
+
+    def _set_floor(self):
+        """Fastest duration in a full log, valid until its oldest entry expires."""
+        if len(self._heap) >= self.size:
+            self._floor = self._heap[0][0]
+            self._floor_until = min(e["_recorded"] for _, _, e in self._heap) + self.window
+        else:
+            self._floor = 0.0
+
+    def _expire(self, now: float, force: bool = False):
+        if not force and now - self._expired_at < 1.0:
+            return
+        self._expired_at = now
+        cutoff = now - self.window
+        if self._heap and any(e["_recorded"] < cutoff for _, _, e in self._heap):
+            self._heap = [item for item in self._heap if item[2]["_recorded"] >= cutoff]
+            heapq.heapify(self._heap)
+            self._set_floor()
+
+    # -- plans -------------------------------------------------------------
+
+    def _maybe_explain(self, cursor, query: str, vars, name: str, entry: dict):
+        if random.random() >= self.explain_sample:
+            return
+        if not _READ_ONLY_SQL.match(query) or _WRITE_KEYWORDS.search(query):
+            return
+        now = time.monotonic()
+        with self._lock:
+            if self._explaining >= MAX_PENDING_EXPLAINS or now - self._last_explained.get(name, float("-inf")) < self.explain_interval:
+                return
+            self._last_explained[name] = now
+            self._explaining += 1
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="explain")
+            executor = self._executor
+        try:
+            dsn = getattr(cursor.connection, "source_dsn", None) or self.dsn
+            executor.submit(self._explain, _mogrify(cursor, query, vars), name, entry, dsn)
+        except Exception:
+            with self._lock:
+                self._explaining -= 1
+            logger.debug("Could not schedule EXPLAIN for %s", name, exc_info=True)
+
+    def _explain(self, sql: str, name: str, entry: dict, dsn: str):
+        try:
+            conn = self._explain_conns.get(dsn)
+            if conn is None or conn.closed:
+                conn = self._explain_conns[dsn] = psycopg2.connect(dsn)
+                conn.set_session(readonly=True)
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(f"SET LOCAL statement_timeout = {EXPLAIN_TIMEOUT_MS}")
+                    cur.execute("EXPLAIN (ANALYZE, BUFFERS) " + sql)
+                    plan = "\n".join(row[0] for row in cur.fetchall())
+            finally:
+                conn.rollback()
+            with self._lock:
+                entry["plan"] = plan
+                self._plans.append({
+                    "query": name,
+                    "duration_ms": entry["duration_ms"],
+                    "at": entry["at"],
+                    "params_fingerprint": entry["params_fingerprint"],
+                    "plan": plan,
+                })
+        except Exception:
+            logger.warning("EXPLAIN for slow query %s failed", name, exc_info=True)
+            conn = self._explain_conns.pop(dsn, None)
+            if conn is not None:
+                conn.close()
+        finally:
+            with self._lock:
+                self._explaining -= 1
+
+    # -- reporting ---------------------------------------------------------
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            self._expire(time.time(), force=True)
+            entries = sorted(self._heap, key=lambda item: item[0], reverse=True)
+            queries = [{k: v for k, v in e.items() if not k.startswith("_")} for _, _, e in entries]
+            plans = list(reversed(self._plans))
+        return {
+            "threshold_ms": self.threshold_ms,
+            "window_seconds": self.window,
+            "explain_sample": self.explain_sample,
+            "queries": queries,
+            "plans": plans,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+            self._floor = 0.0
+            self._plans.clear()
+            self._last_explained.clear()
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for conn in self._explain_conns.values():
+            conn.close()
+        self._explain_conns.clear()
+
+
+slow_queries = SlowQueryLog(
+    dsn=settings.database_url,
+    size=settings.slow_query_log_size,
+    window=settings.slow_query_window_seconds,
+    threshold_ms=settings.slow_query_ms,
+    explain_sample=settings.slow_query_explain_sample,
+    explain_interval=settings.slow_query_explain_interval,
+)
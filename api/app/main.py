@@ -1,16 +1,27 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
+from app import metrics
+from app.analytics.matrix_factorization import load_model
 from app.config import settings
-from app.db import get_pool, close_pool, get_db
-from app.routers import movies, genres, auth, ratings, predictions, personality
+from app.db import PoolTimeout, get_pool, close_pool, close_async_pool, replica_stats
+from app.routers import movies, genres, auth, ratings, predictions, personality, admin
+from app.utils.encoding import FastJSONResponse
+from app.utils.passwords import HasherBusy
+from app.utils.security import close_hasher
+
+HEALTH_DB_TIMEOUT = 1.0  # seconds /health/db waits for a pooled connection
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     get_pool()
+    load_model(settings.model_dir)
     yield
     close_pool()
+    await close_async_pool()
+    close_hasher()
 
 
 app = FastAPI(
@@ -18,6 +29,7 @@ app = FastAPI(
     description="COMP0022 Movie Information Application",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 app.add_middleware(
@@ -27,6 +39,26 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["Authorization", "Content-Type"],
 )
+app.add_middleware(metrics.MetricsMiddleware)
+
+
+@app.exception_handler(PoolTimeout)
+async def pool_timeout_handler(request: Request, exc: PoolTimeout):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Database busy, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
+
+@app.exception_handler(HasherBusy)
+async def hasher_busy_handler(request: Request, exc: HasherBusy):
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Too many sign-ins in progress, please retry"},
+        headers={"Retry-After": "1"},
+    )
+
 
 app.include_router(movies.router, prefix="/api", tags=["Movies"])
 app.include_router(genres.router, prefix="/api", tags=["Genres"])
@@ -34,6 +66,7 @@ app.include_router(auth.router, prefix="/api/auth", tags=["Auth"])
 app.include_router(ratings.router, prefix="/api/reports", tags=["Rating Reports"])
 app.include_router(predictions.router, prefix="/api/predictions", tags=["Predictions"])
 app.include_router(personality.router, prefix="/api/reports", tags=["Personality Reports"])
+app.include_router(admin.router, prefix="/api/admin", tags=["Admin"], include_in_schema=False)
 
 
 @app.get("/health")
@@ -41,13 +74,28 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/health/db")
 def health_db():
+    # Probes the psycopg2 pool the sync routes use, with a short wait so a
+    # saturated pool reports unhealthy instead of hanging the probe.
     try:
-        with get_db() as conn:
+        pool = get_pool()
+        conn = pool.getconn(timeout=HEALTH_DB_TIMEOUT)
+        try:
             with conn.cursor() as cur:
                 cur.execute("SELECT 1")
-        return {"status": "ok"}
+            conn.rollback()
+        finally:
+            pool.putconn(conn)
+        body = {"status": "ok", "pool": pool.stats()}
+        replicas = replica_stats()
+        if replicas is not None:
+            body["replicas"] = replicas
+        return body
     except Exception:
-        from fastapi.responses import JSONResponse
         return JSONResponse(status_code=503, content={"status": "unhealthy"})
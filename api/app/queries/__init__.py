@@ -0,0 +1,109 @@
+"""
+SQL constants, one module per feature.
+
+query_name() maps a statement back to the constant it came from, for the
+per-query metrics in app/db.py and the slow-query log in app/db_slowlog.py;
+constants() lists them all, for the query-plan benchmarks.  Hot, fixed
+statements are wrapped in prepared() so app/db_prepared.py runs them as
+server-side prepared statements.
+"""
+import importlib
+import pkgutil
+import re
+import sys
+import threading
+
+MAX_RESOLVED = 2048
+_PLACEHOLDER = re.compile(r"%(s|%|\()")
+
+_lock = threading.Lock()
+_constants: dict[str, str] | None = None
+_resolved: dict[str, str] = {}
+_prepared: set[str] = set()
+
+
+def prepared(sql: str) -> str:
+    """Mark sql to be PREPAREd once per connection and run with EXECUTE."""
+    _prepared.add(sql)
+    return sql
+
+
+def is_prepared(sql) -> bool:
+    return sql in _prepared
+
+
+def positional(sql: str) -> tuple[str, int] | None:
+    """sql with its %s placeholders numbered $1, $2, ... as PREPARE wants,
+    and the parameter count; None if it uses named %(x)s placeholders."""
+    count = 0
+
+    def number(match):
+        nonlocal count
+        if match.group(1) == "(":
+            raise ValueError
+        if match.group(1) == "%":
+            return "%"
+        count += 1
+        return f"${count}"
+
+    try:
+        body = _PLACEHOLDER.sub(number, sql)
+    except ValueError:
+        return None
+    return body, count
+
+
+def _load_constants() -> dict[str, str]:
+    constants = {}
+    for info in pkgutil.iter_modules(__path__):
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        for attr, value in vars(module).items():
+            if attr.isupper() and isinstance(value, str):
+                constants.setdefault(value, attr)
+    return constants
+
+
+def _get_constants() -> dict[str, str]:
+    global _constants
+    if _constants is None:
+        with _lock:
+            if _constants is None:
+                _constants = _load_constants()
+    return _constants
+
+
+def constants() -> dict[str, str]:
+    """Every SQL constant in the package, by name."""
+    return {name: sql for sql, name in _get_constants().items()}
+
+
+def _calling_function() -> str:
+    """Name of the innermost app function outside the DB layer on the stack."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get("__name__", "")
+        if module.startswith("app.") and module != __name__ and module != "app.db" and not module.startswith("app.db_"):
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return "other"
+
+
+def query_name(sql) -> str:
+    """The constant's name for sql, e.g. "GENRE_POPULARITY".
+
+    Statements built by appending to a constant (SEARCH_MOVIES + filters)
+    take the longest constant they start with; anything else is named after
+    the function that ran it (e.g. "list_movies").
+    """
+    if not isinstance(sql, str):
+        return "other"
+    known = _get_constants()
+    name = known.get(sql) or _resolved.get(sql)
+    if name is not None:
+        return name
+
+    prefixes = [(len(c), n) for c, n in known.items() if sql.startswith(c)]
+    name = max(prefixes)[1] if prefixes else _calling_function()
+    if len(_resolved) < MAX_RESOLVED:
+        _resolved[sql] = name
+    return name
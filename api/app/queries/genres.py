@@ -1,5 +1,11 @@
 """Genre report queries -- popularity and polarisation."""
 
+from app.queries import prepared
+
+# Both reports read genre_rating_summary, a per-genre rollup of count, sum
+# and sum of squares that triggers keep in step with ratings and
+# movie_genres, so they cost O(genres) regardless of the ratings volume.
+
 # ---------------------------------------------------------------------------
 # Genre popularity: average user rating and number of ratings per genre
 # ---------------------------------------------------------------------------
@@ -7,13 +13,12 @@
 GENRE_POPULARITY = """
     SELECT g.genre_id,
            g.name,
-           COUNT(r.rating_id)       AS rating_count,
-           ROUND(AVG(r.rating), 2)  AS avg_rating,
-           COUNT(DISTINCT r.movie_id) AS movie_count
+           s.rating_count,
+           ROUND(s.rating_sum / s.rating_count, 2) AS avg_rating,
+           s.movie_count
       FROM genres g
-      JOIN movie_genres mg USING (genre_id)
-      JOIN ratings r       USING (movie_id)
-     GROUP BY g.genre_id, g.name
+      JOIN genre_rating_summary s USING (genre_id)
+     WHERE s.rating_count > 0
      ORDER BY avg_rating DESC
 """
 
@@ -25,13 +30,28 @@ GENRE_POPULARITY = """
 GENRE_POLARISATION = """
     SELECT g.genre_id,
            g.name,
-           COUNT(r.rating_id)          AS rating_count,
-           ROUND(AVG(r.rating), 2)     AS avg_rating,
-           ROUND(STDDEV(r.rating), 2)  AS stddev_rating
+           s.rating_count,
+           ROUND(s.rating_sum / s.rating_count, 2) AS avg_rating,
+           ROUND(
+               SQRT(
+                   (s.rating_sum_sq - s.rating_sum * s.rating_sum / s.rating_count)
+                   / (s.rating_count - 1)
+               ),
+               2
+           ) AS stddev_rating
       FROM genres g
-      JOIN movie_genres mg USING (genre_id)
-      JOIN ratings r       USING (movie_id)
-     GROUP BY g.genre_id, g.name
-    HAVING COUNT(r.rating_id) >= 10
+      JOIN genre_rating_summary s USING (genre_id)
+     WHERE s.rating_count >= 10
      ORDER BY stddev_rating DESC
 """
+
+
+# ---------------------------------------------------------------------------
+# Dataset version stamps (bumped by triggers on every writing statement)
+# ---------------------------------------------------------------------------
+
+GET_DATASET_VERSION = prepared("""
+    SELECT version
+      FROM dataset_versions
+     WHERE dataset = %s
+""")
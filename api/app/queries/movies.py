@@ -1,17 +1,156 @@
-"""Movie search, detail, and genre listing queries."""
+"""Movie listing, search, detail, and genre listing queries."""
 
+from app.queries import prepared
+
+# ---------------------------------------------------------------------------
+# Movie listing (GET /api/movies)
 # ---------------------------------------------------------------------------
-# Search / list movies
+# Built per request from the active filters and sort, so it lives here as
+# small builders rather than one constant; the query-plan benchmark uses the
+# same builders as the router.
 # ---------------------------------------------------------------------------
-# Dynamic filters are injected by the router via optional WHERE clauses.
-# The router must build the WHERE / ORDER BY parts and flatten the params
-# list accordingly.  The base query below uses placeholders that the router
-# appends to.
+
+ALLOWED_SORT_COLUMNS = {"title": "m.title", "year": "m.release_year", "rating": "s.avg_rating"}
+ALLOWED_ORDERS = {"asc", "desc"}
+
+# Tie-breaker paired with each sort column in keyset mode.  Rating sorts use
+# s.movie_id so the (avg_rating, movie_id) index on the summary table applies.
+KEYSET_ID_COLUMNS = {"title": "m.movie_id", "year": "m.movie_id", "rating": "s.movie_id"}
+NOT_NULL_SORT_KEYS = {"title"}
+# The sort column as named in LIST_MOVIES_SELECT's output, for ordering the
+# combined keyset page.
+SORT_OUTPUT_COLUMNS = {"title": "title", "year": "release_year", "rating": "avg_rating"}
+
+LIST_MOVIES_SELECT = """
+    SELECT m.movie_id, m.title, m.release_year, m.poster_path,
+           s.avg_rating,
+           COALESCE(s.rating_count, 0) AS rating_count
+      FROM movies m
+      LEFT JOIN movie_rating_summary s ON s.movie_id = m.movie_id
+"""
+
+
+def _where(conditions: list[str]) -> str:
+    return ("WHERE " + " AND ".join(conditions)) if conditions else ""
+
+
+def list_movies_filters(q=None, genre_id=None, year_min=None, year_max=None) -> tuple[list[str], list]:
+    """WHERE conditions and their params for the listing filters."""
+    conditions = []
+    params = []
+    if q:
+        conditions.append("m.title ILIKE %s")
+        params.append(f"%{q}%")
+    if genre_id is not None:
+        conditions.append(
+            "EXISTS (SELECT 1 FROM movie_genres mg"
+            " WHERE mg.movie_id = m.movie_id AND mg.genre_id = %s)"
+        )
+        params.append(genre_id)
+    if year_min is not None:
+        conditions.append("m.release_year >= %s")
+        params.append(year_min)
+    if year_max is not None:
+        conditions.append("m.release_year <= %s")
+        params.append(year_max)
+    return conditions, params
+
+
+def list_movies_count(conditions: list[str]) -> str:
+    return f"""
+        SELECT COUNT(*)
+        FROM movies m
+        {_where(conditions)}
+    """
+
+
+def list_movies_page(
+    conditions: list[str],
+    params: list,
+    sort_key: str,
+    sort_order: str,
+    per_page: int,
+    page: int = 1,
+    after: tuple | None = None,
+) -> tuple[str, list]:
+    """One page of the listing: OFFSET paging, or keyset paging when after
+    is the (sort value, movie_id) of the previous page's last row."""
+    sort_col = ALLOWED_SORT_COLUMNS[sort_key]
+    # Rating aggregates come from movie_rating_summary (kept current by
+    # triggers on ratings), so a page no longer scans the ratings table.
+    if after is None:
+        data_query = f"""
+            {LIST_MOVIES_SELECT}
+            {_where(conditions)}
+            ORDER BY {sort_col} {sort_order} NULLS LAST, m.movie_id {sort_order}
+            LIMIT %s OFFSET %s
+        """
+        return data_query, params + [per_page, (page - 1) * per_page]
+
+    # Keyset mode: seek past the last (sort value, movie_id) instead of
+    # skipping rows, so every page costs the same.  Rows with a NULL sort
+    # value come last, from a second branch that is only asked for the rows
+    # the first one could not fill (LIMIT 0 does not run it at all).  The
+    # outer ORDER BY fixes the page order, which UNION ALL alone does not.
+    last_value, last_id = after
+    id_col = KEYSET_ID_COLUMNS[sort_key]
+    out_col = SORT_OUTPUT_COLUMNS[sort_key]
+    cmp = ">" if sort_order == "asc" else "<"
+    order = f"ORDER BY ({out_col} IS NULL), {out_col} {sort_order}, movie_id {sort_order}"
+    has_tail = sort_key not in NOT_NULL_SORT_KEYS
+    tail_select = f"""
+        {LIST_MOVIES_SELECT}
+        {{where}}
+        ORDER BY m.movie_id {sort_order}
+        LIMIT {{limit}}
+    """
+    if last_value is None:
+        # Already among the NULLs: only the tail remains.
+        tail_conditions = conditions + [f"{sort_col} IS NULL", f"m.movie_id {cmp} %s"]
+        return tail_select.format(where=_where(tail_conditions), limit="%s"), params + [last_id, per_page]
+
+    # The explicit IS NOT NULL lets the planner turn the summary LEFT JOIN
+    # into an inner join and seek the composite index.
+    head_conditions = conditions + [
+        f"{sort_col} IS NOT NULL",
+        f"({sort_col}, {id_col}) {cmp} (%s, %s)",
+    ]
+    head = f"""
+        {LIST_MOVIES_SELECT}
+        {_where(head_conditions)}
+        ORDER BY {sort_col} {sort_order}, {id_col} {sort_order}
+        LIMIT %s
+    """
+    head_params = params + [last_value, last_id, per_page]
+    if not has_tail:
+        return head, head_params
+
+    tail = tail_select.format(
+        where=_where(conditions + [f"{sort_col} IS NULL"]),
+        limit="GREATEST(%s - (SELECT COUNT(*) FROM head), 0)",
+    )
+    data_query = f"""
+        WITH head AS MATERIALIZED ({head})
+        SELECT * FROM (SELECT * FROM head UNION ALL ({tail})) page
+        {order}
+    """
+    data_params = head_params + params + [per_page]
+    return data_query, data_params
+
+
+# ---------------------------------------------------------------------------
+# Ranked movie search
+# ---------------------------------------------------------------------------
+# Matches the stored search_vector (title weighted A, tags B, overview C) with
+# websearch_to_tsquery and orders by ts_rank.  When the full-text query has
+# no hits at all (typos, partial words) the router falls back to
+# SEARCH_MOVIES_FUZZY, which ranks titles by trigram similarity.
 #
-# Mandatory params: search_term (twice, for title and overview), limit, offset
+# Mandatory params: search_term
 # Optional WHERE fragments the router can append before ORDER BY:
-#   AND g.name = %s          -- genre filter
-#   AND m.release_year = %s  -- year filter
+#   SEARCH_MOVIES_GENRE_FILTER  -- genre_id
+#   SEARCH_MOVIES_YEAR_FILTER   -- release_year
+# Then SEARCH_MOVIES_ORDER and SEARCH_MOVIES_PAGINATION (limit, offset).
 # ---------------------------------------------------------------------------
 
 SEARCH_MOVIES = """
@@ -23,33 +162,52 @@ SEARCH_MOVIES = """
            m.poster_path,
            m.imdb_rating,
            m.tmdb_vote_avg,
-           COALESCE(mar.avg_rating, 0) AS avg_user_rating,
-           COALESCE(mar.rating_count, 0) AS rating_count
+           COALESCE(s.avg_rating, 0) AS avg_user_rating,
+           COALESCE(s.rating_count, 0) AS rating_count,
+           ts_rank(m.search_vector, q.query) AS rank
       FROM movies m
-      LEFT JOIN movie_avg_ratings mar USING (movie_id)
-      LEFT JOIN movie_genres mg USING (movie_id)
-      LEFT JOIN genres g USING (genre_id)
-     WHERE (m.title ILIKE '%%' || %s || '%%'
-            OR m.overview ILIKE '%%' || %s || '%%')
+     CROSS JOIN websearch_to_tsquery('english', %s) AS q(query)
+      LEFT JOIN movie_rating_summary s ON s.movie_id = m.movie_id
+     WHERE m.search_vector @@ q.query
+"""
+
+# Trigram fallback; params: search_term (similarity), search_term (match).
+SEARCH_MOVIES_FUZZY = """
+    SELECT m.movie_id,
+           m.title,
+           m.release_year,
+           m.runtime_minutes,
+           m.overview,
+           m.poster_path,
+           m.imdb_rating,
+           m.tmdb_vote_avg,
+           COALESCE(s.avg_rating, 0) AS avg_user_rating,
+           COALESCE(s.rating_count, 0) AS rating_count,
+           similarity(m.title, %s) AS rank
+      FROM movies m
+      LEFT JOIN movie_rating_summary s ON s.movie_id = m.movie_id
+     WHERE m.title %% %s
+"""
+
+# Cheap existence probe used to decide between full-text and fuzzy results.
+SEARCH_MOVIES_HAS_MATCH = """
+    SELECT EXISTS (
+        SELECT 1
+          FROM movies m
+         WHERE m.search_vector @@ websearch_to_tsquery('english', %s)
+    )
 """
 
 # Appended by the router when a genre filter is provided.
-SEARCH_MOVIES_GENRE_FILTER = " AND g.name = %s"
+SEARCH_MOVIES_GENRE_FILTER = """
+       AND EXISTS (SELECT 1 FROM movie_genres mg
+                    WHERE mg.movie_id = m.movie_id AND mg.genre_id = %s)
+"""
 
 # Appended by the router when a year filter is provided.
 SEARCH_MOVIES_YEAR_FILTER = " AND m.release_year = %s"
 
-# The GROUP BY is always required because of the LEFT JOIN on genres.
-SEARCH_MOVIES_GROUP_BY = """
-     GROUP BY m.movie_id, mar.avg_rating, mar.rating_count
-"""
-
-# Sort options the router can pick from (no user-supplied values).
-SEARCH_MOVIES_ORDER_TITLE = " ORDER BY m.title ASC"
-SEARCH_MOVIES_ORDER_YEAR = " ORDER BY m.release_year DESC"
-SEARCH_MOVIES_ORDER_RATING = " ORDER BY avg_user_rating DESC"
-SEARCH_MOVIES_ORDER_POPULARITY = " ORDER BY rating_count DESC"
-SEARCH_MOVIES_ORDER_DEFAULT = " ORDER BY m.title ASC"
+SEARCH_MOVIES_ORDER = " ORDER BY rank DESC, m.movie_id"
 
 # Pagination (always appended last).
 SEARCH_MOVIES_PAGINATION = " LIMIT %s OFFSET %s"
@@ -124,24 +282,107 @@ GET_MOVIE_TAGS = """
      ORDER BY count DESC
 """
 
+# Served from the movie_rating_stats view over movie_rating_summary; min / max /
+# median are read off the ten-bucket histogram, so the cost does not depend on
+# the rating count.
 GET_MOVIE_RATING_STATS = """
-    SELECT COUNT(*) AS total_ratings,
-           ROUND(AVG(r.rating), 2) AS avg_rating,
-           MIN(r.rating) AS min_rating,
-           MAX(r.rating) AS max_rating,
-           ROUND(STDDEV(r.rating), 2) AS stddev_rating,
-           PERCENTILE_CONT(0.5) WITHIN GROUP (ORDER BY r.rating) AS median_rating
-      FROM ratings r
-     WHERE r.movie_id = %s
+    SELECT COALESCE(st.total_ratings, 0) AS total_ratings,
+           st.avg_rating,
+           st.min_rating,
+           st.max_rating,
+           st.stddev_rating,
+           st.median_rating
+      FROM (SELECT %s::integer AS movie_id) t
+      LEFT JOIN movie_rating_stats st USING (movie_id)
 """
 
 
+# ---------------------------------------------------------------------------
+# Movie detail page in a single round trip
+#
+# Same fields as GET_MOVIE_DETAIL plus genres / cast / crew / tags as JSON
+# arrays (same shapes and ordering as the per-section queries above) and the
+# GET_MOVIE_RATING_STATS figures as a JSON object.  Params: movie_id (%s).
+# ---------------------------------------------------------------------------
+
+GET_MOVIE_FULL = prepared("""
+    SELECT m.movie_id,
+           m.title,
+           m.release_year,
+           m.runtime_minutes,
+           m.overview,
+           m.poster_path,
+           m.backdrop_path,
+           m.budget,
+           m.revenue,
+           m.imdb_id,
+           m.tmdb_id,
+           m.tmdb_vote_avg,
+           m.tmdb_vote_count,
+           m.imdb_rating,
+           m.rotten_tomatoes_score,
+           m.box_office,
+           COALESCE(s.avg_rating, 0) AS avg_user_rating,
+           COALESCE(s.total_ratings, 0) AS rating_count,
+           COALESCE((
+               SELECT json_agg(json_build_object(
+                          'genre_id', g.genre_id,
+                          'name', g.name) ORDER BY g.name)
+                 FROM genres g
+                 JOIN movie_genres mg USING (genre_id)
+                WHERE mg.movie_id = m.movie_id
+           ), '[]') AS genres,
+           COALESCE((
+               SELECT json_agg(json_build_object(
+                          'person_id', p.person_id,
+                          'name', p.name,
+                          'profile_path', p.profile_path,
+                          'character', mc.character,
+                          'cast_order', mc.cast_order) ORDER BY mc.cast_order)
+                 FROM movie_cast mc
+                 JOIN people p USING (person_id)
+                WHERE mc.movie_id = m.movie_id
+           ), '[]') AS cast,
+           COALESCE((
+               SELECT json_agg(json_build_object(
+                          'person_id', p.person_id,
+                          'name', p.name,
+                          'profile_path', p.profile_path,
+                          'job', mc.job,
+                          'department', mc.department) ORDER BY mc.department, mc.job)
+                 FROM movie_crew mc
+                 JOIN people p USING (person_id)
+                WHERE mc.movie_id = m.movie_id
+           ), '[]') AS crew,
+           COALESCE((
+               SELECT json_agg(json_build_object(
+                          'tag', t.tag,
+                          'count', t.count) ORDER BY t.count DESC)
+                 FROM (SELECT tag, COUNT(*) AS count
+                         FROM tags
+                        WHERE movie_id = m.movie_id
+                        GROUP BY tag) t
+           ), '[]') AS tags,
+           json_build_object(
+               'total_ratings', COALESCE(s.total_ratings, 0),
+               'avg_rating', s.avg_rating,
+               'min_rating', s.min_rating,
+               'max_rating', s.max_rating,
+               'stddev_rating', s.stddev_rating,
+               'median_rating', s.median_rating
+           ) AS rating_stats
+      FROM movies m
+      LEFT JOIN movie_rating_stats s ON s.movie_id = m.movie_id
+     WHERE m.movie_id = %s
+""")
+
+
 # ---------------------------------------------------------------------------
 # Genre listing (for filters / dropdowns)
 # ---------------------------------------------------------------------------
 
-LIST_GENRES = """
+LIST_GENRES = prepared("""
     SELECT g.genre_id, g.name
       FROM genres g
      ORDER BY g.name
-"""
+""")
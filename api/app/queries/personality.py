@@ -63,3 +63,43 @@ PERSONALITY_CLUSTERS = """
      GROUP BY pp.assigned_metric, pp.assigned_condition
      ORDER BY pp.assigned_metric, pp.assigned_condition
 """
+
+
+# ---------------------------------------------------------------------------
+# Inputs for the NumPy personality engine (app/analytics/personality.py)
+#
+# Profiles become a dense users x traits matrix; ratings are pre-aggregated
+# per (user, genre) and per user so the engine never sees individual rows.
+# ---------------------------------------------------------------------------
+
+PERSONALITY_PROFILE_MATRIX = """
+    SELECT user_id,
+           openness::float8,
+           agreeableness::float8,
+           emotional_stability::float8,
+           conscientiousness::float8,
+           extraversion::float8,
+           assigned_metric,
+           assigned_condition
+      FROM personality_profiles
+     ORDER BY user_id
+"""
+
+PERSONALITY_USER_GENRE_TOTALS = """
+    SELECT pr.user_id,
+           mg.genre_id,
+           SUM(pr.rating)::float8 AS rating_sum,
+           COUNT(*) AS rating_count
+      FROM personality_ratings pr
+      JOIN movie_genres mg USING (movie_id)
+     GROUP BY pr.user_id, mg.genre_id
+"""
+
+PERSONALITY_USER_RATING_TOTALS = """
+    SELECT user_id,
+           SUM(rating)::float8 AS rating_sum,
+           SUM(rating * rating)::float8 AS rating_sum_sq,
+           COUNT(*) AS rating_count
+      FROM personality_ratings
+     GROUP BY user_id
+"""
@@ -1,5 +1,7 @@
 """Prediction queries -- rating prediction and similar film discovery."""
 
+from app.queries import prepared
+
 # ---------------------------------------------------------------------------
 # Predict rating: genre-overlap weighted average
 #
@@ -9,7 +11,7 @@
 # predicted rating.
 # ---------------------------------------------------------------------------
 
-PREDICT_RATING = """
+PREDICT_RATING = prepared("""
     WITH target_genres AS (
         SELECT genre_id
           FROM movie_genres
@@ -34,7 +36,7 @@ PREDICT_RATING = """
            COUNT(*) AS based_on_movies,
            SUM(shared_genres) AS total_genre_overlap
       FROM user_rated
-"""
+""")
 
 
 # ---------------------------------------------------------------------------
@@ -91,3 +93,83 @@ SIMILAR_FILMS = """
               rating_similarity DESC
      LIMIT %s
 """
+
+
+# ---------------------------------------------------------------------------
+# Training input for the matrix factorisation model (db/train_model.py)
+# ---------------------------------------------------------------------------
+
+TRAINING_RATINGS = """
+    SELECT user_id, movie_id, rating::float8
+      FROM ratings
+"""
+
+
+# ---------------------------------------------------------------------------
+# Precomputed similar films (movie_neighbours, see db/compute_neighbours.py)
+#
+# Params: movie_id (%s), limit (%s)
+# ---------------------------------------------------------------------------
+
+GET_MOVIE_NEIGHBOURS = prepared("""
+    SELECT n.neighbour_id AS movie_id,
+           m.title,
+           m.release_year,
+           m.poster_path,
+           s.avg_rating,
+           n.score,
+           n.genre_similarity,
+           n.rating_similarity,
+           n.tag_similarity
+      FROM movie_neighbours n
+      JOIN movies m ON m.movie_id = n.neighbour_id
+      LEFT JOIN movie_rating_summary s ON s.movie_id = n.neighbour_id
+     WHERE n.movie_id = %s
+     ORDER BY n.rank
+     LIMIT %s
+""")
+
+
+# ---------------------------------------------------------------------------
+# Neighbour batch job inputs
+# ---------------------------------------------------------------------------
+
+NEIGHBOUR_MOVIE_FEATURES = """
+    SELECT m.movie_id,
+           COALESCE(s.rating_count, 0) AS rating_count,
+           COALESCE(s.rating_sum, 0) AS rating_sum,
+           (s.rating_sum / NULLIF(s.rating_count, 0))::float8 AS avg_rating
+      FROM movies m
+      LEFT JOIN movie_rating_summary s USING (movie_id)
+     ORDER BY m.movie_id
+"""
+
+NEIGHBOUR_MOVIE_GENRES = """
+    SELECT movie_id, genre_id
+      FROM movie_genres
+"""
+
+# Tags are case/whitespace-normalised; each (movie, tag) pair counts once.
+NEIGHBOUR_MOVIE_TAGS = """
+    SELECT DISTINCT movie_id, lower(btrim(tag)) AS tag
+      FROM tags
+"""
+
+# Movies whose rating totals changed since their neighbours were computed,
+# plus movies never computed.
+STALE_NEIGHBOUR_MOVIES = """
+    SELECT m.movie_id
+      FROM movies m
+      LEFT JOIN movie_rating_summary s    USING (movie_id)
+      LEFT JOIN movie_neighbour_state st  USING (movie_id)
+     WHERE st.movie_id IS NULL
+        OR st.rating_count <> COALESCE(s.rating_count, 0)
+        OR st.rating_sum   <> COALESCE(s.rating_sum, 0)
+"""
+
+# Movies currently listing any of the given movies as a neighbour.
+MOVIES_LISTING_NEIGHBOURS = """
+    SELECT DISTINCT movie_id
+      FROM movie_neighbours
+     WHERE neighbour_id = ANY(%s)
+"""
@@ -77,3 +77,22 @@ CROSS_GENRE_PREFERENCES = """
     HAVING COUNT(*) >= 20
      ORDER BY correlation DESC
 """
+
+
+# ---------------------------------------------------------------------------
+# Per-user, per-genre rating totals
+#
+# Input to the NumPy cross-genre engine (app/analytics/genre_correlation.py),
+# which turns these into a user x genre average matrix and correlates every
+# genre pair at once instead of self-joining user_genre_avg.
+# ---------------------------------------------------------------------------
+
+USER_GENRE_RATING_TOTALS = """
+    SELECT r.user_id,
+           mg.genre_id,
+           SUM(r.rating)::float8 AS rating_sum,
+           COUNT(*)              AS rating_count
+      FROM ratings r
+      JOIN movie_genres mg USING (movie_id)
+     GROUP BY r.user_id, mg.genre_id
+"""
@@ -0,0 +1,30 @@
+"""App user lookups for sign-up, login and token authentication."""
+
+from app.queries import prepared
+
+# Every authenticated request resolves its token's user_id (on a user-cache
+# miss), so these run often enough to be worth preparing.
+
+GET_USER = prepared("""
+    SELECT user_id, username, display_name
+      FROM app_users
+     WHERE user_id = %s
+""")
+
+GET_USER_ID_BY_USERNAME = prepared("""
+    SELECT user_id
+      FROM app_users
+     WHERE username = %s
+""")
+
+GET_LOGIN_USER = prepared("""
+    SELECT user_id, username, password_hash, display_name
+      FROM app_users
+     WHERE username = %s
+""")
+
+INSERT_USER = """
+    INSERT INTO app_users (username, password_hash, display_name)
+    VALUES (%s, %s, %s)
+    RETURNING user_id, username, display_name, created_at
+"""
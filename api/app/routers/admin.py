@@ -0,0 +1,36 @@
+import secrets
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+
+from app.config import settings
+from app.db_prepared import prepared_statements
+from app.db_slowlog import slow_queries
+
+
+def require_admin(x_admin_token: str | None = Header(None)):
+    """Dependency: admin routes need ADMIN_TOKEN set and sent as X-Admin-Token."""
+    if not settings.admin_token:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if x_admin_token is None or not secrets.compare_digest(x_admin_token, settings.admin_token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid admin token")
+
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+
+@router.get("/slow-queries")
+def get_slow_queries():
+    """Slowest recent statements, slowest first, with any sampled EXPLAIN plans."""
+    return slow_queries.snapshot()
+
+
+@router.delete("/slow-queries")
+def clear_slow_queries():
+    slow_queries.clear()
+    return {"status": "cleared"}
+
+
+@router.get("/prepared-statements")
+def get_prepared_statements():
+    """Per prepared query: prepares, executions and generic / custom plan counts."""
+    return prepared_statements.stats()
@@ -1,41 +1,41 @@
 from fastapi import APIRouter, Body, HTTPException, status, Depends
-from app.db import get_db
+from app.db import get_async_db
+from app.queries.users import GET_LOGIN_USER, GET_USER_ID_BY_USERNAME, INSERT_USER
 from app.utils.security import (
     hash_password,
     verify_password,
     create_access_token,
     get_current_user,
+    invalidate_user,
 )
 
 router = APIRouter()
 
 
+# register / login are async: bcrypt runs on the password hashing pool and
+# the database work on the async pool, so neither holds a worker thread.
+# The async pool uses psycopg 3, which prepares statements itself; the
+# lookups ask for it up front rather than after its default five runs.
 @router.post("/register")
-def register(
+async def register(
     username: str = Body(min_length=3, max_length=50),
     password: str = Body(min_length=8, max_length=128),
     display_name: str = Body(None),
 ):
     display_name = display_name.strip() if display_name else None
-    hashed = hash_password(password)
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT user_id FROM app_users WHERE username = %s",
-                (username,),
-            )
-            if cur.fetchone():
+    hashed = await hash_password(password)
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(GET_USER_ID_BY_USERNAME, (username,), prepare=True)
+            if await cur.fetchone():
                 raise HTTPException(
                     status_code=status.HTTP_409_CONFLICT,
                     detail="Username already taken",
                 )
-            cur.execute(
-                """INSERT INTO app_users (username, password_hash, display_name)
-                   VALUES (%s, %s, %s)
-                   RETURNING user_id, username, display_name, created_at""",
-                (username, hashed, display_name),
-            )
-            row = cur.fetchone()
+            await cur.execute(INSERT_USER, (username, hashed, display_name))
+            row = await cur.fetchone()
+    # Every app_users write drops the cached identity for that id.
+    invalidate_user(row[0])
 
     user = {
         "user_id": row[0],
@@ -48,19 +48,16 @@ def register(
 
 
 @router.post("/login")
-def login(
+async def login(
     username: str = Body(min_length=3, max_length=50),
     password: str = Body(min_length=8, max_length=128),
 ):
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute(
-                "SELECT user_id, username, password_hash, display_name FROM app_users WHERE username = %s",
-                (username,),
-            )
-            row = cur.fetchone()
+    async with get_async_db() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(GET_LOGIN_USER, (username,), prepare=True)
+            row = await cur.fetchone()
 
-    if not row or not verify_password(password, row[2]):
+    if not row or not await verify_password(password, row[2]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid username or password",
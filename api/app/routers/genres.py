@@ -1,5 +1,6 @@
 from fastapi import APIRouter
 from app.db import get_db
+from app.utils.encoding import float_cursor
 from app.queries.genres import GENRE_POPULARITY, GENRE_POLARISATION
 
 router = APIRouter()
@@ -7,8 +8,8 @@ router = APIRouter()
 
 @router.get("/genre-popularity")
 def genre_popularity():
-    with get_db() as conn:
-        with conn.cursor() as cur:
+    with get_db(readonly=True) as conn:
+        with float_cursor(conn) as cur:
             cur.execute(GENRE_POPULARITY)
             rows = cur.fetchall()
 
@@ -17,7 +18,7 @@ def genre_popularity():
             "genre_id": row[0],
             "genre_name": row[1],
             "rating_count": row[2],
-            "avg_rating": float(row[3]) if row[3] else None,
+            "avg_rating": row[3],
             "movie_count": row[4],
         }
         for row in rows
@@ -26,8 +27,8 @@ def genre_popularity():
 
 @router.get("/genre-polarisation")
 def genre_polarisation():
-    with get_db() as conn:
-        with conn.cursor() as cur:
+    with get_db(readonly=True) as conn:
+        with float_cursor(conn) as cur:
             cur.execute(GENRE_POLARISATION)
             rows = cur.fetchall()
 
@@ -36,8 +37,8 @@ def genre_polarisation():
             "genre_id": row[0],
             "genre_name": row[1],
             "total_ratings": row[2],
-            "avg_rating": float(row[3]) if row[3] else None,
-            "rating_stddev": float(row[4]) if row[4] else None,
+            "avg_rating": row[3],
+            "rating_stddev": row[4],
         }
         for row in rows
     ]
@@ -1,19 +1,65 @@
+import base64
+import json
+from decimal import Decimal, InvalidOperation
 from fastapi import APIRouter, HTTPException, Query, status
 from psycopg2.extras import RealDictCursor
+from app.config import settings
 from app.db import get_db
 from app.queries.movies import (
-    GET_MOVIE_DETAIL,
-    GET_MOVIE_GENRES,
-    GET_MOVIE_CAST,
-    GET_MOVIE_CREW,
-    GET_MOVIE_TAGS,
+    ALLOWED_ORDERS,
+    ALLOWED_SORT_COLUMNS,
+    GET_MOVIE_FULL,
     LIST_GENRES,
+    SEARCH_MOVIES,
+    SEARCH_MOVIES_FUZZY,
+    SEARCH_MOVIES_HAS_MATCH,
+    SEARCH_MOVIES_GENRE_FILTER,
+    SEARCH_MOVIES_YEAR_FILTER,
+    SEARCH_MOVIES_ORDER,
+    SEARCH_MOVIES_PAGINATION,
+    NOT_NULL_SORT_KEYS,
+    list_movies_count,
+    list_movies_filters,
+    list_movies_page,
 )
+from app.utils.cache import TTLCache
+from app.utils.encoding import JSONBytes, float_cursor
 
 router = APIRouter()
 
-ALLOWED_SORT_COLUMNS = {"title": "m.title", "year": "m.release_year", "rating": "avg_rating"}
-ALLOWED_ORDERS = {"asc", "desc"}
+# JSON type of the sort value stored in a cursor (ratings travel as strings
+# so the NUMERIC value round-trips exactly; the 2dp avg_rating fetched as a
+# float prints back to the same digits).
+CURSOR_VALUE_TYPES = {"title": str, "year": int, "rating": str}
+
+# Totals only change when data is reloaded, so cache them per filter signature.
+_total_cache = TTLCache(maxsize=512, ttl=settings.movie_total_cache_seconds)
+
+
+def _encode_cursor(sort_by: str, order: str, value, movie_id: int) -> str:
+    if isinstance(value, (Decimal, float)):
+        value = str(value)
+    raw = json.dumps([sort_by, order, value, movie_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str, sort_by: str, order: str):
+    """Return (last sort value, last movie_id) or raise 400."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        c_sort, c_order, value, movie_id = json.loads(raw)
+        if (c_sort, c_order) != (sort_by, order) or not isinstance(movie_id, int):
+            raise ValueError("cursor does not match sort")
+        if value is None:
+            if sort_by in NOT_NULL_SORT_KEYS:
+                raise ValueError("cursor value missing")
+        elif not isinstance(value, CURSOR_VALUE_TYPES[sort_by]) or isinstance(value, bool):
+            raise ValueError("cursor value has wrong type")
+        elif sort_by == "rating":
+            value = Decimal(value)
+    except (ValueError, TypeError, InvalidOperation):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return value, movie_id
 
 
 @router.get("/movies")
@@ -26,57 +72,30 @@ def list_movies(
     order: str = Query("asc", description="Sort order: asc, desc"),
     page: int = Query(1, ge=1),
     per_page: int = Query(20, ge=1, le=100),
+    cursor: str = Query(None, description="Opaque next_cursor from a previous page; overrides page"),
+    include_total: bool = Query(True, description="Set false to skip counting matches"),
 ):
-    sort_col = ALLOWED_SORT_COLUMNS.get(sort_by, "m.title")
+    sort_key = sort_by if sort_by in ALLOWED_SORT_COLUMNS else "title"
     sort_order = order.lower() if order.lower() in ALLOWED_ORDERS else "asc"
 
-    conditions = []
-    params = []
-
-    if q:
-        conditions.append("m.title ILIKE %s")
-        params.append(f"%{q}%")
-    if genre_id is not None:
-        conditions.append("mg.genre_id = %s")
-        params.append(genre_id)
-    if year_min is not None:
-        conditions.append("m.release_year >= %s")
-        params.append(year_min)
-    if year_max is not None:
-        conditions.append("m.release_year <= %s")
-        params.append(year_max)
-
-    where_clause = ("WHERE " + " AND ".join(conditions)) if conditions else ""
-    genre_join = "LEFT JOIN movie_genres mg ON mg.movie_id = m.movie_id"
-
-    count_query = f"""
-        SELECT COUNT(DISTINCT m.movie_id)
-        FROM movies m
-        {genre_join}
-        {where_clause}
-    """
-
-    data_query = f"""
-        SELECT
-            m.movie_id, m.title, m.release_year, m.poster_path,
-            ROUND(AVG(r.rating), 2) AS avg_rating,
-            COUNT(r.rating_id) AS rating_count
-        FROM movies m
-        {genre_join}
-        LEFT JOIN ratings r ON r.movie_id = m.movie_id
-        {where_clause}
-        GROUP BY m.movie_id, m.title, m.release_year, m.poster_path
-        ORDER BY {sort_col} {sort_order} NULLS LAST
-        LIMIT %s OFFSET %s
-    """
-
-    offset = (page - 1) * per_page
-    data_params = params + [per_page, offset]
-
-    with get_db() as conn:
-        with conn.cursor() as cur:
-            cur.execute(count_query, params)
-            total = cur.fetchone()[0]
+    conditions, params = list_movies_filters(q, genre_id, year_min, year_max)
+    count_query = list_movies_count(conditions)
+    after = _decode_cursor(cursor, sort_key, sort_order) if cursor is not None else None
+    data_query, data_params = list_movies_page(
+        conditions, params, sort_key, sort_order, per_page, page=page, after=after,
+    )
+
+    total = None
+    total_key = (q, genre_id, year_min, year_max)
+    if include_total:
+        total = _total_cache.get(total_key)
+
+    with get_db(readonly=True) as conn:
+        with float_cursor(conn) as cur:
+            if include_total and total is None:
+                cur.execute(count_query, params)
+                total = cur.fetchone()[0]
+                _total_cache.set(total_key, total)
 
             cur.execute(data_query, data_params)
             rows = cur.fetchall()
@@ -87,52 +106,104 @@ def list_movies(
             "title": row[1],
             "release_year": row[2],
             "poster_path": row[3],
-            "avg_rating": float(row[4]) if row[4] else None,
+            "avg_rating": row[4],
             "rating_count": row[5],
         }
         for row in rows
     ]
 
+    next_cursor = None
+    if len(rows) == per_page:
+        last = rows[-1]
+        sort_value = {"title": last[1], "year": last[2], "rating": last[4]}[sort_key]
+        next_cursor = _encode_cursor(sort_key, sort_order, sort_value, last[0])
+
     return {
         "movies": movies,
         "total": total,
-        "page": page,
+        "page": page if cursor is None else None,
         "per_page": per_page,
-        "total_pages": (total + per_page - 1) // per_page if total else 0,
+        "total_pages": (total + per_page - 1) // per_page if total else (0 if total == 0 else None),
+        "next_cursor": next_cursor,
     }
 
 
-@router.get("/movies/{movie_id}")
-def get_movie(movie_id: int):
-    with get_db() as conn:
-        with conn.cursor(cursor_factory=RealDictCursor) as cur:
-            cur.execute(GET_MOVIE_DETAIL, (movie_id,))
-            movie = cur.fetchone()
-            if not movie:
-                raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Movie not found")
+@router.get("/movies/search")
+def search_movies(
+    q: str = Query(..., min_length=1, max_length=200, description="Words to match in title, tags and overview"),
+    genre_id: int = Query(None),
+    year: int = Query(None),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(20, ge=1, le=100),
+):
+    filters = ""
+    filter_params = []
+    if genre_id is not None:
+        filters += SEARCH_MOVIES_GENRE_FILTER
+        filter_params.append(genre_id)
+    if year is not None:
+        filters += SEARCH_MOVIES_YEAR_FILTER
+        filter_params.append(year)
+
+    tail = SEARCH_MOVIES_ORDER + SEARCH_MOVIES_PAGINATION
+    page_params = [per_page, (page - 1) * per_page]
+
+    with get_db(readonly=True) as conn:
+        with float_cursor(conn, cursor_factory=RealDictCursor) as cur:
+            match = "fulltext"
+            cur.execute(SEARCH_MOVIES + filters + tail, [q] + filter_params + page_params)
+            rows = cur.fetchall()
 
-            cur.execute(GET_MOVIE_GENRES, (movie_id,))
-            genres = cur.fetchall()
+            # Only fall back to trigram matching when the full-text query has
+            # no hits at all, not merely none on this page.
+            if not rows:
+                has_match = False
+                if page > 1:
+                    cur.execute(SEARCH_MOVIES_HAS_MATCH, (q,))
+                    has_match = cur.fetchone()["exists"]
+                if not has_match:
+                    match = "fuzzy"
+                    cur.execute(
+                        SEARCH_MOVIES_FUZZY + filters + tail,
+                        [q, q] + filter_params + page_params,
+                    )
+                    rows = cur.fetchall()
 
-            cur.execute(GET_MOVIE_CAST, (movie_id,))
-            cast = cur.fetchall()
+    movies = [
+        {
+            "movie_id": row["movie_id"],
+            "title": row["title"],
+            "release_year": row["release_year"],
+            "runtime_minutes": row["runtime_minutes"],
+            "overview": row["overview"],
+            "poster_path": row["poster_path"],
+            "imdb_rating": row["imdb_rating"],
+            "tmdb_vote_avg": row["tmdb_vote_avg"],
+            "avg_rating": row["avg_user_rating"],
+            "rating_count": row["rating_count"],
+            "rank": round(row["rank"], 4),
+        }
+        for row in rows
+    ]
+
+    return {"movies": movies, "match": match, "page": page, "per_page": per_page}
 
-            cur.execute(GET_MOVIE_CREW, (movie_id,))
-            crew = cur.fetchall()
 
-            cur.execute(GET_MOVIE_TAGS, (movie_id,))
-            tags = cur.fetchall()
+@router.get("/movies/{movie_id}")
+def get_movie(movie_id: int):
+    with get_db(readonly=True) as conn:
+        with float_cursor(conn, cursor_factory=RealDictCursor) as cur:
+            cur.execute(GET_MOVIE_FULL, (movie_id,))
+            movie = cur.fetchone()
 
-    movie["genres"] = genres
-    movie["cast"] = cast
-    movie["crew"] = crew
-    movie["tags"] = tags
-    return movie
+    if not movie:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Movie not found")
+    return JSONBytes(movie)
 
 
 @router.get("/genres")
 def list_genres():
-    with get_db() as conn:
+    with get_db(readonly=True) as conn:
         with conn.cursor(cursor_factory=RealDictCursor) as cur:
             cur.execute(LIST_GENRES)
             return cur.fetchall()
@@ -1,13 +1,30 @@
-from fastapi import APIRouter
+from functools import partial
+from fastapi import APIRouter, Request
+from app.analytics import personality
+from app.db import get_db
+from app.utils.encoding import EncodedCache, JSONBytes
+from app.utils.streaming import stream_format, stream_rows
 
 router = APIRouter()
+_readonly_db = partial(get_db, readonly=True)
+
+_correlation_encoded = EncodedCache()
+_clusters_encoded = EncodedCache()
 
 
 @router.get("/personality-genre-correlation")
-def personality_genre_correlation():
-    return []
+def personality_genre_correlation(request: Request):
+    rows = personality.personality_genre_correlation(_readonly_db)
+    fmt = stream_format(request)
+    if fmt:
+        return stream_rows(fmt, rows, filename="personality-genre-correlation")
+    return JSONBytes(_correlation_encoded.encode(rows))
 
 
 @router.get("/personality-clusters")
-def personality_clusters():
-    return []
+def personality_clusters(request: Request):
+    rows = personality.personality_clusters(_readonly_db)
+    fmt = stream_format(request)
+    if fmt:
+        return stream_rows(fmt, rows, filename="personality-clusters")
+    return JSONBytes(_clusters_encoded.encode(rows))
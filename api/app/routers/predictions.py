@@ -1,13 +1,62 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Body, Query
+from psycopg2.extras import RealDictCursor
+from app.analytics.matrix_factorization import get_model
+from app.db import get_db
+from app.utils.encoding import float_cursor
+from app.queries.predictions import GET_MOVIE_NEIGHBOURS, PREDICT_RATING, SIMILAR_FILMS
 
 router = APIRouter()
 
 
 @router.post("/predict")
-def predict():
-    return {"prediction": None}
+def predict(user_id: int = Body(), movie_id: int = Body()):
+    model = get_model()
+    if model is not None:
+        prediction = model.predict(user_id, movie_id)
+        if prediction is not None:
+            return {
+                "user_id": user_id,
+                "movie_id": movie_id,
+                "prediction": round(prediction, 2),
+                "method": "matrix_factorization",
+                "model_version": model.version,
+            }
+
+    # Cold start: user or movie unknown to the model (or no model trained yet).
+    with get_db(readonly=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(PREDICT_RATING, (movie_id, user_id, movie_id))
+            predicted, based_on, _ = cur.fetchone()
+    return {
+        "user_id": user_id,
+        "movie_id": movie_id,
+        "prediction": float(predicted) if predicted is not None else None,
+        "method": "genre_overlap",
+        "based_on_movies": based_on,
+    }
 
 
 @router.get("/similar-films/{movie_id}")
-def similar_films(movie_id: int):
-    return []
+def similar_films(movie_id: int, limit: int = Query(10, ge=1, le=50)):
+    with get_db(readonly=True) as conn:
+        with float_cursor(conn, cursor_factory=RealDictCursor) as cur:
+            cur.execute(GET_MOVIE_NEIGHBOURS, (movie_id, limit))
+            rows = cur.fetchall()
+            if rows:
+                return rows
+            # Not precomputed yet (new movie, or db/compute_neighbours.py not run).
+            cur.execute(SIMILAR_FILMS, (movie_id, movie_id, movie_id, limit))
+            return [
+                {
+                    "movie_id": r["movie_id"],
+                    "title": r["title"],
+                    "release_year": r["release_year"],
+                    "poster_path": r["poster_path"],
+                    "avg_rating": r["avg_rating"],
+                    "score": None,
+                    "genre_similarity": r["genre_similarity"],
+                    "rating_similarity": r["rating_similarity"],
+                    "tag_similarity": None,
+                }
+                for r in cur.fetchall()
+            ]
@@ -1,13 +1,53 @@
-from fastapi import APIRouter
+from functools import partial
+from fastapi import APIRouter, Request
+from app.analytics.genre_correlation import cross_genre_preferences as compute_cross_genre
+from app.db import get_db
+from app.queries.genres import GET_DATASET_VERSION
+from app.queries.ratings import RATING_BIAS
+from app.utils.cache import VersionedCache
+from app.utils.encoding import EncodedCache, JSONBytes, dumps, float_cursor
+from app.utils.streaming import stream_format, stream_query, stream_rows
 
 router = APIRouter()
+_readonly_db = partial(get_db, readonly=True)
+
+# One row per user with 10+ ratings, so the encoded body is what gets cached.
+_rating_bias_cache = VersionedCache()
+_cross_genre_encoded = EncodedCache()
+
+
+def _encode_rating_bias() -> bytes:
+    with get_db(readonly=True) as conn, float_cursor(conn) as cur:
+        cur.execute(RATING_BIAS)
+        return dumps([
+            {
+                "user_id": row[0],
+                "rating_count": row[1],
+                "user_avg": row[2],
+                "global_avg": row[3],
+                "bias": row[4],
+            }
+            for row in cur.fetchall()
+        ])
 
 
 @router.get("/rating-bias")
-def rating_bias():
-    return []
+def rating_bias(request: Request):
+    fmt = stream_format(request)
+    if fmt:
+        return stream_query(fmt, RATING_BIAS, filename="rating-bias")
+    with get_db(readonly=True) as conn:
+        with conn.cursor() as cur:
+            cur.execute(GET_DATASET_VERSION, ("ratings",))
+            row = cur.fetchone()
+    version = row[0] if row else None
+    return JSONBytes(_rating_bias_cache.get_or_compute(version, _encode_rating_bias))
 
 
 @router.get("/cross-genre-preferences")
-def cross_genre_preferences():
-    return []
+def cross_genre_preferences(request: Request):
+    rows = compute_cross_genre(_readonly_db)
+    fmt = stream_format(request)
+    if fmt:
+        return stream_rows(fmt, rows, filename="cross-genre-preferences")
+    return JSONBytes(_cross_genre_encoded.encode(rows))
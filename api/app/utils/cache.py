@@ -0,0 +1,85 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small thread-safe LRU cache whose entries expire after ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def invalidate(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class VersionedCache:
+    """Holds one computed value tagged with the dataset version it came from.
+
+    ``get_or_compute`` is single-flight and runs ``compute`` outside the
+    lock.  While one caller rebuilds for a new version, the others get the
+    previous value straight away; they only wait when there is nothing
+    cached yet.  ``compute`` should open its own connection so that callers
+    waiting on a cold cache are not holding pool connections meanwhile.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._version = None
+        self._value = None
+        self._building = False
+
+    def get_or_compute(self, version, compute):
+        with self._cond:
+            while True:
+                if self._value is not None and (self._version == version or self._building):
+                    return self._value
+                if not self._building:
+                    break
+                self._cond.wait()
+            self._building = True
+        try:
+            value = compute()
+        except BaseException:
+            with self._cond:
+                self._building = False
+                self._cond.notify_all()
+            raise
+        with self._cond:
+            self._value = value
+            self._version = version
+            self._building = False
+            self._cond.notify_all()
+        return value
+
+    def clear(self):
+        with self._cond:
+            self._version = None
+            self._value = None
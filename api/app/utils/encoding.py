@@ -0,0 +1,83 @@
+"""
+Fast JSON encoding for API responses.
+
+FastJSONResponse (the app's default response class) renders with orjson
+instead of json.dumps.  FastAPI still passes every returned value through
+jsonable_encoder first, so large or hot endpoints return JSONBytes instead,
+which skips that step.  EncodedCache keeps the bytes of a cached report, so
+repeat requests do not re-encode it.
+
+float_cursor returns NUMERIC columns as float rather than Decimal, so rows
+can be serialised as fetched, without per-row conversion in the router.
+"""
+import threading
+from decimal import Decimal
+
+import orjson
+from fastapi.responses import ORJSONResponse, Response
+from psycopg2 import extensions
+
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+
+def _default(obj):
+    # Same mapping as FastAPI's decimal_encoder
+    if isinstance(obj, Decimal):
+        return int(obj) if obj.as_tuple().exponent >= 0 else float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(content) -> bytes:
+    return orjson.dumps(content, default=_default, option=ORJSON_OPTIONS)
+
+
+class FastJSONResponse(ORJSONResponse):
+    def render(self, content) -> bytes:
+        return dumps(content)
+
+
+class JSONBytes(Response):
+    """JSON response from pre-encoded bytes, or from content encoded here."""
+
+    media_type = "application/json"
+
+    def __init__(self, content, status_code: int = 200, headers: dict | None = None):
+        if not isinstance(content, (bytes, bytearray, memoryview)):
+            content = dumps(content)
+        super().__init__(content, status_code=status_code, headers=headers)
+
+
+class EncodedCache:
+    """Remembers the encoding of the last value it was given, by identity.
+
+    Versioned report caches hand back the same list object until their
+    dataset version changes, so its bytes can be reused until then.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._value = None
+        self._encoded = b""
+
+    def encode(self, value) -> bytes:
+        with self._lock:
+            if value is self._value:
+                return self._encoded
+        encoded = dumps(value)
+        with self._lock:
+            self._value, self._encoded = value, encoded
+        return encoded
+
+
+NUMERIC_AS_FLOAT = extensions.new_type(
+    extensions.DECIMAL.values,
+    "NUMERIC_AS_FLOAT",
+    lambda value, cur: float(value) if value is not None else None,
+)
+
+
+def float_cursor(conn, **kwargs):
+    """conn.cursor(**kwargs) with NUMERIC values returned as float."""
+    cur = conn.cursor(**kwargs)
+    extensions.register_type(NUMERIC_AS_FLOAT, cur)
+    return cur
@@ -0,0 +1,93 @@
+"""
+bcrypt hashing on a dedicated, bounded process pool.
+
+bcrypt is slow on purpose (a few hundred ms per hash), so running it on
+request threads lets a burst of logins hold every worker thread and stall
+unrelated requests.  Hashes run in a small pool of processes instead.  Once
+``max_queue`` jobs are waiting behind the running ones, further callers get
+HasherBusy (a 503) immediately instead of queueing without bound.
+
+This module does not import app.config, so pool workers start without the
+API's settings.
+"""
+import asyncio
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from passlib.context import CryptContext
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class HasherBusy(Exception):
+    """Too many password hashes already queued; the client should retry."""
+
+
+def hash_password_sync(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def verify_password_sync(plain: str, hashed: str) -> bool:
+    return pwd_context.verify(plain, hashed)
+
+
+class PasswordHasher:
+    """Runs the *_sync functions above on a lazily started process pool."""
+
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                # spawn, not fork: the API process holds threads and DB sockets
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    async def run(self, fn, *args):
+        with self._lock:
+            if self._in_flight >= self.workers + self.max_queue:
+                self._rejected += 1
+                raise HasherBusy(f"{self._in_flight} password hashes in progress")
+            self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        with self._lock:
+            self._completed += 1
+        return result
+
+    async def hash(self, password: str) -> str:
+        return await self.run(hash_password_sync, password)
+
+    async def verify(self, plain: str, hashed: str) -> bool:
+        return await self.run(verify_password_sync, plain, hashed)
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
@@ -2,20 +2,54 @@ from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-from passlib.context import CryptContext
+from app import metrics
 from app.config import settings
 from app.db import get_db
+from app.queries.users import GET_USER
+from app.utils.cache import TTLCache
+from app.utils.passwords import PasswordHasher
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security_scheme = HTTPBearer(auto_error=False)
 
+_hasher = PasswordHasher(workers=settings.bcrypt_workers, max_queue=settings.bcrypt_max_queue)
 
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+# user_id -> identity record for get_current_user
+_user_cache = TTLCache(maxsize=settings.user_cache_size, ttl=settings.user_cache_seconds)
 
 
-def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_context.verify(plain, hashed)
+async def hash_password(password: str) -> str:
+    return await _hasher.hash(password)
+
+
+async def verify_password(plain: str, hashed: str) -> bool:
+    return await _hasher.verify(plain, hashed)
+
+
+def close_hasher():
+    _hasher.shutdown()
+
+
+def hasher_stats() -> dict:
+    return _hasher.stats()
+
+
+def _hasher_metric(key):
+    return lambda: hasher_stats()[key]
+
+
+for _key, _kind, _help in (
+    ("in_flight", "gauge", "Password hashes running or queued."),
+    ("completed", "counter", "Password hashes and checks completed."),
+    ("rejected", "counter", "Password hashes refused because the queue was full (503)."),
+):
+    metrics.register(metrics.CallbackMetric(
+        f"password_hasher_{_key}" + ("_total" if _kind == "counter" else ""), _help, _kind, _hasher_metric(_key),
+    ))
+
+
+def invalidate_user(user_id: int):
+    """Drop a cached identity; call after updating or deleting an app_users row."""
+    _user_cache.invalidate(user_id)
 
 
 def create_access_token(user_id: int, username: str) -> str:
@@ -40,16 +74,20 @@ def get_current_user(credentials: HTTPAuthorizationCredentials | None = Depends(
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
     payload = decode_token(credentials.credentials)
     user_id = int(payload["sub"])
+    user = _user_cache.get(user_id)
+    if user is not None:
+        return dict(user)
+    # Primary, not a replica: a token issued at registration must resolve
+    # straight away.
     with get_db() as conn:
         with conn.cursor() as cur:
-            cur.execute(
-                "SELECT user_id, username, display_name FROM app_users WHERE user_id = %s",
-                (user_id,),
-            )
+            cur.execute(GET_USER, (user_id,))
             row = cur.fetchone()
     if not row:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
-    return {"user_id": row[0], "username": row[1], "display_name": row[2]}
+    user = {"user_id": row[0], "username": row[1], "display_name": row[2]}
+    _user_cache.set(user_id, user)
+    return dict(user)
 
 
 def get_optional_user(credentials: HTTPAuthorizationCredentials | None = Depends(security_scheme)):
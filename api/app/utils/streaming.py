@@ -0,0 +1,127 @@
+"""
+NDJSON / CSV variants of the report endpoints.
+
+Clients that send ``Accept: application/x-ndjson`` or ``Accept: text/csv``
+get the report as a stream.  SQL-backed reports read from a named
+(server-side) cursor ``settings.stream_chunk_rows`` rows at a time, so the
+API never holds the whole result and the first chunk goes out as soon as
+Postgres produces it.  The connection is checked out, the cursor declared
+and the first chunk fetched before the response starts, so a PoolTimeout or
+SQL error still becomes a proper error status; the connection then stays
+checked out until the stream ends, however it ends.
+"""
+import csv
+import io
+import uuid
+from contextlib import ExitStack
+
+import anyio
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from psycopg2 import extensions
+from starlette.concurrency import run_in_threadpool
+
+from app.config import settings
+from app.db import get_db
+from app.utils.encoding import NUMERIC_AS_FLOAT, dumps
+
+NDJSON = "application/x-ndjson"
+CSV = "text/csv"
+JSON = "application/json"
+
+
+def stream_format(request: Request) -> str | None:
+    """NDJSON or CSV when the Accept header prefers one over JSON, else None."""
+    best, best_q = None, 0.0
+    for part in request.headers.get("accept", "").split(","):
+        media_type, *params = [p.strip() for p in part.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type in (NDJSON, CSV, JSON) and q > best_q:
+            best, best_q = media_type, q
+    return best if best in (NDJSON, CSV) else None
+
+
+def _encode(fmt: str, columns: list[str], rows) -> bytes:
+    if fmt == NDJSON:
+        return b"".join(dumps(dict(zip(columns, row))) + b"\n" for row in rows)
+    buf = io.StringIO()
+    csv.writer(buf).writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+class _ClosingStreamingResponse(StreamingResponse):
+    """StreamingResponse that closes its chunk generator, then releases the
+    stream's connection, however sending ends.
+
+    A BackgroundTask only runs after a complete response; on a client
+    disconnect or a failed send the generator would be left suspended, and
+    a generator that never started would not run its own cleanup at all.
+    """
+
+    def __init__(self, chunks, cleanup: ExitStack | None = None, **kwargs):
+        super().__init__(chunks, **kwargs)
+        self._chunks = chunks
+        self._cleanup = cleanup
+
+    def _close(self):
+        try:
+            self._chunks.close()
+        finally:
+            if self._cleanup is not None:
+                self._cleanup.close()
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            with anyio.CancelScope(shield=True):
+                await run_in_threadpool(self._close)
+
+
+def _response(fmt: str, chunks, filename: str, cleanup: ExitStack | None = None) -> StreamingResponse:
+    headers = {}
+    if fmt == CSV:
+        headers["Content-Disposition"] = f'attachment; filename="{filename}.csv"'
+    return _ClosingStreamingResponse(chunks, cleanup, media_type=fmt, headers=headers)
+
+
+def _query_chunks(fmt: str, cur, rows):
+    # A named cursor only has a description after the first fetch
+    columns = [d.name for d in cur.description]
+    if fmt == CSV:
+        yield _encode(CSV, columns, [columns])
+    while rows:
+        yield _encode(fmt, columns, rows)
+        rows = cur.fetchmany(settings.stream_chunk_rows)
+
+
+def stream_query(fmt: str, sql: str, params=None, filename: str = "report") -> StreamingResponse:
+    """Stream sql's result in fmt, one chunk per server-side cursor fetch."""
+    with ExitStack() as stack:
+        conn = stack.enter_context(get_db(readonly=True))
+        cur = stack.enter_context(conn.cursor(name=f"stream_{uuid.uuid4().hex}"))
+        extensions.register_type(NUMERIC_AS_FLOAT, cur)
+        cur.execute(sql, params)
+        rows = cur.fetchmany(settings.stream_chunk_rows)
+        cleanup = stack.pop_all()
+    return _response(fmt, _query_chunks(fmt, cur, rows), filename, cleanup)
+
+
+def _row_chunks(fmt: str, rows: list[dict]):
+    columns = list(rows[0]) if rows else []
+    if fmt == CSV:
+        yield _encode(CSV, columns, [columns])
+    size = settings.stream_chunk_rows
+    for i in range(0, len(rows), size):
+        yield _encode(fmt, columns, ([r[c] for c in columns] for r in rows[i:i + size]))
+
+
+def stream_rows(fmt: str, rows: list[dict], filename: str = "report") -> StreamingResponse:
+    """fmt rendering of an in-memory report (e.g. a cached NumPy report)."""
+    return _response(fmt, _row_chunks(fmt, rows), filename)
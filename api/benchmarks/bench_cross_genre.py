@@ -0,0 +1,79 @@
+"""
+Benchmark the cross-genre preference report: the CROSS_GENRE_PREFERENCES
+SQL self-join versus the NumPy engine in app/analytics/genre_correlation.py.
+
+Runs against an already seeded database and also reports the largest
+absolute difference between the two results.
+
+Usage: python benchmarks/bench_cross_genre.py [--repeat 3]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import DATABASE_URL, print_table, summarize, time_calls  # noqa: E402
+from app.analytics.genre_correlation import (  # noqa: E402
+    build_report,
+    compute_cross_genre_preferences,
+    load_user_genre_totals,
+)
+from app.queries.movies import LIST_GENRES  # noqa: E402
+from app.queries.ratings import CROSS_GENRE_PREFERENCES  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor()
+
+    def run_sql():
+        cur.execute(CROSS_GENRE_PREFERENCES)
+        return cur.fetchall()
+
+    cur.execute(LIST_GENRES)
+    names = dict(cur.fetchall())
+    genre_ids = np.array(sorted(names), dtype=np.int64)
+    sums, counts = load_user_genre_totals(conn, genre_ids)
+
+    rows = []
+    for label, fn in (
+        ("SQL self-join + CORR", run_sql),
+        ("NumPy load + compute", lambda: compute_cross_genre_preferences(conn)),
+        ("NumPy compute only", lambda: build_report(genre_ids, names, sums, counts)),
+    ):
+        stats = summarize(time_calls(fn, repeat=args.repeat, warmup=1))
+        rows.append([label, stats["p50"], stats["mean"]])
+
+    started = time.perf_counter()
+    sql_rows = {(a, b): (c, n) for a, b, c, n in run_sql()}
+    engine_rows = {(r["genre_a"], r["genre_b"]): (r["correlation"], r["shared_users"])
+                   for r in build_report(genre_ids, names, sums, counts)}
+    elapsed = time.perf_counter() - started
+    conn.rollback()
+    cur.close()
+    conn.close()
+
+    print_table(["implementation", "p50 ms", "mean ms"], rows)
+    print()
+    print(f"users x genres matrix: {sums.shape[0]} x {sums.shape[1]}")
+    print(f"pairs: SQL {len(sql_rows)}, engine {len(engine_rows)}, same keys: {sql_rows.keys() == engine_rows.keys()}")
+    diffs = [
+        abs(float(sql_rows[k][0]) - engine_rows[k][0])
+        for k in sql_rows.keys() & engine_rows.keys()
+        if sql_rows[k][0] is not None and engine_rows[k][0] is not None
+    ]
+    shared_match = all(sql_rows[k][1] == engine_rows[k][1] for k in sql_rows.keys() & engine_rows.keys())
+    print(f"max |corr diff|: {max(diffs, default=0.0):.4f}  shared_users match: {shared_match}  ({elapsed:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
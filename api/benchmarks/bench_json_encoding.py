@@ -0,0 +1,96 @@
+"""
+Benchmark response encoding cost per endpoint: FastAPI's default path
+(jsonable_encoder + json.dumps over Decimal rows) versus orjson over rows
+fetched with float_cursor, both through jsonable_encoder (the
+FastJSONResponse default) and directly (JSONBytes endpoints).
+
+Only serialisation is timed; each endpoint's rows are fetched once up front.
+
+Usage: python benchmarks/bench_json_encoding.py [--repeat 20]
+"""
+import argparse
+import json
+import os
+import sys
+
+import psycopg2
+from fastapi.encoders import jsonable_encoder
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import DATABASE_URL, print_table, summarize, time_calls  # noqa: E402
+from app.analytics.genre_correlation import compute_cross_genre_preferences  # noqa: E402
+from app.analytics.personality import compute_personality_clusters  # noqa: E402
+from app.queries.genres import GENRE_POLARISATION, GENRE_POPULARITY  # noqa: E402
+from app.queries.movies import GET_MOVIE_FULL  # noqa: E402
+from app.queries.ratings import RATING_BIAS  # noqa: E402
+from app.utils.encoding import dumps, float_cursor  # noqa: E402
+
+# (endpoint, sql, params); rows are fetched as dicts, as the routers return them
+SQL_ENDPOINTS = [
+    ("/genre-popularity", GENRE_POPULARITY, None),
+    ("/genre-polarisation", GENRE_POLARISATION, None),
+    ("/movies/{id}", GET_MOVIE_FULL, (1,)),
+    ("/reports/rating-bias", RATING_BIAS, None),
+]
+
+# Computed reports are floats already; only the encoder differs
+REPORT_ENDPOINTS = [
+    ("/reports/cross-genre-preferences", compute_cross_genre_preferences),
+    ("/reports/personality-clusters", compute_personality_clusters),
+]
+
+
+def stdlib_render(content) -> bytes:
+    """What FastAPI's JSONResponse did: jsonable_encoder, then json.dumps."""
+    return json.dumps(
+        jsonable_encoder(content), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def fetch(conn, sql, params, cursor):
+    with cursor(conn, cursor_factory=RealDictCursor) as cur:
+        cur.execute(sql, params)
+        return cur.fetchall()
+
+
+def plain_cursor(conn, **kwargs):
+    return conn.cursor(**kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cases = []
+    for name, sql, params in SQL_ENDPOINTS:
+        decimal_rows = fetch(conn, sql, params, plain_cursor)
+        float_rows = fetch(conn, sql, params, float_cursor)
+        cases.append((name, decimal_rows, float_rows))
+    for name, compute in REPORT_ENDPOINTS:
+        rows = compute(conn)
+        cases.append((name, rows, rows))
+    conn.close()
+
+    rows = []
+    for name, decimal_rows, float_rows in cases:
+        size_kb = len(dumps(float_rows)) / 1024
+        before = summarize(time_calls(lambda: stdlib_render(decimal_rows), args.repeat))
+        default = summarize(time_calls(lambda: dumps(jsonable_encoder(float_rows)), args.repeat))
+        direct = summarize(time_calls(lambda: dumps(float_rows), args.repeat))
+        rows.append([
+            name, len(float_rows) if isinstance(float_rows, list) else 1, f"{size_kb:.1f}",
+            before["p50"], default["p50"], direct["p50"], f"{before['p50'] / max(direct['p50'], 1e-6):.0f}x",
+        ])
+
+    print_table(
+        ["endpoint", "rows", "KB", "stdlib ms", "orjson+encoder ms", "orjson direct ms", "speedup"],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+Benchmark the movie detail endpoint's database work: the five sequential
+per-section queries versus the single GET_MOVIE_FULL statement.
+
+Runs against an already seeded database.  Set DATABASE_URL to a server
+reached over TCP to include realistic round-trip cost.
+
+Usage: python benchmarks/bench_movie_detail.py [--movies 200] [--repeat 5]
+"""
+import argparse
+import os
+import random
+import sys
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import DATABASE_URL, print_table, summarize, time_calls  # noqa: E402
+from app.queries.movies import (  # noqa: E402
+    GET_MOVIE_CAST,
+    GET_MOVIE_CREW,
+    GET_MOVIE_DETAIL,
+    GET_MOVIE_FULL,
+    GET_MOVIE_GENRES,
+    GET_MOVIE_RATING_STATS,
+    GET_MOVIE_TAGS,
+)
+
+
+def sequential(cur, movie_id):
+    """The previous get_movie: one statement per section (plus rating stats)."""
+    cur.execute(GET_MOVIE_DETAIL, (movie_id,))
+    movie = cur.fetchone()
+    for key, sql in (
+        ("genres", GET_MOVIE_GENRES),
+        ("cast", GET_MOVIE_CAST),
+        ("crew", GET_MOVIE_CREW),
+        ("tags", GET_MOVIE_TAGS),
+        ("rating_stats", GET_MOVIE_RATING_STATS),
+    ):
+        cur.execute(sql, (movie_id,))
+        movie[key] = cur.fetchall()
+    return movie
+
+
+def single(cur, movie_id):
+    cur.execute(GET_MOVIE_FULL, (movie_id,))
+    return cur.fetchone()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    cur = conn.cursor(cursor_factory=RealDictCursor)
+    cur.execute("SELECT movie_id FROM movies ORDER BY movie_id")
+    movie_ids = [row["movie_id"] for row in cur.fetchall()]
+    if not movie_ids:
+        print("No movies loaded; seed the database first.")
+        return
+    sample = random.Random(3).sample(movie_ids, min(args.movies, len(movie_ids)))
+
+    rows = []
+    for label, fn in (("5+1 sequential queries", sequential), ("GET_MOVIE_FULL", single)):
+        samples = []
+        for movie_id in sample:
+            samples += time_calls(lambda: fn(cur, movie_id), repeat=args.repeat, warmup=1)
+        stats = summarize(samples)
+        rows.append([label, stats["n"], stats["p50"], stats["p95"], stats["p99"], stats["mean"]])
+
+    cur.close()
+    conn.close()
+    print_table(["strategy", "calls", "p50 ms", "p95 ms", "p99 ms", "mean ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Benchmark rating prediction: accuracy (RMSE on a held-out split) and per-call
+latency of the matrix factorisation model versus the PREDICT_RATING
+genre-overlap query.
+
+The model is trained here on the training split only, so nothing is written
+to the model directory.  PREDICT_RATING already excludes the target movie, so
+it is evaluated on the same held-out pairs.
+
+Usage: python benchmarks/bench_predictions.py [--holdout 0.1] [--sql-sample 500]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import DATABASE_URL, print_table, summarize, time_calls  # noqa: E402
+from app.analytics.matrix_factorization import load_ratings, train_als  # noqa: E402
+from app.queries.predictions import PREDICT_RATING  # noqa: E402
+
+
+def rmse(predicted, actual) -> float:
+    return float(np.sqrt(np.mean((np.asarray(predicted) - np.asarray(actual)) ** 2)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--holdout", type=float, default=0.1)
+    parser.add_argument("--sql-sample", type=int, default=500)
+    parser.add_argument("--factors", type=int, default=32)
+    parser.add_argument("--reg", type=float, default=0.1)
+    parser.add_argument("--iterations", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor()
+    users, movies, ratings = load_ratings(conn)
+    rng = np.random.default_rng(args.seed)
+    test = rng.random(len(ratings)) < args.holdout
+    print(f"{len(ratings)} ratings: {int((~test).sum())} train, {int(test.sum())} held out")
+
+    started = time.perf_counter()
+    model = train_als(users[~test], movies[~test], ratings[~test], factors=args.factors,
+                      reg=args.reg, iterations=args.iterations, seed=args.seed)
+    print(f"trained in {time.perf_counter() - started:.1f}s\n")
+
+    test_users, test_movies, test_ratings = users[test], movies[test], ratings[test]
+    mf = np.array([model.predict(int(u), int(m)) for u, m in zip(test_users, test_movies)], dtype=object)
+    known = np.array([p is not None for p in mf])
+    mf_known = mf[known].astype(np.float64)
+
+    # Baseline-only (mu + b_u + b_i) from the same model, for reference.
+    user_pos = np.searchsorted(model.user_ids, test_users[known])
+    item_pos = np.searchsorted(model.item_ids, test_movies[known])
+    baseline = np.clip(model.global_mean + model.user_bias[user_pos] + model.item_bias[item_pos], 0.5, 5.0)
+
+    sample = rng.choice(np.flatnonzero(known), size=min(args.sql_sample, int(known.sum())), replace=False)
+    sql_pred, sql_actual, sql_mf = [], [], []
+    for idx in sample:
+        cur.execute(PREDICT_RATING, (int(test_movies[idx]), int(test_users[idx]), int(test_movies[idx])))
+        value = cur.fetchone()[0]
+        if value is not None:
+            sql_pred.append(float(value))
+            sql_actual.append(test_ratings[idx])
+            sql_mf.append(mf[idx])
+
+    accuracy = [
+        ["global mean", rmse(np.full(known.sum(), model.global_mean), test_ratings[known]), int(known.sum())],
+        ["biases only", rmse(baseline, test_ratings[known]), int(known.sum())],
+        ["matrix factorisation", rmse(mf_known, test_ratings[known]), int(known.sum())],
+        ["genre overlap (SQL), sampled", rmse(sql_pred, sql_actual), len(sql_pred)],
+        ["matrix factorisation, same sample", rmse(np.array(sql_mf, dtype=np.float64), sql_actual), len(sql_pred)],
+    ]
+    print_table(["predictor", "RMSE", "pairs"], accuracy)
+    print(f"\nheld-out pairs outside the model (cold start): {int((~known).sum())}\n")
+
+    u, m = int(test_users[sample[0]]), int(test_movies[sample[0]])
+
+    def run_sql():
+        cur.execute(PREDICT_RATING, (m, u, m))
+        return cur.fetchone()
+
+    latency = []
+    for label, fn, repeat in (
+        ("MFModel.predict", lambda: model.predict(u, m), 10_000),
+        ("PREDICT_RATING query", run_sql, 200),
+    ):
+        stats = summarize(time_calls(fn, repeat=repeat))
+        latency.append([label, stats["p50"] * 1000, stats["p99"] * 1000])
+    print_table(["implementation", "p50 us", "p99 us"], latency)
+
+    conn.rollback()
+    cur.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
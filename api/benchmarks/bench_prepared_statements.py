@@ -0,0 +1,196 @@
+"""
+Benchmark: the prepared() query constants sent as full SQL text each time
+vs PREPAREd once and run with EXECUTE, as app/db_prepared.py does.
+
+For each statement and mode it reports client-side latency and, per call,
+the server's planning time (from EXPLAIN ANALYZE) and the CPU time of the
+backend process serving the connection.  Backend CPU is read from
+/proc/<pid>/stat, so it is only available when the benchmark runs on the
+database host; elsewhere that column shows "-".  It moves in clock ticks
+(usually 10 ms), so use a larger --repeat for the sub-millisecond lookups.
+
+Usage:
+    python benchmarks/bench_prepared_statements.py [--repeat 1000]
+    python benchmarks/bench_prepared_statements.py --plan-cache-mode force_generic_plan
+"""
+import argparse
+import os
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import DATABASE_URL, print_table, summarize, time_calls  # noqa: E402
+from app.queries import constants, is_prepared, positional  # noqa: E402
+from app.queries.genres import GET_DATASET_VERSION  # noqa: E402
+from app.queries.movies import GET_MOVIE_FULL, LIST_GENRES  # noqa: E402
+from app.queries.predictions import GET_MOVIE_NEIGHBOURS, PREDICT_RATING  # noqa: E402
+from app.queries.users import GET_LOGIN_USER, GET_USER, GET_USER_ID_BY_USERNAME  # noqa: E402
+
+SAMPLES = {
+    "popular_movie": "SELECT movie_id FROM movie_rating_summary ORDER BY rating_count DESC, movie_id LIMIT 1",
+    "rare_movie": """
+        SELECT m.movie_id FROM movies m LEFT JOIN movie_rating_summary s USING (movie_id)
+        ORDER BY COALESCE(s.rating_count, 0), m.movie_id DESC LIMIT 1
+    """,
+    "heavy_user": "SELECT user_id FROM ratings GROUP BY user_id ORDER BY COUNT(*) DESC, user_id LIMIT 1",
+    "app_user": "SELECT COALESCE(MIN(user_id), 0) FROM app_users",
+    "app_username": "SELECT COALESCE(MIN(username), 'nobody') FROM app_users",
+}
+
+# (label, constant name, sql, params from samples)
+CASES = [
+    ("GET_MOVIE_FULL[popular]", "GET_MOVIE_FULL", GET_MOVIE_FULL, lambda s: (s["popular_movie"],)),
+    ("GET_MOVIE_FULL[rare]", "GET_MOVIE_FULL", GET_MOVIE_FULL, lambda s: (s["rare_movie"],)),
+    ("LIST_GENRES", "LIST_GENRES", LIST_GENRES, lambda s: None),
+    ("GET_MOVIE_NEIGHBOURS", "GET_MOVIE_NEIGHBOURS", GET_MOVIE_NEIGHBOURS, lambda s: (s["popular_movie"], 10)),
+    ("PREDICT_RATING", "PREDICT_RATING", PREDICT_RATING,
+     lambda s: (s["rare_movie"], s["heavy_user"], s["rare_movie"])),
+    ("GET_DATASET_VERSION", "GET_DATASET_VERSION", GET_DATASET_VERSION, lambda s: ("ratings",)),
+    ("GET_USER", "GET_USER", GET_USER, lambda s: (s["app_user"],)),
+    ("GET_USER_ID_BY_USERNAME", "GET_USER_ID_BY_USERNAME", GET_USER_ID_BY_USERNAME, lambda s: (s["app_username"],)),
+    ("GET_LOGIN_USER", "GET_LOGIN_USER", GET_LOGIN_USER, lambda s: (s["app_username"],)),
+]
+
+
+def check_coverage():
+    covered = {name for _, name, _, _ in CASES}
+    missing = sorted(name for name, sql in constants().items() if is_prepared(sql) and name not in covered)
+    if missing:
+        sys.exit(f"No benchmark case covers prepared queries: {', '.join(missing)}.")
+
+
+def load_samples(conn) -> dict:
+    samples = {}
+    with conn.cursor() as cur:
+        for key, sql in SAMPLES.items():
+            cur.execute(sql)
+            row = cur.fetchone()
+            samples[key] = row[0] if row else None
+    conn.rollback()
+    return samples
+
+
+def backend_cpu(conn):
+    """Function returning the connection's backend CPU seconds, or None."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_backend_pid()")
+        pid = cur.fetchone()[0]
+    conn.rollback()
+    path = f"/proc/{pid}/stat"
+    if not os.access(path, os.R_OK):
+        return None
+    ticks = os.sysconf("SC_CLK_TCK")
+
+    def read():
+        with open(path) as f:
+            # Fields after the parenthesised command name; utime and stime
+            # are the 14th and 15th of the whole line.
+            fields = f.read().rsplit(")", 1)[1].split()
+        return (int(fields[11]) + int(fields[12])) / ticks
+
+    return read
+
+
+def planning_ms(conn, sql, params) -> float:
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0][0]
+    conn.rollback()
+    return plan.get("Planning Time", 0.0)
+
+
+def measure(conn, cpu, sql, params, repeat) -> dict:
+    def call():
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            cur.fetchall()
+        conn.rollback()
+
+    before = cpu() if cpu else None
+    samples = time_calls(call, repeat)
+    cpu_us = (cpu() - before) * 1e6 / (repeat + 2) if cpu else None
+    result = summarize(samples)
+    result["cpu_us"] = cpu_us
+    result["plan_ms"] = planning_ms(conn, sql, params)
+    return result
+
+
+def prepare(conn, name, sql) -> str:
+    """PREPARE sql as name and return the statement that executes it."""
+    body, nparams = positional(sql)
+    with conn.cursor() as cur:
+        cur.execute(f"PREPARE {name} AS {body}")
+    conn.commit()
+    args = f" ({', '.join(['%s'] * nparams)})" if nparams else ""
+    return f"EXECUTE {name}{args}"
+
+
+def plan_counts(conn, name) -> tuple[int, int]:
+    with conn.cursor() as cur:
+        cur.execute("SELECT generic_plans, custom_plans FROM pg_prepared_statements WHERE name = %s", (name,))
+        row = cur.fetchone()
+    conn.rollback()
+    return tuple(row) if row else (0, 0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument(
+        "--plan-cache-mode", default="auto",
+        choices=["auto", "force_generic_plan", "force_custom_plan"],
+        help="plan_cache_mode for the prepared runs (default: auto, as in the API)",
+    )
+    parser.add_argument("--only", help="run cases whose label contains this text")
+    args = parser.parse_args()
+
+    check_coverage()
+    conn = psycopg2.connect(args.database_url)
+    samples = load_samples(conn)
+    cpu = backend_cpu(conn)
+    if cpu is None:
+        print("Backend CPU unavailable (database not on this host); reporting latency and planning time only.\n")
+    with conn.cursor() as cur:
+        cur.execute("SET plan_cache_mode = %s", (args.plan_cache_mode,))
+    conn.commit()
+
+    rows = []
+    for i, (label, name, sql, build) in enumerate(CASES):
+        if args.only and args.only not in label:
+            continue
+        params = build(samples)
+        plain = measure(conn, cpu, sql, params, args.repeat)
+        statement = f"bench_{name.lower()}_{i}"
+        execute = prepare(conn, statement, sql)
+        prepared = measure(conn, cpu, execute, params, args.repeat)
+        generic, custom = plan_counts(conn, statement)
+        with conn.cursor() as cur:
+            cur.execute(f"DEALLOCATE {statement}")
+        conn.commit()
+
+        rows.append([
+            label,
+            plain["p50"], prepared["p50"],
+            plain["p95"], prepared["p95"],
+            f"{(1 - prepared['mean'] / plain['mean']) * 100:.0f}%",
+            plain["plan_ms"], prepared["plan_ms"],
+            *(r["cpu_us"] if r["cpu_us"] is not None else "-" for r in (plain, prepared)),
+            f"{generic}/{custom}",
+        ])
+    conn.close()
+
+    print(f"{args.repeat} calls per mode, plan_cache_mode={args.plan_cache_mode}\n")
+    print_table(
+        [
+            "case", "p50 plain", "p50 prep", "p95 plain", "p95 prep", "mean saved",
+            "plan ms plain", "plan ms prep", "cpu us plain", "cpu us prep", "generic/custom",
+        ],
+        rows,
+    )
+
+
+if __name__ == "__main__":
+    main()
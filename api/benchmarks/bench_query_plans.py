@@ -0,0 +1,488 @@
+"""
+Query-plan regression benchmark over every SQL constant in app/queries and
+the GET /api/movies listing SQL.
+
+Runs each case against a synthetic dataset (benchmarks/synthetic.py) with
+representative parameters (most / median / least rated movie, heaviest and
+lightest user, ...), records latency percentiles and plan shape from
+EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON), and compares them with a JSON
+baseline.  Exits non-zero when a case exceeds its latency budget or scans a
+table sequentially that its baseline plan reached through an index.
+
+Usage:
+    python benchmarks/bench_query_plans.py --scale small --seed     # build the dataset
+    python benchmarks/bench_query_plans.py --scale small --record   # write the baseline
+    python benchmarks/bench_query_plans.py --scale small            # check against it
+
+Baselines live in benchmarks/baselines/<scale>.json.  Recording sets each
+budget to max(p95 x --budget-factor, p95 + --budget-slack-ms); budgets can be
+edited by hand afterwards.  Every query constant must be covered by a case
+below, so a new query fails the run until it is added.
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timezone
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import DATABASE_URL, print_table, summarize, time_calls  # noqa: E402
+import synthetic  # noqa: E402
+from app.queries import constants  # noqa: E402
+from app.queries.genres import GENRE_POLARISATION, GENRE_POPULARITY, GET_DATASET_VERSION  # noqa: E402
+from app.queries.movies import (  # noqa: E402
+    GET_MOVIE_CAST,
+    GET_MOVIE_CREW,
+    GET_MOVIE_DETAIL,
+    GET_MOVIE_FULL,
+    GET_MOVIE_GENRES,
+    GET_MOVIE_RATING_STATS,
+    GET_MOVIE_TAGS,
+    LIST_GENRES,
+    SEARCH_MOVIES,
+    SEARCH_MOVIES_FUZZY,
+    SEARCH_MOVIES_GENRE_FILTER,
+    SEARCH_MOVIES_HAS_MATCH,
+    SEARCH_MOVIES_ORDER,
+    SEARCH_MOVIES_PAGINATION,
+    SEARCH_MOVIES_YEAR_FILTER,
+    list_movies_count,
+    list_movies_filters,
+    list_movies_page,
+)
+from app.queries.personality import (  # noqa: E402
+    PERSONALITY_CLUSTERS,
+    PERSONALITY_GENRE_CORRELATION,
+    PERSONALITY_PROFILE_MATRIX,
+    PERSONALITY_USER_GENRE_TOTALS,
+    PERSONALITY_USER_RATING_TOTALS,
+)
+from app.queries.predictions import (  # noqa: E402
+    GET_MOVIE_NEIGHBOURS,
+    MOVIES_LISTING_NEIGHBOURS,
+    NEIGHBOUR_MOVIE_FEATURES,
+    NEIGHBOUR_MOVIE_GENRES,
+    NEIGHBOUR_MOVIE_TAGS,
+    PREDICT_RATING,
+    SIMILAR_FILMS,
+    STALE_NEIGHBOUR_MOVIES,
+    TRAINING_RATINGS,
+)
+from app.queries.ratings import (  # noqa: E402
+    CROSS_GENRE_PREFERENCES,
+    RATING_BIAS,
+    RATING_BIAS_USER,
+    USER_GENRE_RATING_TOTALS,
+)
+from app.queries.users import GET_LOGIN_USER, GET_USER, GET_USER_ID_BY_USERNAME, INSERT_USER  # noqa: E402
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+BATCH_REPEAT = 3  # full-table reports and batch-job inputs are slow; fewer runs
+SEARCH_TERM = "love"
+FUZZY_TERM = "lvoe"
+
+# Representative parameter values, looked up once per run.  The synthetic
+# dataset is deterministic, so these are the same rows every time.
+SAMPLES = {
+    "popular_movie": """
+        SELECT movie_id FROM movie_rating_summary ORDER BY rating_count DESC, movie_id LIMIT 1
+    """,
+    "median_movie": """
+        SELECT movie_id FROM movie_rating_summary ORDER BY rating_count DESC, movie_id
+        OFFSET (SELECT COUNT(*) / 2 FROM movie_rating_summary) LIMIT 1
+    """,
+    "rare_movie": """
+        SELECT m.movie_id FROM movies m LEFT JOIN movie_rating_summary s USING (movie_id)
+        ORDER BY COALESCE(s.rating_count, 0), m.movie_id DESC LIMIT 1
+    """,
+    "heavy_user": """
+        SELECT user_id FROM ratings GROUP BY user_id ORDER BY COUNT(*) DESC, user_id LIMIT 1
+    """,
+    "light_user": """
+        SELECT user_id FROM ratings GROUP BY user_id ORDER BY COUNT(*), user_id LIMIT 1
+    """,
+    "common_genre": """
+        SELECT genre_id FROM movie_genres GROUP BY genre_id ORDER BY COUNT(*) DESC, genre_id LIMIT 1
+    """,
+    "rare_genre": """
+        SELECT genre_id FROM movie_genres GROUP BY genre_id ORDER BY COUNT(*), genre_id LIMIT 1
+    """,
+    "common_year": """
+        SELECT release_year FROM movies GROUP BY release_year ORDER BY COUNT(*) DESC, release_year LIMIT 1
+    """,
+    # Any app account; the lookups still run when there are none
+    "app_user": "SELECT COALESCE(MIN(user_id), 0) FROM app_users",
+    "app_username": "SELECT COALESCE(MIN(username), 'nobody') FROM app_users",
+    # A (avg_rating, movie_id) a thousand rows into the rating-sorted listing
+    "rating_cursor": """
+        SELECT ARRAY[avg_rating, movie_id] FROM movie_rating_summary
+         WHERE avg_rating IS NOT NULL
+         ORDER BY avg_rating DESC, movie_id DESC OFFSET 1000 LIMIT 1
+    """,
+}
+
+
+class Case:
+    """One statement with one parameter set.
+
+    build(samples) returns (sql, params); covers names the query constants
+    the statement exercises.  Batch cases stream their rows through a
+    server-side cursor and run fewer times.
+    """
+
+    def __init__(self, name, build, covers=(), batch=False):
+        self.name = name
+        self.build = build
+        self.covers = tuple(covers)
+        self.batch = batch
+
+
+def constant(name, sql, batch=False):
+    return Case(name, lambda s: (sql, None), covers=[name], batch=batch)
+
+
+def per_movie(name, sql, build_params, movies=("popular_movie", "median_movie", "rare_movie")):
+    return [
+        Case(f"{name}[{key}]", lambda s, key=key: (sql, build_params(s[key])), covers=[name])
+        for key in movies
+    ]
+
+
+def _filters(filters: dict, samples: dict) -> dict:
+    """Filter values, with sample keys replaced by the sampled value."""
+    return {k: samples[v] if isinstance(v, str) and v in samples else v for k, v in filters.items()}
+
+
+def listing(name, sort_key="title", sort_order="asc", page=1, per_page=20, after=None, **filters):
+    def build(s):
+        conditions, params = list_movies_filters(**_filters(filters, s))
+        if after:
+            value, movie_id = s[after]
+            after_row = (value, int(movie_id))
+        else:
+            after_row = None
+        return list_movies_page(conditions, params, sort_key, sort_order, per_page, page=page, after=after_row)
+    return Case(f"list_movies[{name}]", build, covers=["LIST_MOVIES_SELECT"])
+
+
+def listing_count(name, **filters):
+    def build(s):
+        conditions, params = list_movies_filters(**_filters(filters, s))
+        return list_movies_count(conditions), params
+    return Case(f"list_movies_count[{name}]", build)
+
+
+SEARCH_TAIL = SEARCH_MOVIES_ORDER + SEARCH_MOVIES_PAGINATION
+SEARCH_COVERS = ["SEARCH_MOVIES", "SEARCH_MOVIES_ORDER", "SEARCH_MOVIES_PAGINATION"]
+
+CASES = [
+    # Movie detail
+    *per_movie("GET_MOVIE_FULL", GET_MOVIE_FULL, lambda m: (m,)),
+    *per_movie("GET_MOVIE_DETAIL", GET_MOVIE_DETAIL, lambda m: (m,)),
+    *per_movie("GET_MOVIE_GENRES", GET_MOVIE_GENRES, lambda m: (m,), movies=("popular_movie",)),
+    *per_movie("GET_MOVIE_CAST", GET_MOVIE_CAST, lambda m: (m,), movies=("popular_movie",)),
+    *per_movie("GET_MOVIE_CREW", GET_MOVIE_CREW, lambda m: (m,), movies=("popular_movie",)),
+    *per_movie("GET_MOVIE_TAGS", GET_MOVIE_TAGS, lambda m: (m,)),
+    *per_movie("GET_MOVIE_RATING_STATS", GET_MOVIE_RATING_STATS, lambda m: (m,)),
+    constant("LIST_GENRES", LIST_GENRES),
+
+    # Listing (the router's dynamic SQL)
+    listing("title"),
+    listing("rating-desc", sort_key="rating", sort_order="desc"),
+    listing("year-deep-page", sort_key="year", page=50),
+    listing("rating-keyset", sort_key="rating", sort_order="desc", after="rating_cursor"),
+    listing("genre-years", sort_key="year", genre_id="common_genre", year_min=1990, year_max=2010),
+    listing("rare-genre-rating", sort_key="rating", sort_order="desc", genre_id="rare_genre"),
+    listing("title-search", q=SEARCH_TERM),
+    listing_count("all"),
+    listing_count("genre-years", genre_id="common_genre", year_min=1990, year_max=2010),
+
+    # Search
+    Case("SEARCH_MOVIES", lambda s: (SEARCH_MOVIES + SEARCH_TAIL, (SEARCH_TERM, 20, 0)), covers=SEARCH_COVERS),
+    Case(
+        "SEARCH_MOVIES[genre+year]",
+        lambda s: (
+            SEARCH_MOVIES + SEARCH_MOVIES_GENRE_FILTER + SEARCH_MOVIES_YEAR_FILTER + SEARCH_TAIL,
+            (SEARCH_TERM, s["common_genre"], s["common_year"], 20, 0),
+        ),
+        covers=SEARCH_COVERS + ["SEARCH_MOVIES_GENRE_FILTER", "SEARCH_MOVIES_YEAR_FILTER"],
+    ),
+    Case(
+        "SEARCH_MOVIES_FUZZY",
+        lambda s: (SEARCH_MOVIES_FUZZY + SEARCH_TAIL, (FUZZY_TERM, FUZZY_TERM, 20, 0)),
+        covers=["SEARCH_MOVIES_FUZZY"],
+    ),
+    Case("SEARCH_MOVIES_HAS_MATCH", lambda s: (SEARCH_MOVIES_HAS_MATCH, (SEARCH_TERM,)), covers=["SEARCH_MOVIES_HAS_MATCH"]),
+
+    # Genre and rating reports
+    constant("GENRE_POPULARITY", GENRE_POPULARITY),
+    constant("GENRE_POLARISATION", GENRE_POLARISATION),
+    Case("GET_DATASET_VERSION", lambda s: (GET_DATASET_VERSION, ("ratings",)), covers=["GET_DATASET_VERSION"]),
+    constant("RATING_BIAS", RATING_BIAS, batch=True),
+    Case("RATING_BIAS_USER[heavy_user]", lambda s: (RATING_BIAS_USER, (s["heavy_user"],)), covers=["RATING_BIAS_USER"]),
+    Case("RATING_BIAS_USER[light_user]", lambda s: (RATING_BIAS_USER, (s["light_user"],)), covers=["RATING_BIAS_USER"]),
+    constant("CROSS_GENRE_PREFERENCES", CROSS_GENRE_PREFERENCES, batch=True),
+    constant("USER_GENRE_RATING_TOTALS", USER_GENRE_RATING_TOTALS, batch=True),
+
+    # Personality reports
+    constant("PERSONALITY_GENRE_CORRELATION", PERSONALITY_GENRE_CORRELATION, batch=True),
+    constant("PERSONALITY_CLUSTERS", PERSONALITY_CLUSTERS, batch=True),
+    constant("PERSONALITY_PROFILE_MATRIX", PERSONALITY_PROFILE_MATRIX),
+    constant("PERSONALITY_USER_GENRE_TOTALS", PERSONALITY_USER_GENRE_TOTALS, batch=True),
+    constant("PERSONALITY_USER_RATING_TOTALS", PERSONALITY_USER_RATING_TOTALS, batch=True),
+
+    # Predictions
+    Case(
+        "PREDICT_RATING[heavy_user]",
+        lambda s: (PREDICT_RATING, (s["median_movie"], s["heavy_user"], s["median_movie"])),
+        covers=["PREDICT_RATING"],
+    ),
+    Case(
+        "PREDICT_RATING[light_user]",
+        lambda s: (PREDICT_RATING, (s["popular_movie"], s["light_user"], s["popular_movie"])),
+        covers=["PREDICT_RATING"],
+    ),
+    *per_movie("SIMILAR_FILMS", SIMILAR_FILMS, lambda m: (m, m, m, 10), movies=("popular_movie", "median_movie")),
+    *per_movie("GET_MOVIE_NEIGHBOURS", GET_MOVIE_NEIGHBOURS, lambda m: (m, 10), movies=("popular_movie", "median_movie")),
+
+    # Auth (every run is rolled back, so INSERT_USER leaves no account behind)
+    Case("GET_USER", lambda s: (GET_USER, (s["app_user"],)), covers=["GET_USER"]),
+    Case("GET_USER_ID_BY_USERNAME", lambda s: (GET_USER_ID_BY_USERNAME, (s["app_username"],)), covers=["GET_USER_ID_BY_USERNAME"]),
+    Case("GET_LOGIN_USER", lambda s: (GET_LOGIN_USER, (s["app_username"],)), covers=["GET_LOGIN_USER"]),
+    Case("INSERT_USER", lambda s: (INSERT_USER, (f"bench_{uuid.uuid4().hex[:12]}", "x", None)), covers=["INSERT_USER"]),
+
+    # Batch-job inputs (db/train_model.py, db/compute_neighbours.py)
+    constant("TRAINING_RATINGS", TRAINING_RATINGS, batch=True),
+    constant("NEIGHBOUR_MOVIE_FEATURES", NEIGHBOUR_MOVIE_FEATURES, batch=True),
+    constant("NEIGHBOUR_MOVIE_GENRES", NEIGHBOUR_MOVIE_GENRES, batch=True),
+    constant("NEIGHBOUR_MOVIE_TAGS", NEIGHBOUR_MOVIE_TAGS, batch=True),
+    constant("STALE_NEIGHBOUR_MOVIES", STALE_NEIGHBOUR_MOVIES, batch=True),
+    Case(
+        "MOVIES_LISTING_NEIGHBOURS",
+        lambda s: (MOVIES_LISTING_NEIGHBOURS, ([s["popular_movie"], s["median_movie"], s["rare_movie"]],)),
+        covers=["MOVIES_LISTING_NEIGHBOURS"],
+    ),
+]
+
+
+def check_coverage():
+    covered = {name for case in CASES for name in case.covers}
+    missing = sorted(set(constants()) - covered)
+    if missing:
+        sys.exit(f"No benchmark case covers: {', '.join(missing)}. Add cases to {os.path.basename(__file__)}.")
+
+
+def load_samples(conn) -> dict:
+    samples = {}
+    with conn.cursor() as cur:
+        for key, sql in SAMPLES.items():
+            cur.execute(sql)
+            row = cur.fetchone()
+            samples[key] = row[0] if row else None
+    return samples
+
+
+# ---------------------------------------------------------------------------
+# Running and plan inspection
+# ---------------------------------------------------------------------------
+
+def run_once(conn, sql, params, batch):
+    if batch:
+        # Stream through a server-side cursor; some inputs are the whole
+        # ratings table.
+        with conn.cursor(name=f"bench_{uuid.uuid4().hex}") as cur:
+            cur.itersize = 10000
+            cur.execute(sql, params)
+            for _ in cur:
+                pass
+    else:
+        with conn.cursor() as cur:
+            cur.execute(sql, params)
+            cur.fetchall()
+    conn.rollback()
+
+
+def explain(conn, sql, params) -> dict:
+    with conn.cursor() as cur:
+        cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0][0]
+    conn.rollback()
+    return plan
+
+
+def plan_summary(plan: dict) -> dict:
+    """Scan choices and the worst row misestimate in an EXPLAIN JSON plan."""
+    seq_scans, index_scans, shape = set(), set(), []
+    worst = {"node": None, "estimated": 0, "actual": 0, "factor": 1.0}
+
+    def walk(node, depth):
+        kind = node["Node Type"]
+        relation = node.get("Relation Name")
+        index = node.get("Index Name")
+        label = kind + (f" on {relation}" if relation else "") + (f" using {index}" if index else "")
+        shape.append("  " * depth + label)
+        if kind == "Seq Scan":
+            seq_scans.add(relation)
+        if index:
+            index_scans.add(index)
+        if node.get("Actual Loops"):
+            estimated, actual = node["Plan Rows"], node["Actual Rows"]
+            factor = max(estimated, 1) / max(actual, 1)
+            factor = max(factor, 1 / factor)
+            if factor > worst["factor"]:
+                worst.update(node=label, estimated=estimated, actual=actual, factor=round(factor, 1))
+        for child in node.get("Plans", ()):
+            walk(child, depth + 1)
+
+    walk(plan["Plan"], 0)
+    return {
+        "seq_scans": sorted(seq_scans),
+        "index_scans": sorted(index_scans),
+        "worst_estimate": worst,
+        "shape": shape,
+        "execution_ms": round(plan.get("Execution Time", 0.0), 3),
+    }
+
+
+def measure(conn, case, samples, repeat) -> dict:
+    sql, params = case.build(samples)
+    runs = min(repeat, BATCH_REPEAT) if case.batch else repeat
+    timings = summarize(time_calls(lambda: run_once(conn, sql, params, case.batch), runs, warmup=1))
+    result = {k: round(timings[k], 3) for k in ("p50", "p95", "p99")}
+    result.update(plan_summary(explain(conn, sql, params)))
+    return result
+
+
+# ---------------------------------------------------------------------------
+# Baselines
+# ---------------------------------------------------------------------------
+
+def budget(p95: float, factor: float, slack_ms: float) -> float:
+    return round(max(p95 * factor, p95 + slack_ms), 2)
+
+
+def compare(name, result, baseline) -> list[str]:
+    """Failures for result against its baseline entry."""
+    if baseline is None:
+        return []
+    failures = []
+    if result["p95"] > baseline["budget_ms"]:
+        failures.append(f"p95 {result['p95']:.1f} ms over budget {baseline['budget_ms']:.1f} ms")
+    flipped = sorted(set(result["seq_scans"]) - set(baseline["seq_scans"]))
+    if flipped:
+        failures.append(f"new sequential scan on {', '.join(flipped)}")
+    return failures
+
+
+def _patterns(value: str) -> list[str]:
+    return [p.strip() for p in value.split(",") if p.strip()]
+
+
+def server_version(conn) -> str:
+    with conn.cursor() as cur:
+        cur.execute("SHOW server_version")
+        return cur.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=sorted(synthetic.SCALES), default="small")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    parser.add_argument("--seed", action="store_true", help="(re)build the synthetic dataset first")
+    parser.add_argument("--record", action="store_true", help="write the baseline instead of checking it")
+    parser.add_argument("--baseline", help="baseline path (default: benchmarks/baselines/<scale>.json)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--only", help="comma-separated substrings; run matching cases only")
+    parser.add_argument("--skip", help="comma-separated substrings; skip matching cases")
+    parser.add_argument("--budget-factor", type=float, default=2.0)
+    parser.add_argument("--budget-slack-ms", type=float, default=5.0)
+    parser.add_argument("--show-plans", action="store_true", help="print the plan tree of failing cases")
+    args = parser.parse_args()
+
+    check_coverage()
+    if args.seed:
+        synthetic.seed(args.database_url, args.scale)
+
+    conn = psycopg2.connect(args.database_url)
+    scale = synthetic.dataset_scale(conn)
+    if scale != args.scale:
+        sys.exit(f"Database holds the {scale or 'unknown'} dataset, not {args.scale}; run with --seed.")
+
+    path = args.baseline or os.path.join(BASELINE_DIR, f"{args.scale}.json")
+    baseline = {}
+    if not args.record:
+        if not os.path.exists(path):
+            sys.exit(f"No baseline at {path}; run with --record first.")
+        with open(path) as f:
+            baseline = json.load(f)["cases"]
+
+    cases = CASES
+    if args.only:
+        cases = [c for c in cases if any(p in c.name for p in _patterns(args.only))]
+    if args.skip:
+        cases = [c for c in cases if not any(p in c.name for p in _patterns(args.skip))]
+
+    samples = load_samples(conn)
+    results, rows, failed = {}, [], []
+    for case in cases:
+        try:
+            result = measure(conn, case, samples, args.repeat)
+        except psycopg2.Error as e:
+            conn.rollback()
+            failed.append((case.name, [f"error: {str(e).strip().splitlines()[0]}"], None))
+            rows.append([case.name, "-", "-", "-", "-", "-", "ERROR"])
+            continue
+        expected = baseline.get(case.name)
+        if args.record:
+            result["budget_ms"] = budget(result["p95"], args.budget_factor, args.budget_slack_ms)
+        failures = compare(case.name, result, expected)
+        if failures:
+            failed.append((case.name, failures, result))
+        status = "FAIL" if failures else ("new" if not args.record and expected is None else "ok")
+        worst = result["worst_estimate"]
+        rows.append([
+            case.name, result["p50"], result["p95"],
+            (expected or result).get("budget_ms", "-"),
+            f"{len(result['seq_scans'])} seq / {len(result['index_scans'])} idx",
+            f"{worst['factor']}x" if worst["node"] else "-",
+            status,
+        ])
+        results[case.name] = result
+
+    print_table(["case", "p50 ms", "p95 ms", "budget ms", "scans", "worst est", "status"], rows)
+
+    if args.record:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        document = {
+            "scale": args.scale,
+            "seed": synthetic.SEED,
+            "postgres": server_version(conn),
+            "recorded_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "repeat": args.repeat,
+            "cases": results,
+        }
+        with open(path, "w") as f:
+            json.dump(document, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nRecorded {len(results)} case(s) to {path}")
+    else:
+        for name in sorted(set(baseline) - set(results)):
+            if not (args.only or args.skip):
+                print(f"note: baseline case {name} no longer exists")
+    conn.close()
+
+    if failed:
+        print(f"\n{len(failed)} case(s) regressed:")
+        for name, failures, result in failed:
+            print(f"  {name}: {'; '.join(failures)}")
+            if args.show_plans and result is not None:
+                print("\n".join("      " + line for line in result["shape"]))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
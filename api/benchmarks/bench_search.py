@@ -0,0 +1,141 @@
+"""
+Benchmark movie search latency as the catalogue grows.
+
+Builds synthetic catalogues in a scratch schema (default: the 9,742-movie
+ml-latest-small size and the 87,585-movie ml-32m size) and times the ranked
+full-text SEARCH_MOVIES query, the trigram SEARCH_MOVIES_FUZZY fallback and
+the previous ILIKE title/overview scan against each.
+
+Usage: python benchmarks/bench_search.py [--scales 9742,87585] [--repeat 30]
+Requires a migrated database (uses movie_search_vector() from 006).
+"""
+import argparse
+import os
+import random
+import sys
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from common import DATABASE_URL, print_table, summarize, time_calls  # noqa: E402
+from app.queries.movies import (  # noqa: E402
+    SEARCH_MOVIES,
+    SEARCH_MOVIES_FUZZY,
+    SEARCH_MOVIES_ORDER,
+    SEARCH_MOVIES_PAGINATION,
+)
+
+SCHEMA = "bench_search"
+SYLLABLES = ["ka", "lo", "mi", "ra", "ten", "vor", "sil", "dun", "bre", "fa", "gor", "hal"]
+
+# The ILIKE search this benchmark replaces.
+LEGACY_SEARCH = """
+    SELECT m.movie_id, m.title
+      FROM movies m
+     WHERE m.title ILIKE '%%' || %s || '%%'
+        OR m.overview ILIKE '%%' || %s || '%%'
+     ORDER BY m.title
+     LIMIT 20
+"""
+
+
+def vocabulary() -> list[str]:
+    return [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+
+
+def build_catalogue(cur, size: int, vocab: list[str]):
+    """(Re)create the scratch catalogue with a Zipf-like word distribution."""
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"CREATE TABLE {SCHEMA}.movies (LIKE public.movies INCLUDING DEFAULTS)")
+    cur.execute(
+        f"CREATE TABLE {SCHEMA}.movie_rating_summary "
+        f"(LIKE public.movie_rating_summary INCLUDING ALL)"
+    )
+    cur.execute("SELECT setseed(0.42)")
+    cur.execute(
+        f"""
+        INSERT INTO {SCHEMA}.movies (movie_id, title, release_year, overview, search_vector)
+        SELECT d.i, d.title, 1920 + d.i %% 100, d.overview,
+               movie_search_vector(d.title, d.tags, d.overview)
+          FROM (
+              SELECT i,
+                     (SELECT string_agg(v[x], ' ')
+                        FROM (SELECT 1 + floor(power(random(), 3) * n)::int AS x
+                                FROM generate_series(1, 1 + i %% 4)) w) AS title,
+                     (SELECT string_agg(v[x], ' ')
+                        FROM (SELECT 1 + floor(power(random(), 2) * n)::int AS x
+                                FROM generate_series(1, i %% 6)) w) AS tags,
+                     (SELECT string_agg(v[x], ' ')
+                        FROM (SELECT 1 + floor(random() * n)::int AS x
+                                FROM generate_series(1, 20 + i %% 30)) w) AS overview
+                FROM generate_series(1, %s) AS i,
+                     (SELECT %s::text[] AS v, %s AS n) AS vocab
+          ) d
+        """,
+        (size, vocab, len(vocab)),
+    )
+    cur.execute(f"CREATE INDEX ON {SCHEMA}.movies USING gin (search_vector)")
+    cur.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+    has_trgm = cur.fetchone() is not None
+    if has_trgm:
+        cur.execute(f"CREATE INDEX ON {SCHEMA}.movies USING gin (title gin_trgm_ops)")
+    cur.execute(f"ANALYZE {SCHEMA}.movies")
+    return has_trgm
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scales", default="9742,87585")
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args()
+
+    vocab = vocabulary()
+    rng = random.Random(7)
+    # Common, mid-frequency and rare words given the cubic skew above.
+    terms = [vocab[0], vocab[10], vocab[200], vocab[1500], f"{vocab[3]} {vocab[40]}"]
+    typos = [vocab[5][:-1] + "x", vocab[77][1:]]
+
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    cur = conn.cursor()
+    rows = []
+    try:
+        for size in (int(s) for s in args.scales.split(",")):
+            print(f"Building {size}-movie catalogue...")
+            has_trgm = build_catalogue(cur, size, vocab)
+            cur.execute(f"SET search_path TO {SCHEMA}, public")
+
+            def run(sql, params):
+                cur.execute(sql, params)
+                cur.fetchall()
+
+            ranked = SEARCH_MOVIES + SEARCH_MOVIES_ORDER + SEARCH_MOVIES_PAGINATION
+            fuzzy = SEARCH_MOVIES_FUZZY + SEARCH_MOVIES_ORDER + SEARCH_MOVIES_PAGINATION
+            cases = [("fulltext", ranked, [[t, 20, 0] for t in terms])]
+            cases.append(("ilike (legacy)", LEGACY_SEARCH, [[t, t] for t in terms]))
+            if has_trgm:
+                cases.append(("trigram fallback", fuzzy, [[t, t, 20, 0] for t in typos]))
+
+            for label, sql, param_sets in cases:
+                for params in param_sets:
+                    run(sql, params)
+                samples = []
+                for _ in range(args.repeat):
+                    params = rng.choice(param_sets)
+                    samples += time_calls(lambda: run(sql, params), repeat=1, warmup=0)
+                stats = summarize(samples)
+                rows.append([size, label, stats["p50"], stats["p95"], stats["mean"]])
+            cur.execute("RESET search_path")
+    finally:
+        cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+
+    print()
+    print_table(["movies", "query", "p50 ms", "p95 ms", "mean ms"], rows)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark TMDB enrichment throughput offline against benchmarks/fake_tmdb.py.
+
+Starts the fake server, then fetches the same synthetic movies with the old
+sequential loop (fixed 0.26s sleep per movie, on a small sample) and with the
+async pipeline in db/seed/load_tmdb.py at several concurrency levels.  Writes
+go to a no-op sink so only the fetch side is measured.
+
+Usage: python benchmarks/bench_tmdb_enrich.py [--movies 1000] [--server-rate 40] [--concurrency 1,8,32]
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "db", "seed"))
+
+from common import print_table  # noqa: E402
+import load_tmdb  # noqa: E402
+
+SEQUENTIAL_DELAY = 0.26  # the sleep the old loader used between movies
+
+
+def start_server(port, rate, latency_ms, error_rate):
+    proc = subprocess.Popen([
+        sys.executable, os.path.join(HERE, "fake_tmdb.py"), "--port", str(port), "--rate", str(rate),
+        "--latency-ms", str(latency_ms), "--error-rate", str(error_rate),
+    ])
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/stats", timeout=0.5)
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("fake TMDB server did not start")
+
+
+def run_sequential(movies):
+    started = time.perf_counter()
+    with httpx.Client(timeout=15) as client:
+        for _, tmdb_id in movies:
+            client.get(f"{load_tmdb.TMDB_BASE}/movie/{tmdb_id}",
+                       params={"api_key": "fake", "append_to_response": "credits"})
+            time.sleep(SEQUENTIAL_DELAY)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--movies", type=int, default=1000)
+    parser.add_argument("--sequential-sample", type=int, default=40)
+    parser.add_argument("--concurrency", default="1,8,32")
+    parser.add_argument("--server-rate", type=float, default=40.0)
+    parser.add_argument("--client-rate", type=float, default=None, help="defaults to the server rate")
+    parser.add_argument("--latency-ms", type=float, default=60.0)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    parser.add_argument("--port", type=int, default=8099)
+    args = parser.parse_args()
+
+    load_tmdb.TMDB_BASE = f"http://127.0.0.1:{args.port}/3"
+    load_tmdb.TMDB_API_KEY = "fake"
+    movies = [(i, 1000 + i) for i in range(args.movies)]
+    client_rate = args.client_rate or args.server_rate
+
+    proc = start_server(args.port, args.server_rate, args.latency_ms, args.error_rate)
+    try:
+        rows = []
+        sample = movies[:args.sequential_sample]
+        elapsed = run_sequential(sample)
+        rows.append(["sequential + sleep", len(sample), f"{len(sample) / elapsed:.1f}", "-", "-", "-"])
+
+        for concurrency in (int(c) for c in args.concurrency.split(",")):
+            before = httpx.get(f"http://127.0.0.1:{args.port}/stats").json()
+            stats = asyncio.run(load_tmdb.run_enrichment(
+                movies, lambda batch: None, concurrency=concurrency, rate=client_rate,
+            ))
+            after = httpx.get(f"http://127.0.0.1:{args.port}/stats").json()
+            elapsed = time.perf_counter() - stats.started
+            rows.append([
+                f"async x{concurrency}", len(movies), f"{stats.fetched / elapsed:.1f}",
+                stats.retries, after["throttled"] - before["throttled"], stats.failed,
+            ])
+            time.sleep(1.5)  # let the server's bucket refill between runs
+    finally:
+        proc.terminate()
+        proc.wait()
+
+    print()
+    print_table(["pipeline", "movies", "movies/s", "retries", "429s", "failed"], rows)
+    hours = 87_585 / float(rows[-1][2]) / 3600
+    print(f"\nAt the last rate, 87,585 movies would take {hours:.1f}h")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Shared helpers for the benchmark scripts.
+Each benchmark is a standalone program run from the api/ directory, e.g.
+    python benchmarks/bench_search.py
+"""
+import os
+import statistics
+import time
+
+DATABASE_URL = os.environ.get(
+    "DATABASE_URL", "postgresql://moviesdb:moviesdb@db:5432/moviesdb"
+)
+
+
+def time_calls(fn, repeat: int, warmup: int = 2) -> list[float]:
+    """Call fn() repeat times and return the wall-clock durations in ms."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    idx = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+def summarize(samples: list[float]) -> dict:
+    return {
+        "n": len(samples),
+        "mean": statistics.fmean(samples) if samples else 0.0,
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+
+
+def print_table(headers: list[str], rows: list[list]):
+    """Print rows as a fixed-width text table."""
+    cells = [[f"{c:.3f}" if isinstance(c, float) else str(c) for c in row] for row in rows]
+    widths = [max(len(h), *(len(r[i]) for r in cells)) if cells else len(h) for i, h in enumerate(headers)]
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in cells:
+        print("  ".join(c.ljust(w) for c, w in zip(row, widths)))
@@ -0,0 +1,120 @@
+"""
+Local stand-in for the TMDB /movie/{id} endpoint, for exercising the
+enrichment pipeline offline.
+
+Responses are deterministic per tmdb_id (overview, artwork, runtime, 20+ cast,
+a few key crew drawn from a shared pool of people).  The server enforces its
+own request rate and answers 429 with Retry-After when it is exceeded, adds
+per-request latency, fails a fraction of requests with 503, and returns 404
+for every 97th id.
+
+Usage: python benchmarks/fake_tmdb.py [--port 8099] [--rate 40] [--latency-ms 60] [--error-rate 0.01]
+Then point the loader at it: TMDB_BASE=http://127.0.0.1:8099/3 TMDB_API_KEY=fake
+"""
+import argparse
+import asyncio
+import random
+import time
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+PEOPLE_POOL = 50_000
+CREW_JOBS = [("Director", "Directing"), ("Screenplay", "Writing"), ("Producer", "Production"),
+             ("Executive Producer", "Production"), ("Original Music Composer", "Sound")]
+
+
+class ServerLimits:
+    def __init__(self, rate: float, latency_ms: float, error_rate: float):
+        self.rate = rate
+        self.latency = latency_ms / 1000
+        self.error_rate = error_rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.requests = 0
+        self.throttled = 0
+
+    def allow(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.requests += 1
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        self.throttled += 1
+        return False
+
+
+def movie_payload(tmdb_id: int) -> dict:
+    rng = random.Random(tmdb_id)
+    cast = [
+        {
+            "id": rng.randrange(1, PEOPLE_POOL),
+            "name": f"Actor {tmdb_id}-{i}",
+            "character": f"Character {i}",
+            "order": i,
+            "profile_path": f"/p{tmdb_id}_{i}.jpg",
+        }
+        for i in range(rng.randint(10, 40))
+    ]
+    crew = [
+        {
+            "id": rng.randrange(1, PEOPLE_POOL),
+            "name": f"Crew {tmdb_id}-{i}",
+            "job": job,
+            "department": department,
+            "profile_path": None,
+        }
+        for i, (job, department) in enumerate(rng.sample(CREW_JOBS, rng.randint(2, len(CREW_JOBS))))
+    ]
+    return {
+        "id": tmdb_id,
+        "overview": f"Synthetic overview for movie {tmdb_id}.",
+        "poster_path": f"/poster{tmdb_id}.jpg",
+        "backdrop_path": f"/backdrop{tmdb_id}.jpg",
+        "runtime": rng.randint(70, 180),
+        "budget": rng.randrange(0, 200_000_000, 1000),
+        "revenue": rng.randrange(0, 900_000_000, 1000),
+        "vote_average": round(rng.uniform(3, 9), 1),
+        "vote_count": rng.randint(0, 20_000),
+        "credits": {"cast": cast, "crew": crew},
+    }
+
+
+def create_app(limits: ServerLimits) -> FastAPI:
+    app = FastAPI()
+    app.state.limits = limits
+
+    @app.get("/3/movie/{tmdb_id}")
+    async def movie(tmdb_id: int):
+        if not limits.allow():
+            return JSONResponse({"status_code": 25}, status_code=429, headers={"Retry-After": "1"})
+        await asyncio.sleep(limits.latency)
+        if random.random() < limits.error_rate:
+            return JSONResponse({"status_code": 11}, status_code=503)
+        if tmdb_id % 97 == 0:
+            return JSONResponse({"status_code": 34}, status_code=404)
+        return movie_payload(tmdb_id)
+
+    @app.get("/stats")
+    async def stats():
+        return {"requests": limits.requests, "throttled": limits.throttled}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake TMDB server.")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--rate", type=float, default=40.0, help="allowed requests per second")
+    parser.add_argument("--latency-ms", type=float, default=60.0)
+    parser.add_argument("--error-rate", type=float, default=0.01)
+    args = parser.parse_args()
+    app = create_app(ServerLimits(args.rate, args.latency_ms, args.error_rate))
+    uvicorn.run(app, host="127.0.0.1", port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
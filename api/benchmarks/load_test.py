@@ -0,0 +1,312 @@
+"""
+End-to-end HTTP load test of a running API.
+
+Simulates users arriving at a fixed average rate (open loop: arrivals follow
+a Poisson process and do not wait for earlier users to finish), each running
+one journey that mirrors a frontend page:
+
+    dashboard       GET /genres, a /movies listing page, sometimes the next page or a search
+    movie_detail    GET /movies/{id}, then similar films
+    genre_reports   genre popularity / polarisation and the cross-genre matrix
+    rating_reports  rating bias and the personality reports
+    predictions     POST /predictions/predict and similar films
+    login           POST /auth/login (bcrypt), then GET /auth/me
+
+Journeys are picked by a weighted mix.  Reports throughput, p50/p95/p99 and
+error rate per route, excluding a warm-up period.
+
+Usage:
+    python benchmarks/load_test.py --rate 20 --duration 60 [--mix browse]
+    python benchmarks/load_test.py --rate 50 --mix dashboard=6,login=1 --json results.json
+
+Login accounts (loadtest_<n>) are registered before the run if missing.
+"""
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from common import print_table, summarize
+
+API_URL = os.environ.get("API_URL", "http://localhost:8000")
+PASSWORD = "loadtest-password"
+
+MIXES = {
+    "browse": {
+        "dashboard": 40, "movie_detail": 30, "genre_reports": 8, "rating_reports": 4,
+        "predictions": 10, "login": 8,
+    },
+    "reports": {"dashboard": 20, "genre_reports": 40, "rating_reports": 40},
+    "logins": {"dashboard": 30, "movie_detail": 20, "login": 50},
+}
+
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.journeys = Counter()
+
+    def record(self, route: str, ms: float, status):
+        self.samples[route].append(ms)
+        self.statuses[route][status] += 1
+
+
+class Context:
+    """What a journey needs: the client, sampled ids and where to record."""
+
+    def __init__(self, client, rng, movie_ids, genre_ids, accounts, max_user_id):
+        self.client = client
+        self.rng = rng
+        self.movie_ids = movie_ids
+        self.genre_ids = genre_ids
+        self.accounts = accounts
+        self.max_user_id = max_user_id
+        self.recorder = None  # None during warm-up
+
+    def for_journey(self, recorder: Recorder | None) -> "Context":
+        ctx = copy.copy(self)
+        ctx.recorder = recorder
+        return ctx
+
+    def movie(self) -> int:
+        # Skew towards the front of the list (the top-rated movies the dashboard shows first)
+        return self.movie_ids[int(len(self.movie_ids) * self.rng.random() ** 2)]
+
+    async def call(self, method: str, route: str, url: str | None = None, **kwargs):
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.client.request(method, url or route, **kwargs)
+            status = response.status_code
+        except httpx.HTTPError as e:
+            status = type(e).__name__
+        if self.recorder is not None:
+            self.recorder.record(f"{method} {route}", (time.perf_counter() - started) * 1000, status)
+        return response if response is not None and response.is_success else None
+
+
+# ---------------------------------------------------------------------------
+# Journeys
+# ---------------------------------------------------------------------------
+
+async def dashboard(ctx: Context):
+    rng = ctx.rng
+    await ctx.call("GET", "/api/genres")
+    params = {"page": 1, "per_page": 20, "sort_by": rng.choice(["title", "year", "rating"]),
+              "order": rng.choice(["asc", "desc"])}
+    if rng.random() < 0.3:
+        params["genre_id"] = rng.choice(ctx.genre_ids)
+    if rng.random() < 0.2:
+        params.update(year_min=rng.randint(1950, 2000), year_max=2023)
+    response = await ctx.call("GET", "/api/movies", params=params)
+    if response is not None and rng.random() < 0.4 and response.json().get("next_cursor"):
+        params.pop("page")
+        params.update(cursor=response.json()["next_cursor"], include_total="false")
+        await ctx.call("GET", "/api/movies", params=params)
+    if rng.random() < 0.2:
+        await ctx.call("GET", "/api/movies/search", params={"q": rng.choice(["love", "night", "star", "war", "city"])})
+
+
+async def movie_detail(ctx: Context):
+    movie_id = ctx.movie()
+    await ctx.call("GET", "/api/movies/{movie_id}", f"/api/movies/{movie_id}")
+    await ctx.call("GET", "/api/predictions/similar-films/{movie_id}", f"/api/predictions/similar-films/{movie_id}")
+
+
+async def genre_reports(ctx: Context):
+    await ctx.call("GET", "/api/genre-popularity")
+    await ctx.call("GET", "/api/genre-polarisation")
+    await ctx.call("GET", "/api/reports/cross-genre-preferences")
+
+
+async def rating_reports(ctx: Context):
+    await ctx.call("GET", "/api/reports/rating-bias")
+    await ctx.call("GET", "/api/reports/personality-genre-correlation")
+    await ctx.call("GET", "/api/reports/personality-clusters")
+
+
+async def predictions(ctx: Context):
+    movie_id = ctx.movie()
+    body = {"user_id": ctx.rng.randint(1, ctx.max_user_id), "movie_id": movie_id}
+    await ctx.call("POST", "/api/predictions/predict", json=body)
+    await ctx.call("GET", "/api/predictions/similar-films/{movie_id}", f"/api/predictions/similar-films/{movie_id}")
+
+
+async def login(ctx: Context):
+    username = ctx.rng.choice(ctx.accounts)
+    response = await ctx.call("POST", "/api/auth/login", json={"username": username, "password": PASSWORD})
+    if response is not None:
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        await ctx.call("GET", "/api/auth/me", headers=headers)
+
+
+JOURNEYS = {
+    "dashboard": dashboard,
+    "movie_detail": movie_detail,
+    "genre_reports": genre_reports,
+    "rating_reports": rating_reports,
+    "predictions": predictions,
+    "login": login,
+}
+
+
+def parse_mix(value: str) -> dict[str, float]:
+    if value in MIXES:
+        return MIXES[value]
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in JOURNEYS:
+            raise argparse.ArgumentTypeError(f"unknown journey {name!r}; choose from {', '.join(JOURNEYS)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+# ---------------------------------------------------------------------------
+# Setup and arrivals
+# ---------------------------------------------------------------------------
+
+async def prepare(client, accounts: int, movie_pages: int):
+    """Movie and genre ids to sample from, and registered login accounts."""
+    genres = (await client.get("/api/genres")).raise_for_status().json()
+    movie_ids = []
+    params = {"sort_by": "rating", "order": "desc", "per_page": 100, "include_total": "false"}
+    for _ in range(movie_pages):
+        page = (await client.get("/api/movies", params=params)).raise_for_status().json()
+        movie_ids += [m["movie_id"] for m in page["movies"]]
+        if not page["next_cursor"]:
+            break
+        params["cursor"] = page["next_cursor"]
+    if not movie_ids:
+        sys.exit("The API returned no movies; seed the database first.")
+
+    usernames = [f"loadtest_{i}" for i in range(accounts)]
+    for username in usernames:
+        response = await client.post("/api/auth/register", json={"username": username, "password": PASSWORD})
+        if response.status_code not in (200, 201, 409):
+            sys.exit(f"Could not register {username}: HTTP {response.status_code}")
+    return movie_ids, [g["genre_id"] for g in genres], usernames
+
+
+async def journey(base: Context, name: str, recorder: Recorder | None):
+    started = time.perf_counter()
+    await JOURNEYS[name](base.for_journey(recorder))
+    if recorder is not None:
+        recorder.journeys[name] += 1
+        recorder.record(f"journey {name}", (time.perf_counter() - started) * 1000, "done")
+
+
+async def run(args, mix: dict[str, float]) -> tuple[Recorder, dict]:
+    rng = random.Random(args.seed)
+    limits = httpx.Limits(max_connections=args.max_in_flight, max_keepalive_connections=args.max_in_flight)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        movie_ids, genre_ids, accounts = await prepare(client, args.accounts, args.movie_pages)
+        base = Context(client, rng, movie_ids, genre_ids, accounts, args.max_user_id)
+        recorder = Recorder()
+        names, weights = list(mix), list(mix.values())
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        measure_from = start + args.warmup
+        end = measure_from + args.duration
+        next_at = start
+        in_flight: set[asyncio.Task] = set()
+        dropped = 0
+        max_lag = 0.0
+        while True:
+            next_at += rng.expovariate(args.rate)
+            if next_at >= end:
+                break
+            delay = next_at - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            else:
+                max_lag = max(max_lag, -delay)
+            if len(in_flight) >= args.max_in_flight:
+                dropped += next_at >= measure_from
+                continue
+            name = rng.choices(names, weights)[0]
+            task = asyncio.create_task(journey(base, name, recorder if next_at >= measure_from else None))
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        await asyncio.gather(*in_flight)
+        elapsed = loop.time() - measure_from
+    return recorder, {"window_seconds": elapsed, "dropped": dropped, "max_schedule_lag_ms": max_lag * 1000}
+
+
+def report(recorder: Recorder, meta: dict) -> dict:
+    window = meta["window_seconds"]
+    routes = {}
+    for route in sorted(recorder.samples, key=lambda r: (r.startswith("journey"), r)):
+        samples = recorder.samples[route]
+        statuses = recorder.statuses[route]
+        errors = sum(n for s, n in statuses.items() if not (s == "done" or (isinstance(s, int) and s < 400)))
+        stats = summarize(samples)
+        routes[route] = {
+            "count": len(samples),
+            "rps": round(len(samples) / window, 2),
+            "p50_ms": round(stats["p50"], 1),
+            "p95_ms": round(stats["p95"], 1),
+            "p99_ms": round(stats["p99"], 1),
+            "max_ms": round(max(samples), 1),
+            "errors": errors,
+            "error_rate": round(errors / len(samples), 4),
+            "statuses": {str(s): n for s, n in statuses.items()},
+        }
+    rows = [
+        [route, r["count"], r["rps"], r["p50_ms"], r["p95_ms"], r["p99_ms"], r["max_ms"], f"{r['error_rate']:.1%}",
+         ", ".join(f"{s}:{n}" for s, n in sorted(r["statuses"].items()) if s not in ("200", "done"))]
+        for route, r in routes.items()
+    ]
+    print_table(["route", "count", "req/s", "p50 ms", "p95 ms", "p99 ms", "max ms", "errors", "non-200"], rows)
+
+    requests = sum(r["count"] for name, r in routes.items() if not name.startswith("journey"))
+    print(f"\n{sum(recorder.journeys.values())} journeys, {requests} requests in {window:.1f}s "
+          f"({requests / window:.1f} req/s)")
+    if meta["dropped"]:
+        print(f"{meta['dropped']} arrivals dropped at --max-in-flight; the API fell behind the offered rate")
+    if meta["max_schedule_lag_ms"] > 100:
+        print(f"load generator ran up to {meta['max_schedule_lag_ms']:.0f} ms behind schedule; results understate load")
+    return {"routes": routes, "journeys": dict(recorder.journeys), "requests": requests, **meta}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--url", default=API_URL)
+    parser.add_argument("--rate", type=float, default=10.0, help="journeys started per second")
+    parser.add_argument("--duration", type=float, default=60.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=10.0, help="seconds of load before measuring")
+    parser.add_argument("--mix", type=parse_mix, default=MIXES["browse"],
+                        help=f"{' | '.join(MIXES)} or journey=weight,... (journeys: {', '.join(JOURNEYS)})")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="concurrent journeys before arrivals are dropped")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--accounts", type=int, default=20, help="login accounts to cycle through")
+    parser.add_argument("--movie-pages", type=int, default=10, help="100-movie listing pages to sample ids from")
+    parser.add_argument("--max-user-id", type=int, default=1000, help="user ids used for predictions")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="also write the results to this file")
+    args = parser.parse_args()
+
+    mix = args.mix
+    print(f"Offering {args.rate:g} journeys/s for {args.duration:g}s (+{args.warmup:g}s warm-up) to {args.url}")
+    print("Mix: " + ", ".join(f"{name}={weight:g}" for name, weight in mix.items()))
+    recorder, meta = asyncio.run(run(args, mix))
+    print()
+    results = report(recorder, meta)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"rate": args.rate, "mix": mix, **results}, f, indent=2)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,281 @@
+"""
+Deterministic synthetic MovieLens-shaped dataset for the query-plan
+benchmarks.
+
+Applies the migrations to a scratch database and fills every table the
+API reads with generated rows.  Popularity is skewed the way MovieLens is
+(a few movies and users account for most ratings), so the planner faces
+the same choices it does on the real data.  Every table is generated in
+SQL from a fixed setseed(), so the same scale produces the same rows on
+any machine with the same Postgres major version.
+
+Scales: small (100k ratings), 1m (1M ratings), 25m (25M ratings, the
+ml-25m shape).
+
+Usage: python benchmarks/synthetic.py --scale small [--database-url ...]
+
+Refuses to touch a database that already holds movies it did not generate.
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db"))
+
+from common import DATABASE_URL  # noqa: E402
+import migrate  # noqa: E402
+
+SEED = 0.42
+RATING_CHUNK = 1_000_000
+
+SCALES = {
+    "small": {
+        "movies": 2_000, "users": 1_000, "ratings": 100_000, "tags": 5_000,
+        "people": 6_000, "personality_users": 300, "personality_ratings": 20_000,
+    },
+    "1m": {
+        "movies": 10_000, "users": 6_000, "ratings": 1_000_000, "tags": 50_000,
+        "people": 30_000, "personality_users": 1_800, "personality_ratings": 200_000,
+    },
+    "25m": {
+        "movies": 62_000, "users": 162_000, "ratings": 25_000_000, "tags": 1_000_000,
+        "people": 200_000, "personality_users": 1_800, "personality_ratings": 1_000_000,
+    },
+}
+
+GENRES = [
+    "Action", "Adventure", "Animation", "Children", "Comedy", "Crime", "Documentary",
+    "Drama", "Fantasy", "Film-Noir", "Horror", "IMAX", "Musical", "Mystery", "Romance",
+    "Sci-Fi", "Thriller", "War", "Western",
+]
+
+# Title / tag / name vocabularies; titles are two or three of these words.
+WORDS = [
+    "love", "night", "dark", "last", "city", "story", "man", "woman", "war", "king",
+    "dead", "house", "girl", "world", "time", "home", "blood", "star", "day", "life",
+    "secret", "lost", "return", "island", "heart", "dream", "road", "fire", "ghost", "game",
+    "river", "summer", "winter", "shadow", "stranger", "empire", "journey", "ocean", "moon", "silent",
+]
+TAGS = [
+    "atmospheric", "based on a book", "classic", "dark comedy", "dystopia", "funny", "twist ending",
+    "visually appealing", "thought-provoking", "predictable", "cult film", "satire", "romance",
+    "slow", "beautiful", "violence", "music", "sci-fi", "surreal", "overrated",
+]
+FIRST_NAMES = ["Ana", "Ben", "Chen", "Dara", "Eli", "Fay", "Gus", "Hana", "Ivo", "Jun", "Kai", "Lea"]
+LAST_NAMES = ["Abe", "Bauer", "Costa", "Diaz", "Evans", "Fox", "Gray", "Holm", "Ito", "Jones", "Kim", "Lund"]
+
+# Parameters are bound from the scale entry; each statement runs after its
+# own setseed() so adding a table does not reshuffle the others.
+STATEMENTS = [
+    ("genres", """
+        INSERT INTO genres (name) SELECT unnest(%(genres)s::text[])
+    """),
+    ("movies", """
+        INSERT INTO movies (movie_id, title, release_year, runtime_minutes, overview, poster_path,
+                            budget, revenue, imdb_id, tmdb_id, tmdb_vote_avg, tmdb_vote_count,
+                            imdb_rating, rotten_tomatoes_score)
+        SELECT i,
+               initcap(w[1 + floor(random() * n)::int] || ' ' || w[1 + floor(random() * n)::int]
+                       || CASE WHEN random() < 0.3 THEN ' ' || w[1 + floor(random() * n)::int] ELSE '' END),
+               2023 - floor(power(random(), 1.5) * 100)::int,
+               80 + floor(random() * 100)::int,
+               'A ' || w[1 + floor(random() * n)::int] || ' about the ' || w[1 + floor(random() * n)::int]
+                   || ' and the ' || w[1 + floor(random() * n)::int] || '.',
+               CASE WHEN random() < 0.8 THEN '/poster' || i || '.jpg' END,
+               floor(random() * 2e8)::bigint,
+               floor(random() * 5e8)::bigint,
+               'tt' || lpad(i::text, 7, '0'),
+               100000 + i,
+               round((3 + random() * 6)::numeric, 1),
+               floor(random() * 20000)::int,
+               round((3 + random() * 6)::numeric, 1),
+               CASE WHEN random() < 0.5 THEN floor(random() * 101)::int END
+          FROM generate_series(1, %(movies)s) AS i,
+               (SELECT %(words)s::text[] AS w, cardinality(%(words)s::text[]) AS n) v
+    """),
+    ("movie_genres", """
+        INSERT INTO movie_genres (movie_id, genre_id)
+        SELECT DISTINCT m, g
+          FROM generate_series(1, %(movies)s) AS m
+         CROSS JOIN LATERAL (
+               SELECT 1 + floor(power(random(), 1.5) * %(genre_count)s)::int + 0 * m AS g
+                 FROM generate_series(1, 1 + m %% 3)
+         ) x
+    """),
+    ("people", """
+        INSERT INTO people (person_id, name, tmdb_id)
+        SELECT i,
+               (%(first)s::text[])[1 + floor(random() * cardinality(%(first)s::text[]))::int] || ' '
+                   || (%(last)s::text[])[1 + floor(random() * cardinality(%(last)s::text[]))::int] || ' ' || i,
+               500000 + i
+          FROM generate_series(1, %(people)s) AS i
+    """),
+    ("movie_cast", """
+        INSERT INTO movie_cast (movie_id, person_id, "character", cast_order)
+        SELECT m, p, 'Character ' || row_number() OVER w, row_number() OVER w - 1
+          FROM (SELECT DISTINCT m, 1 + floor(power(random(), 2) * %(people)s)::int + 0 * m AS p
+                  FROM generate_series(1, %(movies)s) AS m,
+                       generate_series(1, 3 + m %% 6)) c
+        WINDOW w AS (PARTITION BY m ORDER BY p)
+    """),
+    ("movie_crew", """
+        INSERT INTO movie_crew (movie_id, person_id, job, department)
+        SELECT DISTINCT m, p, job,
+               CASE job WHEN 'Director' THEN 'Directing' WHEN 'Screenplay' THEN 'Writing' ELSE 'Production' END
+          FROM (SELECT m,
+                       1 + floor(random() * %(people)s)::int + 0 * m AS p,
+                       (ARRAY['Director', 'Screenplay', 'Producer'])[j] AS job
+                  FROM generate_series(1, %(movies)s) AS m,
+                       generate_series(1, 1 + m %% 3) AS j) c
+    """),
+    ("ratings", """
+        INSERT INTO ratings (user_id, movie_id, rating, rated_at)
+        SELECT u, m,
+               -- per-movie quality and per-user leniency offsets, plus noise
+               LEAST(5.0, GREATEST(0.5, round((3.5 + (m * 7919 %% 101) / 50.0 - 1.0
+                                                   + (u * 31 %% 41) / 40.0 - 0.5
+                                                   + (random() + random() + random() - 1.5) * 1.2) * 2) / 2)),
+               rated_at
+          FROM (SELECT 1 + floor(power(random(), 1.8) * %(users)s)::int AS u,
+                       1 + floor(power(random(), 2.5) * %(movies)s)::int AS m,
+                       timestamp '1996-01-01' + random() * interval '27 years' AS rated_at
+                  FROM generate_series(1, %(chunk)s)) r
+    """),
+    ("tags", """
+        INSERT INTO tags (user_id, movie_id, tag, created_at)
+        SELECT 1 + floor(power(random(), 1.8) * %(users)s)::int,
+               1 + floor(power(random(), 2.5) * %(movies)s)::int,
+               (%(tag_words)s::text[])[1 + floor(random() * cardinality(%(tag_words)s::text[]))::int],
+               timestamp '2006-01-01' + random() * interval '17 years'
+          FROM generate_series(1, %(tags)s)
+    """),
+    ("personality_profiles", """
+        INSERT INTO personality_profiles (user_id, openness, agreeableness, emotional_stability,
+                                          conscientiousness, extraversion, assigned_metric, assigned_condition)
+        SELECT i,
+               round((1 + random() * 6)::numeric, 4),
+               round((1 + random() * 6)::numeric, 4),
+               round((1 + random() * 6)::numeric, 4),
+               round((1 + random() * 6)::numeric, 4),
+               round((1 + random() * 6)::numeric, 4),
+               (ARRAY['serendipity', 'popularity', 'diversity', 'all'])[1 + i %% 4],
+               (ARRAY['high', 'medium', 'low', 'default'])[1 + (i / 4) %% 4]
+          FROM generate_series(1, %(personality_users)s) AS i
+    """),
+    ("personality_ratings", """
+        INSERT INTO personality_ratings (user_id, movie_id, rating, rated_at)
+        SELECT 1 + floor(random() * %(personality_users)s)::int,
+               1 + floor(power(random(), 2.5) * %(movies)s)::int,
+               1 + floor(random() * 9)::int * 0.5,
+               timestamp '2015-01-01' + random() * interval '3 years'
+          FROM generate_series(1, %(personality_ratings)s)
+        ON CONFLICT (user_id, movie_id) DO NOTHING
+    """),
+    # Stand-in for db/compute_neighbours.py: 20 neighbours per rated movie.
+    ("movie_neighbours", """
+        INSERT INTO movie_neighbours (movie_id, rank, neighbour_id, score,
+                                      genre_similarity, rating_similarity, tag_similarity)
+        SELECT s.movie_id, r,
+               1 + (s.movie_id + floor(random() * (%(movies)s - 1))::int) %% %(movies)s,
+               1 - r * 0.03, random(), random(), random()
+          FROM movie_rating_summary s,
+               generate_series(1, 20) AS r
+    """),
+    # Most lists are current; every 20th movie's totals have moved on.
+    ("movie_neighbour_state", """
+        INSERT INTO movie_neighbour_state (movie_id, rating_count, rating_sum)
+        SELECT movie_id,
+               rating_count - CASE WHEN movie_id %% 20 = 0 THEN 1 ELSE 0 END,
+               rating_sum
+          FROM movie_rating_summary
+    """),
+]
+
+MARKER_TABLE = """
+    CREATE TABLE IF NOT EXISTS bench_dataset (
+        scale     TEXT      NOT NULL,
+        seed      FLOAT8    NOT NULL,
+        seeded_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+"""
+
+RESET = """
+    TRUNCATE movies, genres, people, personality_profiles, ratings, tags,
+             dataset_versions, bench_dataset
+    RESTART IDENTITY CASCADE
+"""
+
+
+def dataset_scale(conn) -> str | None:
+    """Scale recorded by seed(), or None for a database seeded some other way."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass('bench_dataset') IS NOT NULL")
+        if not cur.fetchone()[0]:
+            return None
+        cur.execute("SELECT scale FROM bench_dataset")
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def _check_scratch(conn):
+    with conn.cursor() as cur:
+        cur.execute("SELECT EXISTS (SELECT 1 FROM movies)")
+        has_movies = cur.fetchone()[0]
+    if has_movies and dataset_scale(conn) is None:
+        sys.exit("Refusing to seed: the database holds movies not generated by this script. "
+                 "Point --database-url at a scratch database.")
+
+
+def seed(database_url: str, scale: str):
+    """Migrate database_url and replace its contents with the scale's dataset."""
+    sizes = SCALES[scale]
+    migrate.DATABASE_URL = database_url
+    migrate.run_migrations()
+
+    conn = psycopg2.connect(database_url)
+    conn.autocommit = True
+    _check_scratch(conn)
+    params = dict(
+        sizes, genres=GENRES, genre_count=len(GENRES), words=WORDS, tag_words=TAGS,
+        first=FIRST_NAMES, last=LAST_NAMES,
+    )
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(MARKER_TABLE)
+        cur.execute(RESET)
+        cur.execute("INSERT INTO dataset_versions (dataset) VALUES ('ratings'), ('personality')")
+        # Serial plans keep random() calls in a fixed order.
+        cur.execute("SET max_parallel_workers_per_gather = 0")
+        for i, (table, sql) in enumerate(STATEMENTS):
+            step = time.perf_counter()
+            cur.execute("SELECT setseed(%s)", (SEED * (i + 1) / len(STATEMENTS),))
+            if table == "ratings":
+                remaining = sizes["ratings"]
+                while remaining:
+                    chunk = min(RATING_CHUNK, remaining)
+                    cur.execute(sql, dict(params, chunk=chunk))
+                    remaining -= chunk
+            else:
+                cur.execute(sql, params)
+            cur.execute(f"SELECT COUNT(*) FROM {table}")
+            print(f"  {table:<22} {cur.fetchone()[0]:>12,} rows  {time.perf_counter() - step:6.1f}s", flush=True)
+        cur.execute("SELECT refresh_genre_rating_summary()")
+        cur.execute("INSERT INTO bench_dataset (scale, seed) VALUES (%s, %s)", (scale, SEED))
+        cur.execute("VACUUM ANALYZE")
+    conn.close()
+    print(f"Seeded {scale} dataset in {time.perf_counter() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--database-url", default=DATABASE_URL)
+    args = parser.parse_args()
+    seed(args.database_url, args.scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Precompute similar films into movie_neighbours.
+By default only movies whose ratings changed since their last run (and movies
+that list one of those as a neighbour) are recomputed; --full redoes every
+movie.  Scoring runs in vectorised blocks across a process pool.
+
+Usage: python db/compute_neighbours.py [--full] [--workers N] [--top-k 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.analytics.neighbours import MAX_WORKERS, TOP_K, compute_neighbours, load_features  # noqa: E402
+from app.queries.predictions import MOVIES_LISTING_NEIGHBOURS, STALE_NEIGHBOUR_MOVIES  # noqa: E402
+
+DATABASE_URL = os.environ.get(
+    "DATABASE_URL", "postgresql://moviesdb:moviesdb@db:5432/moviesdb"
+)
+INSERT_BATCH = 5000
+
+
+def movies_to_recompute(cur):
+    cur.execute(STALE_NEIGHBOUR_MOVIES)
+    stale = [row[0] for row in cur.fetchall()]
+    if not stale:
+        return []
+    # A changed rating average moves the movie within other movies' lists too;
+    # refresh the lists it already appears in.  New entrants elsewhere are
+    # picked up by the next --full run.
+    cur.execute(MOVIES_LISTING_NEIGHBOURS, (stale,))
+    return sorted(set(stale) | {row[0] for row in cur.fetchall()})
+
+
+def _insert_rows(cur, sql, template, rows):
+    for i in range(0, len(rows), INSERT_BATCH):
+        args = ",".join(cur.mogrify(template, row).decode() for row in rows[i:i + INSERT_BATCH])
+        cur.execute(sql.format(args))
+
+
+def write_block(cur, features, rows, result):
+    top, score, genre_sim, rating_sim, tag_sim = result
+    movie_ids = features.movie_ids
+    neighbour_rows = []
+    for r, row in enumerate(rows):
+        for rank in range(top.shape[1]):
+            n = top[r, rank]
+            if n < 0:
+                break
+            neighbour_rows.append((
+                int(movie_ids[row]), rank + 1, int(movie_ids[n]), float(score[r, rank]),
+                float(genre_sim[r, rank]), float(rating_sim[r, rank]), float(tag_sim[r, rank]),
+            ))
+    state_rows = [
+        (int(movie_ids[row]), features.rating_counts[row], features.rating_sums[row]) for row in rows
+    ]
+
+    cur.execute("DELETE FROM movie_neighbours WHERE movie_id = ANY(%s)", ([s[0] for s in state_rows],))
+    _insert_rows(
+        cur,
+        "INSERT INTO movie_neighbours (movie_id, rank, neighbour_id, score, genre_similarity,"
+        " rating_similarity, tag_similarity) VALUES {}",
+        "(%s, %s, %s, %s, %s, %s, %s)",
+        neighbour_rows,
+    )
+    _insert_rows(
+        cur,
+        "INSERT INTO movie_neighbour_state (movie_id, rating_count, rating_sum) VALUES {}"
+        " ON CONFLICT (movie_id) DO UPDATE SET rating_count = EXCLUDED.rating_count,"
+        " rating_sum = EXCLUDED.rating_sum, computed_at = NOW()",
+        "(%s, %s, %s)",
+        state_rows,
+    )
+    return len(neighbour_rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--full", action="store_true", help="recompute every movie")
+    parser.add_argument(
+        "--workers", type=int, default=min(os.cpu_count() or 1, MAX_WORKERS),
+        help=f"scoring processes, each with its own copy of the features (default: CPUs, at most {MAX_WORKERS})",
+    )
+    parser.add_argument("--top-k", type=int, default=TOP_K)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    # One snapshot for features and the stale set, so state rows match the
+    # ratings the neighbours were computed from.
+    conn.set_session(isolation_level="REPEATABLE READ")
+    cur = conn.cursor()
+
+    try:
+        started = time.perf_counter()
+        features = load_features(conn)
+        print(f"Loaded features for {len(features.movie_ids)} movies "
+              f"({features.genres.shape[1]} genres, {features.tags.shape[1]} tags) "
+              f"in {time.perf_counter() - started:.1f}s")
+
+        if args.full:
+            targets = features.movie_ids
+        else:
+            targets = np.array(movies_to_recompute(cur), dtype=np.int64)
+        if not len(targets):
+            print("Neighbours are up to date.")
+            return
+        rows = features.index_of(targets)
+        print(f"Computing top-{args.top_k} neighbours for {len(rows)} movies with {args.workers} worker(s)...")
+
+        started = time.perf_counter()
+        done = written = 0
+        for block, result in compute_neighbours(features, rows, args.top_k, args.workers):
+            written += write_block(cur, features, block, result)
+            done += len(block)
+            print(f"  {done}/{len(rows)} movies", end="\r")
+        print()
+        conn.commit()
+        elapsed = time.perf_counter() - started
+        print(f"Wrote {written} neighbour rows for {done} movies in {elapsed:.1f}s "
+              f"({done / elapsed:.0f} movies/s)")
+    except Exception as e:
+        conn.rollback()
+        print(f"Error computing neighbours: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
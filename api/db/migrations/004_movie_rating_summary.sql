@@ -0,0 +1,159 @@
+-- 004_movie_rating_summary.sql
+-- Incrementally maintained per-movie rating summary
+
+-- MovieLens ratings only take ten values (0.5 .. 5.0), so a ten-bucket
+-- histogram is enough to answer min / max / median exactly.  Bucket i
+-- (1-based) holds the number of ratings equal to i * 0.5.
+CREATE TABLE IF NOT EXISTS movie_rating_summary (
+    movie_id      INTEGER PRIMARY KEY REFERENCES movies(movie_id) ON DELETE CASCADE,
+    rating_count  BIGINT    NOT NULL DEFAULT 0,
+    rating_sum    NUMERIC   NOT NULL DEFAULT 0,
+    rating_sum_sq NUMERIC   NOT NULL DEFAULT 0,
+    histogram     INTEGER[] NOT NULL DEFAULT '{0,0,0,0,0,0,0,0,0,0}',
+    avg_rating    NUMERIC GENERATED ALWAYS AS
+                      (ROUND(rating_sum / NULLIF(rating_count, 0), 2)) STORED
+);
+
+-- Element-wise sum of two histograms.
+CREATE OR REPLACE FUNCTION rating_hist_add(a INTEGER[], b INTEGER[])
+RETURNS INTEGER[] LANGUAGE sql IMMUTABLE AS $$
+    SELECT array_agg(x + y ORDER BY i)
+      FROM unnest(a, b) WITH ORDINALITY AS u(x, y, i)
+$$;
+
+-- Value of the n-th smallest rating (1-based) described by a histogram.
+CREATE OR REPLACE FUNCTION rating_hist_nth(hist INTEGER[], n BIGINT)
+RETURNS NUMERIC LANGUAGE sql IMMUTABLE AS $$
+    SELECT b * 0.5
+      FROM (SELECT b, SUM(hist[b]) OVER (ORDER BY b) AS cum
+              FROM generate_series(1, 10) AS b) c
+     WHERE n > 0 AND cum >= n
+     ORDER BY b
+     LIMIT 1
+$$;
+
+-- Statement-level trigger body: aggregates the transition tables once per
+-- statement, so a 5,000-row batch insert costs one upsert per movie rather
+-- than one per rating.
+CREATE OR REPLACE FUNCTION movie_rating_summary_sync()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE movie_rating_summary s
+           SET rating_count  = s.rating_count - d.cnt,
+               rating_sum    = s.rating_sum - d.total,
+               rating_sum_sq = s.rating_sum_sq - d.total_sq,
+               histogram     = rating_hist_add(
+                                   s.histogram,
+                                   ARRAY(SELECT -x FROM unnest(d.hist) AS x))
+          FROM (SELECT movie_id,
+                       COUNT(*)              AS cnt,
+                       SUM(rating)           AS total,
+                       SUM(rating * rating)  AS total_sq,
+                       ARRAY[COUNT(*) FILTER (WHERE rating = 0.5),
+                             COUNT(*) FILTER (WHERE rating = 1.0),
+                             COUNT(*) FILTER (WHERE rating = 1.5),
+                             COUNT(*) FILTER (WHERE rating = 2.0),
+                             COUNT(*) FILTER (WHERE rating = 2.5),
+                             COUNT(*) FILTER (WHERE rating = 3.0),
+                             COUNT(*) FILTER (WHERE rating = 3.5),
+                             COUNT(*) FILTER (WHERE rating = 4.0),
+                             COUNT(*) FILTER (WHERE rating = 4.5),
+                             COUNT(*) FILTER (WHERE rating = 5.0)]::INTEGER[] AS hist
+                  FROM old_rows
+                 GROUP BY movie_id) d
+         WHERE s.movie_id = d.movie_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO movie_rating_summary AS s
+               (movie_id, rating_count, rating_sum, rating_sum_sq, histogram)
+        SELECT movie_id,
+               COUNT(*),
+               SUM(rating),
+               SUM(rating * rating),
+               ARRAY[COUNT(*) FILTER (WHERE rating = 0.5),
+                     COUNT(*) FILTER (WHERE rating = 1.0),
+                     COUNT(*) FILTER (WHERE rating = 1.5),
+                     COUNT(*) FILTER (WHERE rating = 2.0),
+                     COUNT(*) FILTER (WHERE rating = 2.5),
+                     COUNT(*) FILTER (WHERE rating = 3.0),
+                     COUNT(*) FILTER (WHERE rating = 3.5),
+                     COUNT(*) FILTER (WHERE rating = 4.0),
+                     COUNT(*) FILTER (WHERE rating = 4.5),
+                     COUNT(*) FILTER (WHERE rating = 5.0)]::INTEGER[]
+          FROM new_rows
+         GROUP BY movie_id
+        ON CONFLICT (movie_id) DO UPDATE
+           SET rating_count  = s.rating_count + EXCLUDED.rating_count,
+               rating_sum    = s.rating_sum + EXCLUDED.rating_sum,
+               rating_sum_sq = s.rating_sum_sq + EXCLUDED.rating_sum_sq,
+               histogram     = rating_hist_add(s.histogram, EXCLUDED.histogram);
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION movie_rating_summary_reset()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM movie_rating_summary;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_ratings_summary_insert ON ratings;
+CREATE TRIGGER trg_ratings_summary_insert
+    AFTER INSERT ON ratings
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_rating_summary_sync();
+
+DROP TRIGGER IF EXISTS trg_ratings_summary_update ON ratings;
+CREATE TRIGGER trg_ratings_summary_update
+    AFTER UPDATE ON ratings
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_rating_summary_sync();
+
+DROP TRIGGER IF EXISTS trg_ratings_summary_delete ON ratings;
+CREATE TRIGGER trg_ratings_summary_delete
+    AFTER DELETE ON ratings
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_rating_summary_sync();
+
+DROP TRIGGER IF EXISTS trg_ratings_summary_truncate ON ratings;
+CREATE TRIGGER trg_ratings_summary_truncate
+    AFTER TRUNCATE ON ratings
+    FOR EACH STATEMENT EXECUTE FUNCTION movie_rating_summary_reset();
+
+-- Backfill from ratings already loaded before this migration.
+INSERT INTO movie_rating_summary
+       (movie_id, rating_count, rating_sum, rating_sum_sq, histogram)
+SELECT movie_id,
+       COUNT(*),
+       SUM(rating),
+       SUM(rating * rating),
+       ARRAY[COUNT(*) FILTER (WHERE rating = 0.5),
+             COUNT(*) FILTER (WHERE rating = 1.0),
+             COUNT(*) FILTER (WHERE rating = 1.5),
+             COUNT(*) FILTER (WHERE rating = 2.0),
+             COUNT(*) FILTER (WHERE rating = 2.5),
+             COUNT(*) FILTER (WHERE rating = 3.0),
+             COUNT(*) FILTER (WHERE rating = 3.5),
+             COUNT(*) FILTER (WHERE rating = 4.0),
+             COUNT(*) FILTER (WHERE rating = 4.5),
+             COUNT(*) FILTER (WHERE rating = 5.0)]::INTEGER[]
+  FROM ratings
+ GROUP BY movie_id
+ON CONFLICT (movie_id) DO NOTHING;
+
+-- movie_avg_ratings now reads the summary instead of re-aggregating ratings.
+DROP VIEW IF EXISTS movie_avg_ratings;
+CREATE VIEW movie_avg_ratings AS
+SELECT
+    m.movie_id,
+    m.title,
+    COALESCE(s.rating_count, 0) AS rating_count,
+    s.avg_rating
+FROM movies m
+LEFT JOIN movie_rating_summary s ON s.movie_id = m.movie_id;
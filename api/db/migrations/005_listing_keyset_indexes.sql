@@ -0,0 +1,12 @@
+-- 005_listing_keyset_indexes.sql
+-- Composite (sort key, movie_id) indexes backing keyset pagination of
+-- GET /api/movies.  Each matches one entry of ALLOWED_SORT_COLUMNS.
+
+CREATE INDEX IF NOT EXISTS idx_movies_title_movie_id
+    ON movies(title, movie_id);
+
+CREATE INDEX IF NOT EXISTS idx_movies_release_year_movie_id
+    ON movies(release_year, movie_id);
+
+CREATE INDEX IF NOT EXISTS idx_movie_rating_summary_avg_movie_id
+    ON movie_rating_summary(avg_rating, movie_id);
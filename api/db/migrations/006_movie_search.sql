@@ -0,0 +1,82 @@
+-- 006_movie_search.sql
+-- Weighted full-text search document per movie (title > tags > overview)
+
+ALTER TABLE movies ADD COLUMN IF NOT EXISTS search_vector tsvector;
+
+CREATE OR REPLACE FUNCTION movie_search_vector(p_title TEXT, p_tags TEXT, p_overview TEXT)
+RETURNS tsvector LANGUAGE sql IMMUTABLE AS $$
+    SELECT setweight(to_tsvector('english', COALESCE(p_title, '')), 'A')
+        || setweight(to_tsvector('english', COALESCE(p_tags, '')), 'B')
+        || setweight(to_tsvector('english', COALESCE(p_overview, '')), 'C')
+$$;
+
+-- Distinct user tags of one movie, space separated.
+CREATE OR REPLACE FUNCTION movie_tag_text(p_movie_id INTEGER)
+RETURNS TEXT LANGUAGE sql STABLE AS $$
+    SELECT string_agg(DISTINCT tag, ' ')
+      FROM tags
+     WHERE movie_id = p_movie_id
+$$;
+
+-- Title / overview edits (seed loader, TMDB enrichment) rebuild the row's
+-- document in place.
+CREATE OR REPLACE FUNCTION movies_search_vector_refresh()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.search_vector := movie_search_vector(
+        NEW.title, movie_tag_text(NEW.movie_id), NEW.overview);
+    RETURN NEW;
+END;
+$$;
+
+-- Tag writes rebuild the documents of the affected movies once per statement.
+CREATE OR REPLACE FUNCTION tags_search_vector_refresh()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        UPDATE movies m
+           SET search_vector = movie_search_vector(
+                   m.title, movie_tag_text(m.movie_id), m.overview)
+         WHERE m.movie_id IN (SELECT DISTINCT movie_id FROM new_rows);
+    END IF;
+
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE movies m
+           SET search_vector = movie_search_vector(
+                   m.title, movie_tag_text(m.movie_id), m.overview)
+         WHERE m.movie_id IN (SELECT DISTINCT movie_id FROM old_rows);
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+-- Backfill before the triggers exist.
+UPDATE movies
+   SET search_vector = movie_search_vector(title, movie_tag_text(movie_id), overview);
+
+DROP TRIGGER IF EXISTS trg_movies_search_vector ON movies;
+CREATE TRIGGER trg_movies_search_vector
+    BEFORE INSERT OR UPDATE OF title, overview ON movies
+    FOR EACH ROW EXECUTE FUNCTION movies_search_vector_refresh();
+
+DROP TRIGGER IF EXISTS trg_tags_search_vector_insert ON tags;
+CREATE TRIGGER trg_tags_search_vector_insert
+    AFTER INSERT ON tags
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tags_search_vector_refresh();
+
+DROP TRIGGER IF EXISTS trg_tags_search_vector_update ON tags;
+CREATE TRIGGER trg_tags_search_vector_update
+    AFTER UPDATE ON tags
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tags_search_vector_refresh();
+
+DROP TRIGGER IF EXISTS trg_tags_search_vector_delete ON tags;
+CREATE TRIGGER trg_tags_search_vector_delete
+    AFTER DELETE ON tags
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION tags_search_vector_refresh();
+
+CREATE INDEX IF NOT EXISTS idx_movies_search_vector
+    ON movies USING gin (search_vector);
@@ -0,0 +1,236 @@
+-- 007_genre_rating_summary.sql
+-- Per-genre rating rollup and dataset version stamps
+
+-- Monotonic version per source dataset, bumped once per writing statement.
+-- API-side caches of derived reports key on these.
+CREATE TABLE IF NOT EXISTS dataset_versions (
+    dataset    TEXT PRIMARY KEY,
+    version    BIGINT    NOT NULL DEFAULT 1,
+    changed_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+INSERT INTO dataset_versions (dataset)
+VALUES ('ratings'), ('personality')
+ON CONFLICT (dataset) DO NOTHING;
+
+CREATE OR REPLACE FUNCTION bump_dataset_version()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    UPDATE dataset_versions
+       SET version = version + 1,
+           changed_at = NOW()
+     WHERE dataset = TG_ARGV[0];
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION current_dataset_version(p_dataset TEXT)
+RETURNS BIGINT LANGUAGE sql STABLE AS $$
+    SELECT version FROM dataset_versions WHERE dataset = p_dataset
+$$;
+
+-- Trigger names sort before trg_ratings_summary_*, so the version is bumped
+-- before the summaries below are stamped with it.
+DROP TRIGGER IF EXISTS trg_ratings_dataset_version ON ratings;
+CREATE TRIGGER trg_ratings_dataset_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON ratings
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_dataset_version('ratings');
+
+DROP TRIGGER IF EXISTS trg_movie_genres_dataset_version ON movie_genres;
+CREATE TRIGGER trg_movie_genres_dataset_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON movie_genres
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_dataset_version('ratings');
+
+DROP TRIGGER IF EXISTS trg_personality_profiles_dataset_version ON personality_profiles;
+CREATE TRIGGER trg_personality_profiles_dataset_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON personality_profiles
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_dataset_version('personality');
+
+DROP TRIGGER IF EXISTS trg_personality_ratings_dataset_version ON personality_ratings;
+CREATE TRIGGER trg_personality_ratings_dataset_version
+    AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON personality_ratings
+    FOR EACH STATEMENT EXECUTE FUNCTION bump_dataset_version('personality');
+
+
+-- Genre rollup: sums of movie_rating_summary over each genre's movies.
+-- movie_count counts movies in the genre with at least one rating.
+CREATE TABLE IF NOT EXISTS genre_rating_summary (
+    genre_id        INTEGER PRIMARY KEY REFERENCES genres(genre_id) ON DELETE CASCADE,
+    rating_count    BIGINT  NOT NULL DEFAULT 0,
+    rating_sum      NUMERIC NOT NULL DEFAULT 0,
+    rating_sum_sq   NUMERIC NOT NULL DEFAULT 0,
+    movie_count     INTEGER NOT NULL DEFAULT 0,
+    dataset_version BIGINT  NOT NULL DEFAULT 0
+);
+
+-- Full rebuild; cost is proportional to movie_genres, not ratings.
+CREATE OR REPLACE FUNCTION refresh_genre_rating_summary()
+RETURNS void LANGUAGE sql AS $$
+    DELETE FROM genre_rating_summary;
+    INSERT INTO genre_rating_summary
+           (genre_id, rating_count, rating_sum, rating_sum_sq, movie_count, dataset_version)
+    SELECT mg.genre_id,
+           SUM(s.rating_count),
+           SUM(s.rating_sum),
+           SUM(s.rating_sum_sq),
+           COUNT(*) FILTER (WHERE s.rating_count > 0),
+           current_dataset_version('ratings')
+      FROM movie_genres mg
+      JOIN movie_rating_summary s USING (movie_id)
+     GROUP BY mg.genre_id;
+$$;
+
+-- Applies movie-level summary changes to the genres of each movie.
+CREATE OR REPLACE FUNCTION genre_rating_summary_sync()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE genre_rating_summary g
+           SET rating_count    = g.rating_count - d.cnt,
+               rating_sum      = g.rating_sum - d.total,
+               rating_sum_sq   = g.rating_sum_sq - d.total_sq,
+               movie_count     = g.movie_count - d.rated,
+               dataset_version = current_dataset_version('ratings')
+          FROM (SELECT mg.genre_id,
+                       SUM(o.rating_count)                        AS cnt,
+                       SUM(o.rating_sum)                          AS total,
+                       SUM(o.rating_sum_sq)                       AS total_sq,
+                       COUNT(*) FILTER (WHERE o.rating_count > 0) AS rated
+                  FROM old_rows o
+                  JOIN movie_genres mg USING (movie_id)
+                 GROUP BY mg.genre_id) d
+         WHERE g.genre_id = d.genre_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO genre_rating_summary AS g
+               (genre_id, rating_count, rating_sum, rating_sum_sq, movie_count, dataset_version)
+        SELECT mg.genre_id,
+               SUM(n.rating_count),
+               SUM(n.rating_sum),
+               SUM(n.rating_sum_sq),
+               COUNT(*) FILTER (WHERE n.rating_count > 0),
+               current_dataset_version('ratings')
+          FROM new_rows n
+          JOIN movie_genres mg USING (movie_id)
+         GROUP BY mg.genre_id
+        ON CONFLICT (genre_id) DO UPDATE
+           SET rating_count    = g.rating_count + EXCLUDED.rating_count,
+               rating_sum      = g.rating_sum + EXCLUDED.rating_sum,
+               rating_sum_sq   = g.rating_sum_sq + EXCLUDED.rating_sum_sq,
+               movie_count     = g.movie_count + EXCLUDED.movie_count,
+               dataset_version = EXCLUDED.dataset_version;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+-- Adding / removing a genre link moves the movie's whole summary in or out.
+CREATE OR REPLACE FUNCTION genre_rating_summary_links_sync()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        UPDATE genre_rating_summary g
+           SET rating_count    = g.rating_count - d.cnt,
+               rating_sum      = g.rating_sum - d.total,
+               rating_sum_sq   = g.rating_sum_sq - d.total_sq,
+               movie_count     = g.movie_count - d.rated,
+               dataset_version = current_dataset_version('ratings')
+          FROM (SELECT o.genre_id,
+                       SUM(s.rating_count)                        AS cnt,
+                       SUM(s.rating_sum)                          AS total,
+                       SUM(s.rating_sum_sq)                       AS total_sq,
+                       COUNT(*) FILTER (WHERE s.rating_count > 0) AS rated
+                  FROM old_rows o
+                  JOIN movie_rating_summary s USING (movie_id)
+                 GROUP BY o.genre_id) d
+         WHERE g.genre_id = d.genre_id;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        INSERT INTO genre_rating_summary AS g
+               (genre_id, rating_count, rating_sum, rating_sum_sq, movie_count, dataset_version)
+        SELECT n.genre_id,
+               SUM(s.rating_count),
+               SUM(s.rating_sum),
+               SUM(s.rating_sum_sq),
+               COUNT(*) FILTER (WHERE s.rating_count > 0),
+               current_dataset_version('ratings')
+          FROM new_rows n
+          JOIN movie_rating_summary s USING (movie_id)
+         GROUP BY n.genre_id
+        ON CONFLICT (genre_id) DO UPDATE
+           SET rating_count    = g.rating_count + EXCLUDED.rating_count,
+               rating_sum      = g.rating_sum + EXCLUDED.rating_sum,
+               rating_sum_sq   = g.rating_sum_sq + EXCLUDED.rating_sum_sq,
+               movie_count     = g.movie_count + EXCLUDED.movie_count,
+               dataset_version = EXCLUDED.dataset_version;
+    END IF;
+
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION genre_rating_summary_reset()
+RETURNS TRIGGER LANGUAGE plpgsql AS $$
+BEGIN
+    DELETE FROM genre_rating_summary;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS trg_movie_rating_summary_genres_insert ON movie_rating_summary;
+CREATE TRIGGER trg_movie_rating_summary_genres_insert
+    AFTER INSERT ON movie_rating_summary
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION genre_rating_summary_sync();
+
+DROP TRIGGER IF EXISTS trg_movie_rating_summary_genres_update ON movie_rating_summary;
+CREATE TRIGGER trg_movie_rating_summary_genres_update
+    AFTER UPDATE ON movie_rating_summary
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION genre_rating_summary_sync();
+
+DROP TRIGGER IF EXISTS trg_movie_rating_summary_genres_delete ON movie_rating_summary;
+CREATE TRIGGER trg_movie_rating_summary_genres_delete
+    AFTER DELETE ON movie_rating_summary
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION genre_rating_summary_sync();
+
+DROP TRIGGER IF EXISTS trg_movie_genres_summary_insert ON movie_genres;
+CREATE TRIGGER trg_movie_genres_summary_insert
+    AFTER INSERT ON movie_genres
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION genre_rating_summary_links_sync();
+
+DROP TRIGGER IF EXISTS trg_movie_genres_summary_update ON movie_genres;
+CREATE TRIGGER trg_movie_genres_summary_update
+    AFTER UPDATE ON movie_genres
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION genre_rating_summary_links_sync();
+
+DROP TRIGGER IF EXISTS trg_movie_genres_summary_delete ON movie_genres;
+CREATE TRIGGER trg_movie_genres_summary_delete
+    AFTER DELETE ON movie_genres
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION genre_rating_summary_links_sync();
+
+DROP TRIGGER IF EXISTS trg_movie_genres_summary_truncate ON movie_genres;
+CREATE TRIGGER trg_movie_genres_summary_truncate
+    AFTER TRUNCATE ON movie_genres
+    FOR EACH STATEMENT EXECUTE FUNCTION genre_rating_summary_reset();
+
+SELECT refresh_genre_rating_summary();
+
+-- genre_popularity view now reads the rollup instead of every rating.
+DROP VIEW IF EXISTS genre_popularity;
+CREATE VIEW genre_popularity AS
+SELECT
+    g.genre_id,
+    g.name AS genre_name,
+    (SELECT COUNT(*) FROM movie_genres mg WHERE mg.genre_id = g.genre_id) AS movie_count,
+    COALESCE(s.rating_count, 0) AS total_ratings,
+    ROUND(s.rating_sum / NULLIF(s.rating_count, 0), 2) AS avg_rating
+FROM genres g
+LEFT JOIN genre_rating_summary s ON s.genre_id = g.genre_id;
@@ -0,0 +1,28 @@
+-- 008_movie_neighbours.sql
+-- Precomputed top-K similar films, written by db/compute_neighbours.py
+
+-- One row per (movie, rank); GET /api/predictions/similar-films/{id} is a
+-- primary-key range scan.  Component similarities are kept for display.
+CREATE TABLE IF NOT EXISTS movie_neighbours (
+    movie_id          INTEGER  NOT NULL REFERENCES movies(movie_id) ON DELETE CASCADE,
+    rank              SMALLINT NOT NULL,
+    neighbour_id      INTEGER  NOT NULL REFERENCES movies(movie_id) ON DELETE CASCADE,
+    score             REAL     NOT NULL,
+    genre_similarity  REAL     NOT NULL,
+    rating_similarity REAL     NOT NULL,
+    tag_similarity    REAL     NOT NULL,
+    PRIMARY KEY (movie_id, rank)
+);
+
+-- Incremental runs also refresh movies that list a changed movie.
+CREATE INDEX IF NOT EXISTS idx_movie_neighbours_neighbour_id
+    ON movie_neighbours(neighbour_id);
+
+-- Rating totals each movie's neighbour list was computed from.  A movie
+-- whose movie_rating_summary no longer matches is due for recompute.
+CREATE TABLE IF NOT EXISTS movie_neighbour_state (
+    movie_id     INTEGER   PRIMARY KEY REFERENCES movies(movie_id) ON DELETE CASCADE,
+    rating_count BIGINT    NOT NULL,
+    rating_sum   NUMERIC   NOT NULL,
+    computed_at  TIMESTAMP NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,28 @@
+-- 009_people_tmdb_id.sql
+-- One person per TMDB id, so credits can be upserted with ON CONFLICT (tmdb_id)
+
+-- Fold any duplicates left by the old select-then-insert loader into the
+-- lowest person_id before the index is built.
+CREATE TEMP TABLE people_duplicates AS
+SELECT person_id, MIN(person_id) OVER (PARTITION BY tmdb_id) AS keep_id
+  FROM people
+ WHERE tmdb_id IS NOT NULL;
+
+DELETE FROM people_duplicates WHERE person_id = keep_id;
+
+INSERT INTO movie_cast (movie_id, person_id, "character", cast_order)
+SELECT c.movie_id, d.keep_id, c."character", c.cast_order
+  FROM movie_cast c JOIN people_duplicates d ON d.person_id = c.person_id
+ON CONFLICT DO NOTHING;
+
+INSERT INTO movie_crew (movie_id, person_id, job, department)
+SELECT c.movie_id, d.keep_id, c.job, c.department
+  FROM movie_crew c JOIN people_duplicates d ON d.person_id = c.person_id
+ON CONFLICT DO NOTHING;
+
+-- movie_cast / movie_crew rows of the duplicates go with them (ON DELETE CASCADE)
+DELETE FROM people p USING people_duplicates d WHERE p.person_id = d.person_id;
+
+DROP TABLE people_duplicates;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_people_tmdb_id ON people(tmdb_id);
@@ -0,0 +1,29 @@
+-- 010_omdb_queue.sql
+-- Persistent work queue and per-key quota ledger for db/seed/load_omdb.py
+
+-- One row per movie with an imdb_id.  status is 'pending' until OMDB answers:
+-- 'done' when it returned a record, 'missing' when it has none (never
+-- retried), 'failed' once transient errors exhaust the attempt budget.
+CREATE TABLE IF NOT EXISTS omdb_queue (
+    movie_id         INTEGER   PRIMARY KEY REFERENCES movies(movie_id) ON DELETE CASCADE,
+    imdb_id          TEXT      NOT NULL,
+    priority         BIGINT    NOT NULL DEFAULT 0,
+    status           TEXT      NOT NULL DEFAULT 'pending'
+                     CHECK (status IN ('pending', 'done', 'missing', 'failed')),
+    attempts         INTEGER   NOT NULL DEFAULT 0,
+    last_status      TEXT,
+    last_attempt_at  TIMESTAMP,
+    next_eligible_at TIMESTAMP NOT NULL DEFAULT NOW()
+);
+
+-- The scheduler reads pending work highest priority first.
+CREATE INDEX IF NOT EXISTS idx_omdb_queue_pending
+    ON omdb_queue(priority DESC, movie_id) WHERE status = 'pending';
+
+-- Requests spent per API key per UTC day; keys are stored as a short hash.
+CREATE TABLE IF NOT EXISTS omdb_key_usage (
+    key_id   TEXT    NOT NULL,
+    day      DATE    NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (key_id, day)
+);
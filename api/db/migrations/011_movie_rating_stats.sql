@@ -0,0 +1,22 @@
+-- 011_movie_rating_stats.sql
+-- Per-movie rating statistics derived from movie_rating_summary, shared by
+-- GET_MOVIE_RATING_STATS and GET_MOVIE_FULL.  A plain view over one table,
+-- so a movie_id filter is pushed down to the summary's primary key.
+
+CREATE OR REPLACE VIEW movie_rating_stats AS
+SELECT
+    s.movie_id,
+    s.rating_count AS total_ratings,
+    s.avg_rating,
+    rating_hist_nth(s.histogram, 1)              AS min_rating,
+    rating_hist_nth(s.histogram, s.rating_count) AS max_rating,
+    ROUND(
+        SQRT(
+            (s.rating_sum_sq - s.rating_sum * s.rating_sum / NULLIF(s.rating_count, 0))
+            / NULLIF(s.rating_count - 1, 0)
+        ),
+        2
+    ) AS stddev_rating,
+    (rating_hist_nth(s.histogram, (s.rating_count + 1) / 2)
+     + rating_hist_nth(s.histogram, s.rating_count / 2 + 1)) / 2 AS median_rating
+FROM movie_rating_summary s;
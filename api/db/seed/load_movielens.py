@@ -1,10 +1,17 @@
 """
 Load MovieLens small dataset into the database.
 Expects CSV files in /app/data/ (mounted from infra/data/).
+
+Usage: python db/seed/load_movielens.py [--copy]
+
+--copy streams each CSV through COPY into an unlogged staging table and merges
+it with set-based SQL; use it for the 25M / 32M datasets.
 """
+import argparse
 import csv
 import os
 import sys
+import time
 from datetime import datetime, timezone
 import psycopg2
 
@@ -156,25 +163,203 @@ def load_links(cur):
     print(f"  Updated {count} movie links.")
 
 
+# ---------------------------------------------------------------------------
+# COPY mode
+#
+# Each stage streams its CSV into an unlogged staging table with
+# COPY ... FROM STDIN (the file is read in fixed-size chunks, so memory use
+# does not grow with the file) and then merges it with one set-based
+# statement.  Merges are idempotent: re-running a stage skips rows already
+# present.
+# ---------------------------------------------------------------------------
+
+COPY_CHUNK_SIZE = 1 << 20
+
+MOVIES_STAGE = """
+    CREATE UNLOGGED TABLE IF NOT EXISTS stage_movies (
+        movie_id  INTEGER,
+        raw_title TEXT,
+        genres    TEXT
+    )
+"""
+
+# Same title / year split as load_movies: a trailing "(YYYY)" becomes the
+# release year and is removed from the title.
+MOVIES_MERGE = r"""
+    WITH parsed AS (
+        SELECT DISTINCT ON (movie_id)
+               movie_id,
+               btrim(raw_title) AS raw_title,
+               substring(btrim(raw_title) FROM '\(([^(]*)\)$') AS year_part
+          FROM stage_movies
+         ORDER BY movie_id
+    )
+    INSERT INTO movies (movie_id, title, release_year)
+    SELECT movie_id,
+           CASE WHEN btrim(year_part) ~ '^[0-9]{4}$'
+                THEN rtrim(left(raw_title, length(raw_title) - length(year_part) - 2))
+                ELSE raw_title END,
+           CASE WHEN btrim(year_part) ~ '^[0-9]{4}$'
+                THEN btrim(year_part)::int END
+      FROM parsed
+    ON CONFLICT (movie_id) DO UPDATE
+       SET title = EXCLUDED.title, release_year = EXCLUDED.release_year
+"""
+
+GENRES_MERGE = """
+    INSERT INTO genres (name)
+    SELECT DISTINCT btrim(g.name)
+      FROM stage_movies s
+     CROSS JOIN unnest(string_to_array(s.genres, '|')) AS g(name)
+     WHERE btrim(g.name) NOT IN ('', '(no genres listed)')
+    ON CONFLICT (name) DO NOTHING
+"""
+
+MOVIE_GENRES_MERGE = """
+    INSERT INTO movie_genres (movie_id, genre_id)
+    SELECT DISTINCT s.movie_id, g.genre_id
+      FROM stage_movies s
+     CROSS JOIN unnest(string_to_array(s.genres, '|')) AS n(name)
+      JOIN genres g ON g.name = btrim(n.name)
+    ON CONFLICT DO NOTHING
+"""
+
+LINKS_STAGE = """
+    CREATE UNLOGGED TABLE IF NOT EXISTS stage_links (
+        movie_id INTEGER,
+        imdb_id  TEXT,
+        tmdb_id  INTEGER
+    )
+"""
+
+# lpad truncates strings longer than the target length; ml-32m has 8-digit
+# imdbIds, so only pad the short ones (as str.zfill did).
+LINKS_MERGE = """
+    UPDATE movies m
+       SET imdb_id = 'tt' || CASE WHEN length(s.imdb_id) < 7 THEN lpad(s.imdb_id, 7, '0') ELSE s.imdb_id END,
+           tmdb_id = s.tmdb_id
+      FROM stage_links s
+     WHERE m.movie_id = s.movie_id
+"""
+
+RATINGS_STAGE = """
+    CREATE UNLOGGED TABLE IF NOT EXISTS stage_ratings (
+        user_id  INTEGER,
+        movie_id INTEGER,
+        rating   NUMERIC(2,1),
+        rated_ts BIGINT
+    )
+"""
+
+# ratings has no unique key on (user_id, movie_id), so re-runs are made
+# idempotent with an anti-join; ratings for unknown movies are dropped.
+RATINGS_MERGE = """
+    INSERT INTO ratings (user_id, movie_id, rating, rated_at)
+    SELECT s.user_id, s.movie_id, s.rating, to_timestamp(s.rated_ts) AT TIME ZONE 'UTC'
+      FROM stage_ratings s
+      JOIN movies m ON m.movie_id = s.movie_id
+     WHERE NOT EXISTS (
+               SELECT 1 FROM ratings r
+                WHERE r.user_id = s.user_id AND r.movie_id = s.movie_id
+           )
+"""
+
+TAGS_STAGE = """
+    CREATE UNLOGGED TABLE IF NOT EXISTS stage_tags (
+        user_id    INTEGER,
+        movie_id   INTEGER,
+        tag        TEXT,
+        created_ts BIGINT
+    )
+"""
+
+TAGS_MERGE = """
+    INSERT INTO tags (user_id, movie_id, tag, created_at)
+    SELECT s.user_id, s.movie_id, s.tag, to_timestamp(s.created_ts) AT TIME ZONE 'UTC'
+      FROM stage_tags s
+      JOIN movies m ON m.movie_id = s.movie_id
+     WHERE s.tag IS NOT NULL
+       AND NOT EXISTS (
+               SELECT 1 FROM tags t
+                WHERE t.user_id = s.user_id AND t.movie_id = s.movie_id
+                  AND t.tag = s.tag
+                  AND t.created_at = to_timestamp(s.created_ts) AT TIME ZONE 'UTC'
+           )
+"""
+
+
+def _rate(rows, seconds):
+    return f"{rows:,} rows in {seconds:.1f}s ({rows / seconds if seconds else 0:,.0f} rows/s)"
+
+
+def copy_stage(cur, filename, staging_table, staging_ddl, merges):
+    """COPY filename into staging_table, then run each (label, sql) merge."""
+    filepath = os.path.join(DATA_DIR, filename)
+    if not os.path.exists(filepath):
+        print(f"  [skip] {filepath} not found")
+        return
+
+    cur.execute(staging_ddl)
+    cur.execute(f"TRUNCATE {staging_table}")
+    started = time.perf_counter()
+    with open(filepath, encoding="utf-8") as f:
+        cur.copy_expert(
+            f"COPY {staging_table} FROM STDIN WITH (FORMAT csv, HEADER true)",
+            f,
+            size=COPY_CHUNK_SIZE,
+        )
+    print(f"  {filename}: copied {_rate(cur.rowcount, time.perf_counter() - started)}")
+    cur.execute(f"ANALYZE {staging_table}")
+
+    for label, sql in merges:
+        started = time.perf_counter()
+        cur.execute(sql)
+        print(f"  {label}: merged {_rate(cur.rowcount, time.perf_counter() - started)}")
+    cur.execute(f"DROP TABLE {staging_table}")
+
+
+def copy_movies(cur):
+    copy_stage(cur, "movies.csv", "stage_movies", MOVIES_STAGE, [
+        ("movies", MOVIES_MERGE),
+        ("genres", GENRES_MERGE),
+        ("movie_genres", MOVIE_GENRES_MERGE),
+    ])
+
+
+def copy_links(cur):
+    copy_stage(cur, "links.csv", "stage_links", LINKS_STAGE, [("links", LINKS_MERGE)])
+
+
+def copy_ratings(cur):
+    copy_stage(cur, "ratings.csv", "stage_ratings", RATINGS_STAGE, [("ratings", RATINGS_MERGE)])
+
+
+def copy_tags(cur):
+    copy_stage(cur, "tags.csv", "stage_tags", TAGS_STAGE, [("tags", TAGS_MERGE)])
+
+
 def main():
+    parser = argparse.ArgumentParser(description="Load the MovieLens dataset.")
+    parser.add_argument("--copy", action="store_true",
+                        help="stream CSVs through COPY and set-based merges (large datasets)")
+    args = parser.parse_args()
+
     conn = psycopg2.connect(DATABASE_URL)
     cur = conn.cursor()
 
+    if args.copy:
+        stages = (copy_movies, copy_ratings, copy_tags, copy_links)
+    else:
+        stages = (load_movies, load_ratings, load_tags, load_links)
+
     try:
         print("Loading MovieLens data...")
-        load_movies(cur)
-        conn.commit()
-
-        load_ratings(cur)
-        conn.commit()
-
-        load_tags(cur)
-        conn.commit()
-
-        load_links(cur)
-        conn.commit()
+        started = time.perf_counter()
+        for stage in stages:
+            stage(cur)
+            conn.commit()
 
-        print("MovieLens data loaded successfully.")
+        print(f"MovieLens data loaded successfully ({time.perf_counter() - started:.1f}s).")
     except Exception as e:
         conn.rollback()
         print(f"Error loading data: {e}", file=sys.stderr)
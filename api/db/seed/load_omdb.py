@@ -1,30 +1,183 @@
 """
 Enrich movies with OMDB data: IMDB rating, Rotten Tomatoes score, box office.
 Uses imdb_id from the movies table.
-Free tier: 1000 requests/day.
+Free tier: 1000 requests/day per key.
+
+Work comes from the omdb_queue table (migration 010).  Each run enqueues
+movies with an imdb_id that are not yet enriched, prioritised by rating count,
+then works through pending entries highest priority first until the daily
+budget is spent.  A movie's result, its queue update and the key's usage are
+committed together, so an interrupted run resumes where it stopped.  Titles
+OMDB does not know are marked 'missing' and never retried; transient errors
+back off exponentially and give up after MAX_ATTEMPTS.
+
+OMDB_API_KEY may hold several comma-separated keys, each optionally with its
+own daily budget ("key1,key2:500"); requests go to the key with most left.
+
+Responses are read through the on-disk response cache (response_cache.py);
+cache hits cost no quota, and --replay-only rebuilds the OMDB columns from the
+cache alone.
+
+Usage: python db/seed/load_omdb.py [--limit N] [--cache-ttl-days 30] [--replay-only] [--status]
 """
+import argparse
+import hashlib
 import os
-import sys
 import time
 import psycopg2
 import httpx
 
+from response_cache import DEFAULT_TTL_DAYS, ResponseCache
+
 DATABASE_URL = os.environ.get(
     "DATABASE_URL", "postgresql://moviesdb:moviesdb@db:5432/moviesdb"
 )
 OMDB_API_KEY = os.environ.get("OMDB_API_KEY", "")
-OMDB_BASE = "https://www.omdbapi.com/"
+OMDB_BASE = os.environ.get("OMDB_BASE", "https://www.omdbapi.com/")
 RATE_LIMIT_DELAY = 0.1
-DAILY_LIMIT = 990  # Stay under the 1000/day limit
+DAILY_LIMIT = 990  # Stay under the 1000/day limit, per key
+CACHE_ENDPOINT = "omdb:title"
+MAX_ATTEMPTS = 5
+RETRY_BASE_HOURS = 1  # doubled per failed attempt
+QUEUE_BATCH = 100
+# OMDB answers these with Response=False; anything else is worth retrying.
+PERMANENT_MISSES = {"Movie not found!", "Incorrect IMDb ID."}
+
+ENQUEUE = """
+    INSERT INTO omdb_queue (movie_id, imdb_id, priority)
+    SELECT m.movie_id, m.imdb_id, COALESCE(s.rating_count, 0)
+      FROM movies m
+      LEFT JOIN movie_rating_summary s ON s.movie_id = m.movie_id
+     WHERE m.imdb_id IS NOT NULL AND m.imdb_rating IS NULL
+    ON CONFLICT (movie_id) DO UPDATE
+       SET priority = EXCLUDED.priority, imdb_id = EXCLUDED.imdb_id
+     WHERE omdb_queue.priority <> EXCLUDED.priority
+        OR omdb_queue.imdb_id <> EXCLUDED.imdb_id
+"""
+
+NEXT_BATCH = """
+    SELECT movie_id, imdb_id, attempts FROM omdb_queue
+     WHERE status = 'pending' AND next_eligible_at <= NOW()
+     ORDER BY priority DESC, movie_id
+     LIMIT %s
+"""
+
+RECORD_ATTEMPT = """
+    UPDATE omdb_queue SET
+        status = %s, last_status = %s, attempts = attempts + 1,
+        last_attempt_at = NOW(), next_eligible_at = NOW() + %s * INTERVAL '1 hour'
+     WHERE movie_id = %s
+"""
+
+KEY_USAGE_TODAY = """
+    SELECT key_id, requests FROM omdb_key_usage
+     WHERE day = (NOW() AT TIME ZONE 'UTC')::date AND key_id = ANY(%s)
+"""
+
+ADD_KEY_USAGE = """
+    INSERT INTO omdb_key_usage (key_id, day, requests)
+    VALUES (%s, (NOW() AT TIME ZONE 'UTC')::date, %s)
+    ON CONFLICT (key_id, day) DO UPDATE SET requests = omdb_key_usage.requests + EXCLUDED.requests
+"""
+
+QUEUE_STATUS = """
+    SELECT status, COUNT(*), COUNT(*) FILTER (WHERE next_eligible_at <= NOW())
+      FROM omdb_queue GROUP BY status ORDER BY status
+"""
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+class ApiKey:
+    def __init__(self, key, budget):
+        self.key = key
+        self.budget = budget
+        self.used = 0
+        self.unsaved = 0
+        # Only a hash of the key is written to the database
+        self.id = hashlib.sha256(key.encode()).hexdigest()[:12]
+
+    @property
+    def remaining(self):
+        return max(0, self.budget - self.used)
+
+    def spend(self, n=1):
+        self.used += n
+        self.unsaved += n
+
+
+class KeyPool:
+    """The configured API keys and what is left of each one's daily budget."""
+
+    def __init__(self, keys):
+        self.keys = keys
+
+    @classmethod
+    def parse(cls, value, default_budget=DAILY_LIMIT):
+        keys = []
+        for part in value.split(","):
+            key, _, budget = part.strip().partition(":")
+            if key:
+                keys.append(ApiKey(key, int(budget) if budget else default_budget))
+        return cls(keys)
+
+    @property
+    def remaining(self):
+        return sum(k.remaining for k in self.keys)
+
+    def load_usage(self, cur):
+        cur.execute(KEY_USAGE_TODAY, ([k.id for k in self.keys],))
+        used = dict(cur.fetchall())
+        for k in self.keys:
+            k.used = used.get(k.id, 0)
 
+    def pick(self):
+        best = max(self.keys, key=lambda k: k.remaining, default=None)
+        if best is None or best.remaining == 0:
+            raise QuotaExhausted()
+        return best
 
-def enrich_movie(cur, client, movie_id, imdb_id):
-    """Fetch OMDB data for one movie."""
-    params = {"apikey": OMDB_API_KEY, "i": imdb_id}
-    resp = client.get(OMDB_BASE, params=params)
+    def save(self, cur):
+        """Add unsaved usage in the caller's transaction; call saved() after commit."""
+        for k in self.keys:
+            if k.unsaved:
+                cur.execute(ADD_KEY_USAGE, (k.id, k.unsaved))
+
+    def saved(self):
+        for k in self.keys:
+            k.unsaved = 0
+
+
+def is_permanent_miss(data):
+    return data.get("Response") == "False" and data.get("Error") in PERMANENT_MISSES
+
+
+def fetch_movie(client, cache, keys, imdb_id):
+    """Return (data, from_network) for one title, reading through the cache."""
+    entry = cache.get(CACHE_ENDPOINT, imdb_id)
+    if entry is not None:
+        return entry["body"], False
+    while True:
+        key = keys.pick()
+        key.spend()
+        resp = client.get(OMDB_BASE, params={"apikey": key.key, "i": imdb_id})
+        if resp.status_code != 401:
+            break
+        # "Request limit reached!" or "Invalid API key!": rest the key for today
+        print(f"  Key {key.id}: {resp.json().get('Error', 'unauthorized')}")
+        key.spend(key.remaining)
     resp.raise_for_status()
     data = resp.json()
+    # "Movie not found!" comes back as a 200 with Response=False; cache it too
+    if data.get("Response") != "False" or is_permanent_miss(data):
+        cache.put(CACHE_ENDPOINT, imdb_id, resp.status_code, data)
+    return data, True
+
 
+def write_movie(cur, movie_id, data):
+    """Write the OMDB columns for one movie; False if OMDB had no match."""
     if data.get("Response") == "False":
         return False
 
@@ -57,40 +210,147 @@ def enrich_movie(cur, client, movie_id, imdb_id):
     return True
 
 
-def main():
-    if not OMDB_API_KEY:
-        print("OMDB_API_KEY not set. Skipping OMDB enrichment.")
-        return
+def retry_state(attempts, note):
+    """(status, last_status, delay_hours) after a failed attempt."""
+    if attempts + 1 >= MAX_ATTEMPTS:
+        return "failed", note, 0
+    return "pending", note, RETRY_BASE_HOURS * 2 ** attempts
 
-    conn = psycopg2.connect(DATABASE_URL)
+
+def error_note(exc):
+    # Request URLs carry the API key, so keep them out of logs and the queue
+    if isinstance(exc, httpx.HTTPStatusError):
+        return f"HTTP {exc.response.status_code}"
+    return type(exc).__name__
+
+
+def run_queue(conn, client, cache, keys, limit=None):
+    """Work through pending queue entries until the quota or limit runs out."""
+    stats = {"done": 0, "missing": 0, "retry": 0, "failed": 0, "requests": 0}
     cur = conn.cursor()
+    try:
+        while True:
+            cur.execute(NEXT_BATCH, (QUEUE_BATCH,))
+            batch = cur.fetchall()
+            conn.commit()
+            if not batch:
+                return stats
+            for movie_id, imdb_id, attempts in batch:
+                if limit is not None and stats["requests"] >= limit:
+                    return stats
+                from_network = False
+                try:
+                    data, from_network = fetch_movie(client, cache, keys, imdb_id)
+                    if is_permanent_miss(data):
+                        state = ("missing", data["Error"], 0)
+                    elif data.get("Response") == "False":
+                        state = retry_state(attempts, data.get("Error"))
+                    else:
+                        write_movie(cur, movie_id, data)
+                        state = ("done", "ok", 0)
+                except QuotaExhausted:
+                    raise
+                except Exception as e:
+                    conn.rollback()
+                    from_network = True
+                    note = error_note(e)
+                    state = retry_state(attempts, note)
+                    print(f"  Error for movie {movie_id}: {note}")
+
+                status = state[0]
+                stats["retry" if status == "pending" else status] += 1
+                cur.execute(RECORD_ATTEMPT, (*state, movie_id))
+                keys.save(cur)
+                conn.commit()
+                keys.saved()
+
+                if from_network:
+                    stats["requests"] += 1
+                    time.sleep(RATE_LIMIT_DELAY)
+                total = sum(stats[k] for k in ("done", "missing", "retry", "failed"))
+                if total % 100 == 0:
+                    print(f"  Progress: {total} movies, {keys.remaining} requests left today")
+    except QuotaExhausted:
+        conn.rollback()
+        keys.save(cur)
+        conn.commit()
+        keys.saved()
+        print("  Daily quota spent on every key.")
+        return stats
+    finally:
+        cur.close()
 
-    # Get movies with imdb_id but no imdb_rating (not yet enriched)
+
+def print_status(cur, keys):
+    cur.execute(QUEUE_STATUS)
+    for status, count, eligible in cur.fetchall():
+        print(f"  {status:<8} {count:>7}  ({eligible} eligible now)")
+    keys.load_usage(cur)
+    for k in keys.keys:
+        print(f"  key {k.id}: {k.used}/{k.budget} used today")
+
+
+def replay_from_cache(cur, cache):
+    """Write every cached OMDB response; no network access."""
     cur.execute(
         """SELECT movie_id, imdb_id FROM movies
-           WHERE imdb_id IS NOT NULL AND imdb_rating IS NULL
+           WHERE imdb_id IS NOT NULL
            ORDER BY movie_id"""
     )
-    movies = cur.fetchall()
-    total = min(len(movies), DAILY_LIMIT)
-    print(f"Enriching {total} movies from OMDB (of {len(movies)} pending)...")
+    written = 0
+    for movie_id, imdb_id in cur.fetchall():
+        entry = cache.get(CACHE_ENDPOINT, imdb_id, ignore_ttl=True)
+        if entry is not None and write_movie(cur, movie_id, entry["body"]):
+            written += 1
+    return written
 
-    with httpx.Client(timeout=15) as client:
-        for i, (movie_id, imdb_id) in enumerate(movies[:DAILY_LIMIT]):
-            try:
-                enrich_movie(cur, client, movie_id, imdb_id)
-                conn.commit()
-                if (i + 1) % 100 == 0:
-                    print(f"  Progress: {i + 1}/{total}")
-            except Exception as e:
-                conn.rollback()
-                print(f"  Error for movie {movie_id}: {e}")
 
-            time.sleep(RATE_LIMIT_DELAY)
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enrich movies with OMDB data.")
+    parser.add_argument("--limit", type=int, default=None, help="make at most N requests this run")
+    parser.add_argument("--cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS,
+                        help="refetch cached responses older than this")
+    parser.add_argument("--replay-only", action="store_true",
+                        help="rebuild all OMDB data from the response cache, no network")
+    parser.add_argument("--status", action="store_true", help="print queue and quota status and exit")
+    args = parser.parse_args(argv)
+
+    keys = KeyPool.parse(OMDB_API_KEY)
+    if not keys.keys and not (args.replay_only or args.status):
+        print("OMDB_API_KEY not set. Skipping OMDB enrichment.")
+        return
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor()
+    cache = ResponseCache(ttl_days=args.cache_ttl_days)
+
+    try:
+        if args.status:
+            print_status(cur, keys)
+            return
+
+        if args.replay_only:
+            print("Replaying cached OMDB responses...")
+            written = replay_from_cache(cur, cache)
+            conn.commit()
+            print(f"OMDB replay complete: {written} written; {cache.summary()}")
+            return
+
+        cur.execute(ENQUEUE)
+        enqueued = cur.rowcount
+        keys.load_usage(cur)
+        conn.commit()
+        print(f"Enriching from OMDB: {enqueued} queue entries added or reprioritised, "
+              f"{keys.remaining} requests left today across {len(keys.keys)} key(s)...")
 
-    cur.close()
-    conn.close()
-    print("OMDB enrichment complete.")
+        with httpx.Client(timeout=15) as client:
+            stats = run_queue(conn, client, cache, keys, args.limit)
+    finally:
+        cur.close()
+        conn.close()
+    print(f"OMDB enrichment complete: {stats['done']} enriched, {stats['missing']} not on OMDB, "
+          f"{stats['retry']} to retry, {stats['failed']} failed; {stats['requests']} requests; "
+          f"{cache.summary()}")
 
 
 if __name__ == "__main__":
@@ -1,133 +1,487 @@
 """
 Enrich movies with TMDB data: overview, poster, backdrop, runtime, budget, revenue, cast, crew.
 Uses tmdb_id from the movies table (populated by load_movielens via links.csv).
-Rate limited to respect TMDB API limits.
+
+Fetches run concurrently on an httpx.AsyncClient behind a shared token bucket
+(TMDB allows roughly 40-50 requests/second).  429 and 5xx responses honour
+Retry-After, pause the whole bucket, and put the movie back on the queue.
+Fetched movies are handed to a single writer that commits them in batches.
+
+Raw responses are kept in the on-disk response cache (response_cache.py) and
+read through on later runs; --replay-only rebuilds every TMDB column, cast and
+crew from the cache without touching the network.
+
+Usage: python db/seed/load_tmdb.py [--concurrency 16] [--rate 40] [--batch-size 100] [--limit N]
+                                   [--cache-ttl-days 30] [--replay-only]
 """
+import argparse
+import asyncio
+import io
 import os
 import sys
 import time
 import psycopg2
 import httpx
 
+from ratelimit import TokenBucket, backoff_seconds, retry_after_seconds
+from response_cache import DEFAULT_TTL_DAYS, ResponseCache
+
 DATABASE_URL = os.environ.get(
     "DATABASE_URL", "postgresql://moviesdb:moviesdb@db:5432/moviesdb"
 )
 TMDB_API_KEY = os.environ.get("TMDB_API_KEY", "")
-TMDB_BASE = "https://api.themoviedb.org/3"
-RATE_LIMIT_DELAY = 0.26  # ~4 requests/sec to stay under TMDB limits
+TMDB_BASE = os.environ.get("TMDB_BASE", "https://api.themoviedb.org/3")
+CACHE_ENDPOINT = "tmdb:movie+credits"
+MAX_ATTEMPTS = 5
+KEY_JOBS = {"Director", "Writer", "Screenplay", "Producer", "Executive Producer"}
+
 
+# ---------------------------------------------------------------------------
+# Fetching
+# ---------------------------------------------------------------------------
 
-def enrich_movie(cur, client, movie_id, tmdb_id):
-    """Fetch TMDB data for one movie and update the database."""
-    url = f"{TMDB_BASE}/movie/{tmdb_id}"
-    params = {"api_key": TMDB_API_KEY, "append_to_response": "credits"}
-    resp = client.get(url, params=params)
+class RetryableError(Exception):
+    def __init__(self, message, delay):
+        super().__init__(message)
+        self.delay = delay
+
+
+async def fetch_movie(client, limiter, tmdb_id, attempt=1, cache=None):
+    """Fetch one movie with credits; returns the JSON dict, or None on 404."""
+    if cache is not None:
+        entry = cache.get(CACHE_ENDPOINT, tmdb_id)
+        if entry is not None:
+            return entry["body"]
+
+    await limiter.acquire()
+    try:
+        resp = await client.get(
+            f"{TMDB_BASE}/movie/{tmdb_id}",
+            params={"api_key": TMDB_API_KEY, "append_to_response": "credits"},
+        )
+    except httpx.TransportError as e:
+        raise RetryableError(f"transport error: {e!r}", backoff_seconds(attempt)) from e
 
     if resp.status_code == 404:
-        return False
+        if cache is not None:
+            cache.put(CACHE_ENDPOINT, tmdb_id, 404, None)
+        return None
+    if resp.status_code == 429 or resp.status_code >= 500:
+        delay = retry_after_seconds(resp.headers.get("Retry-After"))
+        if delay is None:
+            delay = backoff_seconds(attempt)
+        if resp.status_code == 429:
+            limiter.pause(delay)
+        raise RetryableError(f"HTTP {resp.status_code}", delay)
     resp.raise_for_status()
     data = resp.json()
+    if cache is not None:
+        cache.put(CACHE_ENDPOINT, tmdb_id, resp.status_code, data)
+    return data
 
-    # Update movie metadata
-    cur.execute(
-        """UPDATE movies SET
-            overview = %s, poster_path = %s, backdrop_path = %s,
-            runtime_minutes = %s, budget = %s, revenue = %s,
-            tmdb_vote_avg = %s, tmdb_vote_count = %s
-           WHERE movie_id = %s""",
-        (
-            data.get("overview"),
-            data.get("poster_path"),
-            data.get("backdrop_path"),
-            data.get("runtime"),
-            data.get("budget"),
-            data.get("revenue"),
-            data.get("vote_average"),
-            data.get("vote_count"),
-            movie_id,
-        ),
-    )
-
-    # Load cast (top 20)
-    credits = data.get("credits", {})
-    for member in credits.get("cast", [])[:20]:
-        person_id = _upsert_person(cur, member["id"], member["name"], member.get("profile_path"))
-        cur.execute(
-            """INSERT INTO movie_cast (movie_id, person_id, "character", cast_order)
-               VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING""",
-            (movie_id, person_id, member.get("character"), member.get("order")),
-        )
 
-    # Load key crew (director, writer, producer)
-    key_jobs = {"Director", "Writer", "Screenplay", "Producer", "Executive Producer"}
-    for member in credits.get("crew", []):
-        if member.get("job") not in key_jobs:
-            continue
-        person_id = _upsert_person(cur, member["id"], member["name"], member.get("profile_path"))
-        cur.execute(
-            """INSERT INTO movie_crew (movie_id, person_id, job, department)
-               VALUES (%s, %s, %s, %s) ON CONFLICT DO NOTHING""",
-            (movie_id, person_id, member["job"], member.get("department")),
+_DONE = object()  # writer sentinel
+
+
+class EnrichStats:
+    def __init__(self, total):
+        self.total = total
+        self.fetched = 0
+        self.not_found = 0
+        self.retries = 0
+        self.failed = 0
+        self.written = 0
+        self.started = time.perf_counter()
+
+    def summary(self):
+        elapsed = time.perf_counter() - self.started
+        return (f"{self.written} written, {self.not_found} not found, {self.failed} failed, "
+                f"{self.retries} retries in {elapsed:.1f}s ({self.fetched / elapsed if elapsed else 0:.1f} movies/s)")
+
+
+async def run_enrichment(movies, write_batch, *, concurrency=16, rate=40.0, batch_size=100,
+                         flush_seconds=2.0, client=None, cache=None):
+    """Fetch (movie_id, tmdb_id) pairs concurrently and pass results to write_batch.
+
+    write_batch(results) is a blocking callable run in a worker thread, where
+    results is a list of (movie_id, data) tuples; it may return how many of
+    them it wrote, the rest counting as failed.  Fetches keep going while a
+    batch is being written.
+    """
+    stats = EnrichStats(len(movies))
+    limiter = TokenBucket(rate)
+    work: asyncio.Queue = asyncio.Queue()
+    results: asyncio.Queue = asyncio.Queue(maxsize=batch_size * 4)
+    for movie_id, tmdb_id in movies:
+        work.put_nowait((movie_id, tmdb_id, 1))
+
+    unresolved = len(movies)
+    all_fetched = asyncio.Event()
+    if not unresolved:
+        all_fetched.set()
+    retry_tasks = set()
+
+    def resolve():
+        nonlocal unresolved
+        unresolved -= 1
+        if unresolved == 0:
+            all_fetched.set()
+
+    async def requeue_later(item, delay):
+        await asyncio.sleep(delay)
+        await work.put(item)
+
+    async def fetcher(http):
+        while True:
+            movie_id, tmdb_id, attempt = await work.get()
+            requeued = False
+            try:
+                data = await fetch_movie(http, limiter, tmdb_id, attempt, cache)
+            except RetryableError as e:
+                if attempt < MAX_ATTEMPTS:
+                    stats.retries += 1
+                    task = asyncio.create_task(requeue_later((movie_id, tmdb_id, attempt + 1), e.delay))
+                    retry_tasks.add(task)
+                    task.add_done_callback(retry_tasks.discard)
+                    requeued = True
+                else:
+                    stats.failed += 1
+                    print(f"  Giving up on movie {movie_id} after {attempt} attempts ({e})")
+            except Exception as e:
+                # Bad payloads (non-JSON 200s), cache I/O errors, ...: skip
+                # the movie rather than lose the fetcher and hang the run.
+                stats.failed += 1
+                print(f"  Error for movie {movie_id}: {e!r}")
+            else:
+                stats.fetched += 1
+                if data is None:
+                    stats.not_found += 1
+                else:
+                    await results.put((movie_id, data))
+            finally:
+                if not requeued:
+                    resolve()
+
+    async def writer():
+        loop = asyncio.get_running_loop()
+        batch = []
+        deadline = loop.time() + flush_seconds
+        while True:
+            try:
+                item = await asyncio.wait_for(results.get(), timeout=max(0.0, deadline - loop.time()))
+            except asyncio.TimeoutError:
+                item = None
+            if item is _DONE:
+                break
+            if item is not None:
+                batch.append(item)
+            if batch and (len(batch) >= batch_size or loop.time() >= deadline):
+                await write(batch)
+                batch = []
+                print(f"  Progress: {stats.written + stats.not_found + stats.failed}/{stats.total}")
+            if loop.time() >= deadline:
+                deadline = loop.time() + flush_seconds
+        if batch:
+            await write(batch)
+
+    async def write(batch):
+        written = await asyncio.to_thread(write_batch, batch)
+        written = len(batch) if written is None else written
+        stats.written += written
+        stats.failed += len(batch) - written
+
+    owns_client = client is None
+    if owns_client:
+        client = httpx.AsyncClient(
+            timeout=15,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
         )
+    writer_task = asyncio.create_task(writer())
+    fetchers = [asyncio.create_task(fetcher(client)) for _ in range(concurrency)]
+    try:
+        # A failing writer or fetcher must stop the run instead of leaving
+        # the rest waiting on it.
+        fetched = asyncio.create_task(all_fetched.wait())
+        await asyncio.wait({fetched, writer_task, *fetchers}, return_when=asyncio.FIRST_COMPLETED)
+        fetched.cancel()
+        for task in (writer_task, *fetchers):
+            if task.done():
+                task.result()
+        await results.put(_DONE)
+        await writer_task
+    finally:
+        for task in (*fetchers, *retry_tasks):
+            task.cancel()
+        if not writer_task.done():
+            writer_task.cancel()
+        if owns_client:
+            await client.aclose()
+    return stats
 
-    return True
 
+# ---------------------------------------------------------------------------
+# Writing
+# ---------------------------------------------------------------------------
 
-def _upsert_person(cur, tmdb_id, name, profile_path):
-    """Insert or get a person by TMDB ID."""
-    cur.execute("SELECT person_id FROM people WHERE tmdb_id = %s", (tmdb_id,))
-    row = cur.fetchone()
-    if row:
-        return row[0]
+MOVIE_COLUMNS = """
+    UPDATE movies m SET
+        overview = v.overview, poster_path = v.poster_path, backdrop_path = v.backdrop_path,
+        runtime_minutes = v.runtime, budget = v.budget, revenue = v.revenue,
+        tmdb_vote_avg = v.vote_average, tmdb_vote_count = v.vote_count
+      FROM (VALUES {values}) AS v(movie_id, overview, poster_path, backdrop_path,
+                                  runtime, budget, revenue, vote_average, vote_count)
+     WHERE m.movie_id = v.movie_id
+"""
+MOVIE_VALUES = "(%s::int, %s::text, %s::text, %s::text, %s::int, %s::bigint, %s::bigint, %s::numeric, %s::int)"
 
-    cur.execute(
-        """INSERT INTO people (name, tmdb_id, profile_path)
-           VALUES (%s, %s, %s) RETURNING person_id""",
-        (name, tmdb_id, profile_path),
-    )
-    return cur.fetchone()[0]
+# The no-op update makes RETURNING report existing people as well as new ones.
+UPSERT_PEOPLE = """
+    INSERT INTO people (name, tmdb_id, profile_path) VALUES {values}
+    ON CONFLICT (tmdb_id) DO UPDATE SET tmdb_id = EXCLUDED.tmdb_id
+    RETURNING tmdb_id, person_id
+"""
+
+CREDITS_STAGE = """
+    CREATE TEMP TABLE IF NOT EXISTS stage_cast (
+        movie_id    INTEGER,
+        person_id   INTEGER,
+        "character" TEXT,
+        cast_order  INTEGER
+    ) ON COMMIT DELETE ROWS;
+    CREATE TEMP TABLE IF NOT EXISTS stage_crew (
+        movie_id   INTEGER,
+        person_id  INTEGER,
+        job        TEXT,
+        department TEXT
+    ) ON COMMIT DELETE ROWS;
+"""
+
+CAST_MERGE = """
+    INSERT INTO movie_cast (movie_id, person_id, "character", cast_order)
+    SELECT movie_id, person_id, "character", cast_order FROM stage_cast
+     ORDER BY movie_id, cast_order
+    ON CONFLICT DO NOTHING
+"""
+
+CREW_MERGE = """
+    INSERT INTO movie_crew (movie_id, person_id, job, department)
+    SELECT movie_id, person_id, job, department FROM stage_crew
+    ON CONFLICT DO NOTHING
+"""
 
 
-def main():
-    if not TMDB_API_KEY:
+# Losing the connection fails every movie alike; stop rather than skip them all.
+CONNECTION_ERRORS = (psycopg2.OperationalError, psycopg2.InterfaceError)
+
+
+def credit_rows(data):
+    """(cast, crew) members to store: the top 20 cast and the key crew jobs."""
+    credits = data.get("credits") or {}
+    cast = credits.get("cast", [])[:20]
+    crew = [m for m in credits.get("crew", []) if m.get("job") in KEY_JOBS]
+    return cast, crew
+
+
+def _csv_field(value) -> str:
+    # COPY (FORMAT csv) reads an unquoted empty field as NULL and a quoted
+    # one as ''; csv.writer cannot tell None from '' apart in either mode.
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return '"' + value.replace('"', '""') + '"'
+    return str(value)
+
+
+def _copy_rows(cur, table, rows):
+    buf = io.StringIO()
+    buf.writelines(",".join(_csv_field(v) for v in row) + "\n" for row in rows)
+    buf.seek(0)
+    cur.copy_expert(f"COPY {table} FROM STDIN WITH (FORMAT csv)", buf)
+
+
+class BatchWriter:
+    """Writes batches of (movie_id, data) with a fixed number of statements.
+
+    Per batch: one UPDATE for the movie columns, one upsert for people not
+    seen before, and a COPY plus INSERT ... SELECT each for cast and crew.
+    ``person_ids`` maps TMDB person id to person_id across batches; entries
+    from a batch only join it once that batch has committed.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.person_ids = {}
+        with conn.cursor() as cur:
+            cur.execute(CREDITS_STAGE)
+        conn.commit()
+
+    def __call__(self, batch):
+        """Write batch; returns how many movies were written.
+
+        If the batch fails, its movies are retried one per transaction and
+        any that still fail are reported and skipped.
+        """
+        try:
+            self._commit(batch)
+            return len(batch)
+        except CONNECTION_ERRORS:
+            raise
+        except Exception as e:
+            if len(batch) == 1:
+                print(f"  Skipping movie {batch[0][0]}: {e!r}")
+                return 0
+        written = 0
+        for item in batch:
+            try:
+                self._commit([item])
+                written += 1
+            except CONNECTION_ERRORS:
+                raise
+            except Exception as e:
+                print(f"  Skipping movie {item[0]}: {e!r}")
+        return written
+
+    def _commit(self, batch):
+        with self.conn.cursor() as cur:
+            try:
+                new_ids = self.write(cur, batch)
+                self.conn.commit()
+            except Exception:
+                self.conn.rollback()
+                raise
+        self.person_ids.update(new_ids)
+
+    def write(self, cur, batch):
+        if not batch:
+            return {}
+        movie_rows = [
+            cur.mogrify(MOVIE_VALUES, (
+                movie_id, data.get("overview"), data.get("poster_path"), data.get("backdrop_path"),
+                data.get("runtime"), data.get("budget"), data.get("revenue"),
+                data.get("vote_average"), data.get("vote_count"),
+            )).decode()
+            for movie_id, data in batch
+        ]
+        cur.execute(MOVIE_COLUMNS.format(values=",".join(movie_rows)))
+
+        credits = [(movie_id, *credit_rows(data)) for movie_id, data in batch]
+        new_people = {}
+        for _, cast, crew in credits:
+            for member in (*cast, *crew):
+                if member["id"] not in self.person_ids:
+                    new_people.setdefault(member["id"], (member["name"], member["id"], member.get("profile_path")))
+        new_ids = {}
+        if new_people:
+            values = ",".join(cur.mogrify("(%s, %s, %s)", row).decode() for row in new_people.values())
+            cur.execute(UPSERT_PEOPLE.format(values=values))
+            new_ids = dict(cur.fetchall())
+
+        def person_id(member):
+            return self.person_ids.get(member["id"]) or new_ids[member["id"]]
+
+        _copy_rows(cur, "stage_cast", [
+            (movie_id, person_id(m), m.get("character"), m.get("order"))
+            for movie_id, cast, _ in credits for m in cast
+        ])
+        _copy_rows(cur, "stage_crew", [
+            (movie_id, person_id(m), m["job"], m.get("department"))
+            for movie_id, _, crew in credits for m in crew
+        ])
+        cur.execute(CAST_MERGE)
+        cur.execute(CREW_MERGE)
+        return new_ids
+
+
+def make_batch_writer(conn):
+    """write_batch callable committing each batch in one transaction."""
+    return BatchWriter(conn)
+
+
+def replay_from_cache(movies, cache, write_batch, batch_size=100):
+    """Write every cached response for movies; no network access."""
+    written = missing = 0
+    batch = []
+    for movie_id, tmdb_id in movies:
+        entry = cache.get(CACHE_ENDPOINT, tmdb_id, ignore_ttl=True)
+        if entry is None or entry["body"] is None:
+            missing += 1
+            continue
+        batch.append((movie_id, entry["body"]))
+        if len(batch) >= batch_size:
+            written += _written(write_batch(batch), batch)
+            batch = []
+    if batch:
+        written += _written(write_batch(batch), batch)
+    return written, missing
+
+
+def _written(result, batch):
+    return len(batch) if result is None else result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Enrich movies with TMDB data.")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight")
+    parser.add_argument("--rate", type=float, default=40.0, help="requests per second")
+    parser.add_argument("--batch-size", type=int, default=100, help="movies per database commit")
+    parser.add_argument("--limit", type=int, default=None, help="enrich at most N movies")
+    parser.add_argument("--cache-ttl-days", type=float, default=DEFAULT_TTL_DAYS,
+                        help="refetch cached responses older than this")
+    parser.add_argument("--replay-only", action="store_true",
+                        help="rebuild all TMDB data from the response cache, no network")
+    args = parser.parse_args(argv)
+
+    if not TMDB_API_KEY and not args.replay_only:
         print("TMDB_API_KEY not set. Skipping TMDB enrichment.")
         return
 
     conn = psycopg2.connect(DATABASE_URL)
     cur = conn.cursor()
+    cache = ResponseCache(ttl_days=args.cache_ttl_days)
 
-    # Get movies with tmdb_id but no overview (not yet enriched)
-    cur.execute(
-        """SELECT movie_id, tmdb_id FROM movies
-           WHERE tmdb_id IS NOT NULL AND overview IS NULL
-           ORDER BY movie_id"""
-    )
+    if args.replay_only:
+        cur.execute(
+            """SELECT movie_id, tmdb_id FROM movies
+               WHERE tmdb_id IS NOT NULL
+               ORDER BY movie_id"""
+        )
+    else:
+        # Get movies with tmdb_id but no overview (not yet enriched)
+        cur.execute(
+            """SELECT movie_id, tmdb_id FROM movies
+               WHERE tmdb_id IS NOT NULL AND overview IS NULL
+               ORDER BY movie_id"""
+        )
     movies = cur.fetchall()
-    print(f"Enriching {len(movies)} movies from TMDB...")
-
-    with httpx.Client(timeout=15) as client:
-        for i, (movie_id, tmdb_id) in enumerate(movies):
-            try:
-                enrich_movie(cur, client, movie_id, tmdb_id)
-                conn.commit()
-                if (i + 1) % 100 == 0:
-                    print(f"  Progress: {i + 1}/{len(movies)}")
-            except httpx.HTTPStatusError as e:
-                conn.rollback()
-                if e.response.status_code == 429:
-                    print("  Rate limited, sleeping 10s...")
-                    time.sleep(10)
-                else:
-                    print(f"  Error for movie {movie_id}: {e}")
-            except Exception as e:
-                conn.rollback()
-                print(f"  Error for movie {movie_id}: {e}")
+    conn.commit()
+    if args.limit is not None:
+        movies = movies[:args.limit]
 
-            time.sleep(RATE_LIMIT_DELAY)
+    try:
+        if args.replay_only:
+            print(f"Replaying cached TMDB responses for {len(movies)} movies...")
+            started = time.perf_counter()
+            written, missing = replay_from_cache(movies, cache, make_batch_writer(conn), args.batch_size)
+            print(f"TMDB replay complete: {written} written, {missing} not cached or not found "
+                  f"in {time.perf_counter() - started:.1f}s")
+            return
 
-    cur.close()
-    conn.close()
-    print("TMDB enrichment complete.")
+        print(f"Enriching {len(movies)} movies from TMDB...")
+        stats = asyncio.run(run_enrichment(
+            movies,
+            make_batch_writer(conn),
+            concurrency=args.concurrency,
+            rate=args.rate,
+            batch_size=args.batch_size,
+            cache=cache,
+        ))
+    except Exception as e:
+        print(f"Error enriching from TMDB: {e}", file=sys.stderr)
+        sys.exit(1)
+    finally:
+        cur.close()
+        conn.close()
+    print(f"TMDB enrichment complete: {stats.summary()}; {cache.summary()}")
 
 
 if __name__ == "__main__":
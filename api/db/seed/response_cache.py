@@ -0,0 +1,89 @@
+"""
+On-disk cache of raw API responses for the enrichment loaders.
+
+Each response is stored as a gzip-compressed JSON blob whose path is the
+SHA-256 of "<endpoint>:<id>", fanned out over 256 subdirectories:
+
+    <root>/3f/3fa2...c1.json.gz  ->  {"endpoint", "id", "status", "fetched_at", "body"}
+
+Misses (e.g. TMDB 404s, OMDB "Movie not found!") are cached too, so a re-run
+neither refetches them nor mistakes them for work still to do.  Entries older
+than the TTL are treated as absent, except in replay-only runs, which rebuild
+the database from whatever is on disk.  A blob that cannot be read back (a
+truncated or garbled file, e.g. from a full disk or a copy cut short) is
+counted, deleted and reported as a miss, so it is fetched again.
+"""
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+import zlib
+
+DATA_DIR = os.environ.get("DATA_DIR", "/app/data")
+CACHE_DIR = os.environ.get("RESPONSE_CACHE_DIR", os.path.join(DATA_DIR, "api_cache"))
+DEFAULT_TTL_DAYS = 30.0
+
+
+class ResponseCache:
+    def __init__(self, root: str = CACHE_DIR, ttl_days: float | None = DEFAULT_TTL_DAYS):
+        self.root = root
+        self.ttl = ttl_days * 86400 if ttl_days is not None else None
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.corrupt = 0
+
+    def _path(self, endpoint: str, key) -> str:
+        digest = hashlib.sha256(f"{endpoint}:{key}".encode()).hexdigest()
+        return os.path.join(self.root, digest[:2], f"{digest}.json.gz")
+
+    def get(self, endpoint: str, key, ignore_ttl: bool = False) -> dict | None:
+        """Cached entry for (endpoint, key), or None if missing, unreadable or stale."""
+        path = self._path(endpoint, key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (gzip.BadGzipFile, EOFError, zlib.error, ValueError):
+            # ValueError covers JSONDecodeError and UnicodeDecodeError.
+            self.corrupt += 1
+            self.misses += 1
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            return None
+        if not ignore_ttl and self.ttl is not None and time.time() - entry["fetched_at"] > self.ttl:
+            self.stale += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, endpoint: str, key, status: int, body) -> dict:
+        entry = {
+            "endpoint": endpoint,
+            "id": key,
+            "status": status,
+            "fetched_at": time.time(),
+            "body": body,
+        }
+        path = self._path(endpoint, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename, so readers never see a partial blob.
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb") as f:
+                f.write(json.dumps(entry, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return entry
+
+    def summary(self) -> str:
+        corrupt = f" ({self.corrupt} unreadable)" if self.corrupt else ""
+        return f"cache: {self.hits} hits, {self.misses} misses{corrupt}, {self.stale} stale"
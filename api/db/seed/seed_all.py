@@ -0,0 +1,292 @@
+"""
+Seed the whole database in one run.
+Stages follow the dependency graph below; independent stages run in parallel,
+each on its own connection:
+
+    movies (+ genres, movie_genres)
+      -> links
+           -> ratings, tags, personality
+           -> tmdb, omdb            (after tags; skipped without API keys or with
+                                     --skip-enrich; omdb also waits for ratings)
+
+Before a bulk stage, the secondary indexes on the tables it loads are dropped
+(definitions are stashed in seed_index_stash, so an interrupted run restores
+them next time) and rebuilt afterwards with a larger maintenance_work_mem.
+Indexes that trigger functions look rows up through (KEEP_INDEXES) stay.
+The run ends with ANALYZE and a per-stage timing report.
+
+Usage: python db/seed/seed_all.py [--workers 4] [--maintenance-work-mem 1GB] [--skip-enrich]
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import psycopg2
+
+import load_movielens
+import load_omdb
+import load_personality
+import load_tmdb
+
+DATABASE_URL = os.environ.get(
+    "DATABASE_URL", "postgresql://moviesdb:moviesdb@db:5432/moviesdb"
+)
+
+
+class Stage:
+    def __init__(self, name, run, deps=(), bulk_tables=(), enrich=False, configured=None):
+        self.name = name
+        self.run = run  # callable(conn)
+        self.deps = tuple(deps)
+        self.bulk_tables = tuple(bulk_tables)
+        self.enrich = enrich
+        self.configured = configured  # callable() -> False when its API key is missing
+        self.status = "pending"
+        self.started = None
+        self.load_seconds = 0.0
+        self.index_seconds = 0.0
+        self.error = None
+
+
+def _with_cursor(*loaders):
+    """Adapt cursor-based loader functions to a stage runner, committing after each."""
+    def run(conn):
+        with conn.cursor() as cur:
+            for loader in loaders:
+                loader(cur)
+                conn.commit()
+    return run
+
+
+def _standalone(main):
+    """Stage runner for loaders that manage their own connection (and CLI)."""
+    return lambda conn: main([])
+
+
+STAGES = [
+    Stage("movies", _with_cursor(load_movielens.copy_movies), bulk_tables=["movie_genres"]),
+    Stage("links", _with_cursor(load_movielens.copy_links), deps=["movies"]),
+    Stage("ratings", _with_cursor(load_movielens.copy_ratings), deps=["links"], bulk_tables=["ratings"]),
+    Stage("tags", _with_cursor(load_movielens.copy_tags), deps=["links"], bulk_tables=["tags"]),
+    Stage(
+        "personality",
+        _with_cursor(load_personality.load_profiles, load_personality.load_personality_ratings),
+        deps=["links"],
+        bulk_tables=["personality_ratings"],
+    ),
+    # Enrichment updates movies rows in batches while the tags merge's
+    # statement-level trigger rewrites movies.search_vector for many rows in
+    # one transaction; running them together risks deadlocks, so both wait.
+    Stage(
+        "tmdb", _standalone(load_tmdb.main), deps=["links", "tags"], enrich=True,
+        configured=lambda: bool(load_tmdb.TMDB_API_KEY),
+    ),
+    # OMDB's queue is prioritised by rating count, so it waits for ratings
+    Stage(
+        "omdb", _standalone(load_omdb.main), deps=["links", "tags", "ratings"], enrich=True,
+        configured=lambda: bool(load_omdb.KeyPool.parse(load_omdb.OMDB_API_KEY).keys),
+    ),
+]
+
+
+# ---------------------------------------------------------------------------
+# Secondary index drop / rebuild
+# ---------------------------------------------------------------------------
+
+STASH_TABLE = """
+    CREATE TABLE IF NOT EXISTS seed_index_stash (
+        index_name TEXT PRIMARY KEY,
+        table_name TEXT NOT NULL,
+        definition TEXT NOT NULL
+    )
+"""
+
+# Indexes that trigger functions look rows up through.  The search_vector
+# triggers on tags and movies call movie_tag_text(movie_id) once per touched
+# movie, which would be a full scan of tags per movie without this index
+# (the tags merge and concurrent TMDB overview updates both fire them).
+KEEP_INDEXES = ["idx_tags_movie_id"]
+
+# Plain indexes only: primary keys, unique indexes and indexes backing
+# constraints stay, since the merges and ON CONFLICT upserts rely on them.
+SECONDARY_INDEXES = """
+    SELECT i.indexrelid::regclass::text, t.relname, pg_get_indexdef(i.indexrelid)
+      FROM pg_index i
+      JOIN pg_class t ON t.oid = i.indrelid
+      JOIN pg_namespace n ON n.oid = t.relnamespace
+     WHERE n.nspname = current_schema()
+       AND t.relname = ANY(%s)
+       AND NOT i.indisprimary
+       AND NOT i.indisunique
+       AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+       AND i.indexrelid::regclass::text <> ALL(%s)
+"""
+
+
+def drop_secondary_indexes(conn, tables):
+    with conn.cursor() as cur:
+        cur.execute(SECONDARY_INDEXES, (list(tables), KEEP_INDEXES))
+        indexes = cur.fetchall()
+        for name, table, definition in indexes:
+            cur.execute(
+                "INSERT INTO seed_index_stash (index_name, table_name, definition) VALUES (%s, %s, %s)"
+                " ON CONFLICT (index_name) DO NOTHING",
+                (name, table, definition),
+            )
+            cur.execute(f"DROP INDEX IF EXISTS {name}")
+    conn.commit()
+    return len(indexes)
+
+
+def rebuild_indexes(conn, tables, maintenance_work_mem):
+    """Recreate stashed indexes for tables; returns the number rebuilt."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT set_config('maintenance_work_mem', %s, false)", (maintenance_work_mem,))
+        cur.execute(
+            "SELECT index_name, definition FROM seed_index_stash WHERE table_name = ANY(%s)",
+            (list(tables),),
+        )
+        stashed = cur.fetchall()
+        for name, definition in stashed:
+            definition = definition.replace("CREATE INDEX ", "CREATE INDEX IF NOT EXISTS ", 1)
+            cur.execute(definition)
+            cur.execute("DELETE FROM seed_index_stash WHERE index_name = %s", (name,))
+            conn.commit()
+        cur.execute("RESET maintenance_work_mem")
+    return len(stashed)
+
+
+# ---------------------------------------------------------------------------
+# Scheduler
+# ---------------------------------------------------------------------------
+
+_print_lock = threading.Lock()
+
+
+def log(message):
+    with _print_lock:
+        print(message, flush=True)
+
+
+def run_stage(stage, maintenance_work_mem, origin):
+    conn = psycopg2.connect(DATABASE_URL)
+    stage.started = time.perf_counter() - origin
+    try:
+        if stage.bulk_tables:
+            dropped = drop_secondary_indexes(conn, stage.bulk_tables)
+            if dropped:
+                log(f"[{stage.name}] dropped {dropped} secondary index(es) on {', '.join(stage.bulk_tables)}")
+        started = time.perf_counter()
+        try:
+            stage.run(conn)
+            conn.commit()
+        finally:
+            stage.load_seconds = time.perf_counter() - started
+            if stage.bulk_tables:
+                conn.rollback()
+                started = time.perf_counter()
+                rebuilt = rebuild_indexes(conn, stage.bulk_tables, maintenance_work_mem)
+                stage.index_seconds = time.perf_counter() - started
+                if rebuilt:
+                    log(f"[{stage.name}] rebuilt {rebuilt} index(es) in {stage.index_seconds:.1f}s")
+    finally:
+        conn.close()
+
+
+def run_pipeline(stages, workers, maintenance_work_mem):
+    origin = time.perf_counter()
+    by_name = {s.name: s for s in stages}
+    pending = {s.name for s in stages if s.status == "pending"}
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while pending or running:
+            for name in sorted(pending):
+                stage = by_name[name]
+                dep_status = [by_name[d].status for d in stage.deps if d in by_name]
+                if any(s in ("failed", "blocked") for s in dep_status):
+                    stage.status = "blocked"
+                    pending.discard(name)
+                    log(f"[{name}] blocked by a failed dependency")
+                elif all(s in ("done", "skipped") for s in dep_status):
+                    stage.status = "running"
+                    pending.discard(name)
+                    log(f"[{name}] started")
+                    running[pool.submit(run_stage, stage, maintenance_work_mem, origin)] = stage
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                stage = running.pop(future)
+                try:
+                    future.result()
+                    stage.status = "done"
+                    log(f"[{stage.name}] finished in {stage.load_seconds + stage.index_seconds:.1f}s")
+                except BaseException as e:  # loaders may sys.exit()
+                    stage.status = "failed"
+                    stage.error = e
+                    log(f"[{stage.name}] FAILED: {e!r}")
+    return time.perf_counter() - origin
+
+
+def print_report(stages, analyze_seconds, total_seconds):
+    rows = [
+        [s.name, s.status, f"{s.started:.1f}" if s.started is not None else "-",
+         f"{s.load_seconds:.1f}", f"{s.index_seconds:.1f}"]
+        for s in stages
+    ]
+    rows.append(["analyze", "done", "-", f"{analyze_seconds:.1f}", "-"])
+    headers = ["stage", "status", "start s", "load s", "index s"]
+    widths = [max(len(h), *(len(r[i]) for r in rows)) for i, h in enumerate(headers)]
+    print()
+    print("  ".join(h.ljust(w) for h, w in zip(headers, widths)))
+    print("  ".join("-" * w for w in widths))
+    for row in rows:
+        print("  ".join(c.ljust(w) for c, w in zip(row, widths)))
+    print(f"\nTotal: {total_seconds:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--workers", type=int, default=4, help="parallel stages / connections")
+    parser.add_argument("--maintenance-work-mem", default="1GB")
+    parser.add_argument("--skip-enrich", action="store_true", help="skip TMDB / OMDB stages")
+    args = parser.parse_args()
+
+    stages = list(STAGES)
+    for stage in stages:
+        if stage.enrich and args.skip_enrich:
+            stage.status = "skipped"
+        elif stage.configured is not None and not stage.configured():
+            stage.status = "skipped"
+            print(f"[{stage.name}] skipped: API key not set")
+
+    conn = psycopg2.connect(DATABASE_URL)
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(STASH_TABLE)
+        cur.execute("SELECT DISTINCT table_name FROM seed_index_stash")
+        leftover = [row[0] for row in cur.fetchall()]
+    if leftover:
+        print(f"Restoring indexes left over from an interrupted run on {', '.join(leftover)}...")
+        rebuild_indexes(conn, leftover, args.maintenance_work_mem)
+
+    print("Seeding database...")
+    total = run_pipeline(stages, args.workers, args.maintenance_work_mem)
+
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute("ANALYZE")
+    analyze_seconds = time.perf_counter() - started
+    conn.close()
+
+    print_report(stages, analyze_seconds, total + analyze_seconds)
+    if any(s.status in ("failed", "blocked") for s in stages):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
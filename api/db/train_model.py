@@ -0,0 +1,62 @@
+"""
+Train the rating prediction model.
+Fits a biased matrix factorisation (ALS) to the ratings table and writes a new
+model version under MODEL_DIR/mf; the API loads the CURRENT version at startup.
+
+Usage: python db/train_model.py [--factors 32] [--reg 0.1] [--iterations 12]
+"""
+import argparse
+import os
+import sys
+import time
+
+import psycopg2
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.analytics.matrix_factorization import load_ratings, train_als  # noqa: E402
+
+DATABASE_URL = os.environ.get(
+    "DATABASE_URL", "postgresql://moviesdb:moviesdb@db:5432/moviesdb"
+)
+MODEL_DIR = os.environ.get("MODEL_DIR", "models")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--factors", type=int, default=32)
+    parser.add_argument("--reg", type=float, default=0.1)
+    parser.add_argument("--iterations", type=int, default=12)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    conn = psycopg2.connect(DATABASE_URL)
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM dataset_versions WHERE dataset = 'ratings'")
+    row = cur.fetchone()
+    dataset_version = row[0] if row else None
+
+    print("Loading ratings...")
+    started = time.perf_counter()
+    users, movies, ratings = load_ratings(conn)
+    conn.rollback()
+    conn.close()
+    print(f"  {len(ratings)} ratings in {time.perf_counter() - started:.1f}s")
+    if not len(ratings):
+        print("No ratings to train on.")
+        sys.exit(1)
+
+    print(f"Training ALS (k={args.factors}, reg={args.reg}, {args.iterations} iterations)...")
+    started = time.perf_counter()
+    model = train_als(users, movies, ratings, factors=args.factors, reg=args.reg,
+                      iterations=args.iterations, seed=args.seed, log=print)
+    model.meta["ratings_dataset_version"] = dataset_version
+    model.meta["train_seconds"] = round(time.perf_counter() - started, 2)
+
+    version = model.save(MODEL_DIR)
+    print(f"Saved model version {version} to {os.path.join(MODEL_DIR, 'mf', version)} "
+          f"({model.meta['train_seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
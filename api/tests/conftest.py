@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+
+@pytest.fixture
+def pg_conn():
+    """A connection to TEST_DATABASE_URL, rolled back afterwards; skips
+    the test when the variable is unset."""
+    dsn = os.environ.get("TEST_DATABASE_URL")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_URL not set")
+    psycopg2 = pytest.importorskip("psycopg2")
+    conn = psycopg2.connect(dsn)
+    yield conn
+    conn.rollback()
+    conn.close()
@@ -0,0 +1,69 @@
+"""VersionedCache (app/utils/cache.py): single-flight rebuilds outside the lock."""
+import os
+import sys
+import threading
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.utils.cache import VersionedCache  # noqa: E402
+
+
+def test_versioned_cache_recomputes_on_new_version():
+    cache = VersionedCache()
+    assert cache.get_or_compute(1, lambda: "a") == "a"
+    assert cache.get_or_compute(1, lambda: "b") == "a"
+    assert cache.get_or_compute(2, lambda: "c") == "c"
+
+
+def test_versioned_cache_serves_stale_value_while_rebuilding():
+    cache = VersionedCache()
+    cache.get_or_compute(1, lambda: "old")
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(5)
+        return "new"
+
+    builder = threading.Thread(target=cache.get_or_compute, args=(2, slow))
+    builder.start()
+    assert started.wait(5)
+    # Does not block on the rebuild, and does not start a second one.
+    assert cache.get_or_compute(2, lambda: pytest.fail("second rebuild")) == "old"
+    release.set()
+    builder.join(5)
+    assert cache.get_or_compute(2, lambda: "unused") == "new"
+
+
+def test_versioned_cache_cold_callers_share_one_rebuild():
+    cache = VersionedCache()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(5)
+        return "value"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_compute(1, slow))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    release.set()
+    for t in threads:
+        t.join(5)
+    assert results == ["value"] * 4
+    assert len(calls) == 1
+
+
+def test_versioned_cache_failed_rebuild_lets_the_next_caller_retry():
+    cache = VersionedCache()
+
+    def broken():
+        raise RuntimeError("db went away")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_compute(1, broken)
+    assert cache.get_or_compute(1, lambda: "ok") == "ok"
@@ -0,0 +1,76 @@
+"""ALS training and persistence (app/analytics/matrix_factorization.py)."""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.analytics.matrix_factorization import MFModel, train_als  # noqa: E402
+
+
+def _toy_ratings(n_users=40, n_items=25, rank=2, seed=0):
+    """Every rating of a rank-2 biased model, ids offset from their indices."""
+    rng = np.random.default_rng(seed)
+    p = rng.normal(0, 0.5, (n_users, rank))
+    q = rng.normal(0, 0.5, (n_items, rank))
+    bu = rng.normal(0, 0.3, n_users)
+    bi = rng.normal(0, 0.3, n_items)
+    users, items = np.meshgrid(np.arange(n_users), np.arange(n_items), indexing="ij")
+    users, items = users.ravel(), items.ravel()
+    ratings = 3.0 + bu[users] + bi[items] + np.einsum("ij,ij->i", p[users], q[items])
+    return users * 10 + 1, items * 7 + 100, ratings
+
+
+def _rmse_log():
+    rmses = []
+
+    def log(line):
+        rmses.append(float(line.rsplit(" ", 1)[1]))
+    return rmses, log
+
+
+def test_als_converges_on_a_low_rank_matrix():
+    user_ids, movie_ids, ratings = _toy_ratings()
+    seen = np.random.default_rng(1).random(len(ratings)) < 0.4
+    rmses, log = _rmse_log()
+    model = train_als(user_ids[seen], movie_ids[seen], ratings[seen],
+                      factors=2, reg=1e-3, iterations=15, log=log)
+
+    assert len(rmses) == 15
+    assert rmses[0] > 0.1 and rmses[-1] < 0.01
+    assert all(b <= a + 1e-4 for a, b in zip(rmses, rmses[1:]))
+    assert model.meta["n_users"] == 40 and model.meta["n_items"] == 25
+    # The ratings it never saw are recovered too.
+    predicted = model.predict_many(
+        np.searchsorted(model.user_ids, user_ids[~seen]),
+        np.searchsorted(model.item_ids, movie_ids[~seen]),
+    )
+    assert np.sqrt(np.mean((predicted - ratings[~seen]) ** 2)) < 0.05
+    u, m = int(user_ids[~seen][0]), int(movie_ids[~seen][0])
+    assert abs(model.predict(u, m) - ratings[~seen][0]) < 0.1
+
+
+def test_als_is_deterministic_for_a_seed():
+    user_ids, movie_ids, ratings = _toy_ratings(n_users=10, n_items=8)
+    a = train_als(user_ids, movie_ids, ratings, factors=3, iterations=3, seed=5)
+    b = train_als(user_ids, movie_ids, ratings, factors=3, iterations=3, seed=5)
+    np.testing.assert_array_equal(a.user_factors, b.user_factors)
+    np.testing.assert_array_equal(a.item_bias, b.item_bias)
+
+
+def test_predict_clips_and_skips_unknown_ids():
+    model = MFModel([1], [2], [[3.0]], [[3.0]], [0.0], [0.0], 3.0)
+    assert model.predict(1, 2) == 5.0
+    assert model.predict(1, 99) is None
+    assert model.predict(99, 2) is None
+
+
+def test_saved_model_loads_back(tmp_path):
+    user_ids, movie_ids, ratings = _toy_ratings(n_users=6, n_items=5)
+    model = train_als(user_ids, movie_ids, ratings, factors=2, iterations=2)
+    model.save(str(tmp_path), version="v1")
+    loaded = MFModel.load(str(tmp_path))
+    assert loaded.version == "v1"
+    assert loaded.meta["factors"] == 2
+    assert loaded.predict(int(user_ids[0]), int(movie_ids[0])) == model.predict(int(user_ids[0]), int(movie_ids[0]))
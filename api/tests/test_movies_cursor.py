@@ -0,0 +1,200 @@
+"""Keyset cursors for GET /movies (app/routers/movies.py) and the pages
+list_movies_page(after=...) builds from them (app/queries/movies.py)."""
+import base64
+import json
+import os
+import sys
+from decimal import Decimal
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "test")
+
+from fastapi import HTTPException  # noqa: E402
+
+from app.queries.movies import list_movies_page  # noqa: E402
+from app.routers.movies import _decode_cursor, _encode_cursor  # noqa: E402
+from app.utils.encoding import float_cursor  # noqa: E402
+
+
+def _raw_cursor(payload) -> str:
+    return base64.urlsafe_b64encode(json.dumps(payload).encode()).decode().rstrip("=")
+
+
+def _assert_invalid(cursor, sort_by="title", order="asc"):
+    with pytest.raises(HTTPException) as exc:
+        _decode_cursor(cursor, sort_by, order)
+    assert exc.value.status_code == 400
+
+
+# ---------------------------------------------------------------------------
+# Encoding
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("sort_by, value, expected", [
+    ("title", "Heat (1995)", "Heat (1995)"),
+    ("year", 1995, 1995),
+    ("year", None, None),
+    ("rating", 3.85, Decimal("3.85")),
+    ("rating", Decimal("4.50"), Decimal("4.50")),
+    ("rating", None, None),
+])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+def test_cursor_round_trips(sort_by, value, expected, order):
+    cursor = _encode_cursor(sort_by, order, value, 42)
+    assert "=" not in cursor
+    assert _decode_cursor(cursor, sort_by, order) == (expected, 42)
+
+
+@pytest.mark.parametrize("sort_by, order", [("year", "asc"), ("title", "desc"), ("rating", "desc")])
+def test_cursor_for_another_sort_is_rejected(sort_by, order):
+    _assert_invalid(_encode_cursor("title", "asc", "Heat", 7), sort_by, order)
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64!",
+    base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+    base64.urlsafe_b64encode(b"{not json").decode(),
+    _raw_cursor({"sort": "title"}),
+    _raw_cursor(["title", "asc", "Heat"]),
+    _raw_cursor(["title", "asc", "Heat", 7, 8]),
+    _raw_cursor(["title", "asc", "Heat", "7"]),
+    _raw_cursor(["title", "asc", None, 7]),
+    _raw_cursor(["title", "asc", 1995, 7]),
+])
+def test_garbage_cursors_are_rejected(cursor):
+    _assert_invalid(cursor)
+
+
+@pytest.mark.parametrize("sort_by, value", [
+    ("year", "1995"),
+    ("year", True),
+    ("year", 1995.5),
+    ("rating", 3.5),
+    ("rating", "3.5; DROP TABLE movies"),
+    ("rating", "NaN-ish"),
+])
+def test_tampered_cursor_values_are_rejected(sort_by, value):
+    _assert_invalid(_raw_cursor([sort_by, "asc", value, 7]), sort_by)
+
+
+# ---------------------------------------------------------------------------
+# Query shape
+# ---------------------------------------------------------------------------
+
+def _placeholders(query: str) -> int:
+    return query.replace("%%", "").count("%s")
+
+
+@pytest.mark.parametrize("after", [None, ("Heat", 7), (1995, 7), (None, 7)])
+@pytest.mark.parametrize("sort_key", ["title", "year", "rating"])
+def test_page_params_match_placeholders(sort_key, after):
+    if after is not None and after[0] is None and sort_key == "title":
+        pytest.skip("title cursors never hold NULL")
+    conditions, params = ["m.title ILIKE %s", "m.release_year >= %s"], ["%heat%", 1990]
+    query, query_params = list_movies_page(conditions, params, sort_key, "asc", 20, page=3, after=after)
+    assert _placeholders(query) == len(query_params)
+    assert params == ["%heat%", 1990]  # not mutated
+
+
+def test_page_tail_only_for_nullable_sorts():
+    title, _ = list_movies_page([], [], "title", "asc", 20, after=("Heat", 7))
+    year, _ = list_movies_page([], [], "year", "asc", 20, after=(1995, 7))
+    assert "UNION ALL" not in title
+    assert "UNION ALL" in year and "IS NULL" in year
+    nulls, _ = list_movies_page([], [], "rating", "desc", 20, after=(None, 7))
+    assert "UNION ALL" not in nulls
+    assert "s.avg_rating IS NULL" in nulls and "m.movie_id < %s" in nulls
+
+
+# ---------------------------------------------------------------------------
+# Paging through a table (needs a database: TEST_DATABASE_URL)
+# ---------------------------------------------------------------------------
+
+MOVIES = [
+    # movie_id, title, release_year, avg_rating (None: no summary row)
+    (1, "Alien", 1979, Decimal("4.10")),
+    (2, "Aliens", 1986, Decimal("4.10")),
+    (3, "Brazil", None, Decimal("3.90")),
+    (4, "Casablanca", 1942, None),
+    (5, "Dune", 1984, Decimal("2.95")),
+    (6, "Dune", 2021, Decimal("4.10")),
+    (7, "Eraserhead", 1977, None),
+    (8, "Fargo", 1996, Decimal("4.25")),
+    (9, "Gattaca", None, None),
+    (10, "Heat", 1995, Decimal("3.90")),
+    (11, "Ikiru", 1952, Decimal("4.40")),
+    (12, "Jaws", 1975, None),
+    (13, "Kes", None, Decimal("3.50")),
+]
+
+
+@pytest.fixture
+def movie_table(pg_conn):
+    with pg_conn.cursor() as cur:
+        # Temporary tables shadow the real ones for this session only.
+        cur.execute("""
+            CREATE TEMP TABLE movies (
+                movie_id INTEGER PRIMARY KEY, title TEXT NOT NULL,
+                release_year INTEGER, poster_path TEXT);
+            CREATE TEMP TABLE movie_rating_summary (
+                movie_id INTEGER PRIMARY KEY, rating_count BIGINT NOT NULL,
+                avg_rating NUMERIC);
+        """)
+        cur.executemany("INSERT INTO movies VALUES (%s, %s, %s, NULL)", [m[:3] for m in MOVIES])
+        cur.executemany(
+            "INSERT INTO movie_rating_summary VALUES (%s, 10, %s)",
+            [(m[0], m[3]) for m in MOVIES if m[3] is not None],
+        )
+    return pg_conn
+
+
+def _fetch(conn, query, params):
+    with float_cursor(conn) as cur:
+        cur.execute(query, params)
+        return cur.fetchall()
+
+
+def _walk(conn, sort_key, order, per_page, conditions=(), params=()):
+    """Every row, following next cursors the way the router does."""
+    rows, after = [], None
+    for _ in range(len(MOVIES) + 2):
+        query, query_params = list_movies_page(
+            list(conditions), list(params), sort_key, order, per_page, after=after,
+        )
+        page = _fetch(conn, query, query_params)
+        rows += page
+        if len(page) < per_page:
+            return rows
+        last = page[-1]
+        value = {"title": last[1], "year": last[2], "rating": last[4]}[sort_key]
+        after = _decode_cursor(_encode_cursor(sort_key, order, value, last[0]), sort_key, order)
+    pytest.fail("paging did not terminate")
+
+
+@pytest.mark.parametrize("per_page", [1, 3, 4, 20])
+@pytest.mark.parametrize("order", ["asc", "desc"])
+@pytest.mark.parametrize("sort_key", ["title", "year", "rating"])
+def test_keyset_pages_match_offset_listing(movie_table, sort_key, order, per_page):
+    query, params = list_movies_page([], [], sort_key, order, len(MOVIES) + 1)
+    expected = _fetch(movie_table, query, params)
+    assert len(expected) == len(MOVIES)
+    assert _walk(movie_table, sort_key, order, per_page) == expected
+
+
+def test_keyset_pages_respect_filters(movie_table):
+    conditions, params = ["m.release_year >= %s"], [1980]
+    query, offset_params = list_movies_page(conditions, params, "rating", "desc", 50)
+    expected = _fetch(movie_table, query, offset_params)
+    assert [r[0] for r in expected] == [8, 6, 2, 10, 5]
+    assert _walk(movie_table, "rating", "desc", 2, conditions, params) == expected
+
+
+def test_switching_sort_key_needs_a_fresh_cursor(movie_table):
+    first = _fetch(movie_table, *list_movies_page([], [], "year", "asc", 3))
+    cursor = _encode_cursor("year", "asc", first[-1][2], first[-1][0])
+    _assert_invalid(cursor, "rating", "asc")
+    # Starting over without the cursor pages the new sort from its start.
+    assert _walk(movie_table, "rating", "asc", 3)[0][0] == 5
@@ -0,0 +1,63 @@
+"""BinaryRows (app/analytics/neighbours.py) against dense NumPy products."""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.analytics.neighbours import BinaryRows, _sparse_one_hot  # noqa: E402
+
+
+def _random_binary(rng, n_rows=30, n_columns=12, density=0.25):
+    dense = (rng.random((n_rows, n_columns)) < density).astype(np.float32)
+    dense[5] = 0  # a row with no ones
+    dense[:, 3] = 0  # and an unused column
+    rows, columns = np.nonzero(dense)
+    return dense, rows, columns
+
+
+def test_from_pairs_drops_duplicates_and_sorts_columns():
+    m = BinaryRows.from_pairs(3, [2, 0, 2, 0, 2], [1, 4, 0, 4, 1], 5)
+    assert m.shape == (3, 5)
+    assert m.indptr.tolist() == [0, 1, 1, 3]
+    assert m.indices.tolist() == [4, 0, 1]
+    assert m.row_sums().tolist() == [1.0, 0.0, 2.0]
+
+
+def test_transpose_matches_dense():
+    dense, rows, columns = _random_binary(np.random.default_rng(1))
+    # Pairs in shuffled order, some repeated.
+    order = np.random.default_rng(2).permutation(np.r_[np.arange(len(rows)), np.arange(5)])
+    m = BinaryRows.from_pairs(dense.shape[0], rows[order], columns[order], dense.shape[1])
+    t = m.transpose()
+    assert t.shape == (dense.shape[1], dense.shape[0])
+    np.testing.assert_array_equal(t.row_sums(), dense.sum(axis=0))
+    np.testing.assert_array_equal(t.shared_counts(np.arange(t.shape[0])), dense.T @ dense)
+
+
+def test_shared_counts_match_dense_product():
+    dense, rows, columns = _random_binary(np.random.default_rng(0))
+    m = BinaryRows.from_pairs(dense.shape[0], rows, columns, dense.shape[1])
+    full = dense @ dense.T
+
+    np.testing.assert_array_equal(m.shared_counts(np.arange(dense.shape[0])), full)
+    block = np.array([5, 0, 17, 17, 29])
+    counts = m.shared_counts(block)
+    assert counts.dtype == np.float32 and counts.shape == (5, dense.shape[0])
+    np.testing.assert_array_equal(counts, full[block])
+    assert m.shared_counts(np.array([], dtype=np.int64)).shape == (0, dense.shape[0])
+
+
+def test_sparse_one_hot_keeps_most_frequent_keys():
+    movie_ids = np.array([10, 20, 30])
+    row_movies = np.array([10, 20, 30, 10, 20, 30])
+    keys = np.array(["dark", "dark", "dark", "funny", "funny", "rare"])
+    m = _sparse_one_hot(movie_ids, row_movies, keys, max_columns=2)
+    assert m.shape == (3, 2)
+    np.testing.assert_array_equal(m.row_sums(), [2, 2, 1])
+    np.testing.assert_array_equal(m.shared_counts(np.arange(3)), [[2, 2, 1], [2, 2, 1], [1, 1, 1]])
+
+    empty = _sparse_one_hot(movie_ids, np.array([], dtype=np.int64), np.array([], dtype=str))
+    assert empty.shape == (3, 0)
+    np.testing.assert_array_equal(empty.shared_counts(np.arange(3)), np.zeros((3, 3)))
@@ -0,0 +1,152 @@
+"""Placeholder rewriting for prepared statements: positional() in
+app/queries/__init__.py and PreparedStatements (app/db_prepared.py)."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "test")
+
+import psycopg2  # noqa: E402
+
+from app import queries  # noqa: E402
+from app.db_prepared import PreparedStatements  # noqa: E402
+from app.queries import positional  # noqa: E402
+
+
+def _prepared_constants() -> dict[str, str]:
+    return {name: sql for name, sql in queries.constants().items() if queries.is_prepared(sql)}
+
+
+# ---------------------------------------------------------------------------
+# positional()
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("sql, expected", [
+    ("SELECT 1", ("SELECT 1", 0)),
+    ("SELECT %s, %s", ("SELECT $1, $2", 2)),
+    ("SELECT %s WHERE a = %s OR b = %s", ("SELECT $1 WHERE a = $2 OR b = $3", 3)),
+    ("WHERE t LIKE 'a%%' AND id = %s", ("WHERE t LIKE 'a%' AND id = $1", 1)),
+    # An escaped % followed by s or ( is not a placeholder.
+    ("SELECT '100%%s', %s", ("SELECT '100%s', $1", 1)),
+    ("SELECT '%%(x)s', %s", ("SELECT '%(x)s', $1", 1)),
+    ("SELECT %s%%", ("SELECT $1%", 1)),
+])
+def test_positional_numbers_placeholders(sql, expected):
+    assert positional(sql) == expected
+
+
+@pytest.mark.parametrize("sql", [
+    "SELECT %(id)s",
+    "SELECT %(id)s WHERE a = %(id)s OR b = %(id)s",
+    "SELECT %s, %(id)s",
+])
+def test_positional_gives_up_on_named_placeholders(sql):
+    # A named parameter may repeat; PREPARE would need it passed once per use.
+    assert positional(sql) is None
+
+
+def test_every_prepared_constant_converts():
+    constants = _prepared_constants()
+    assert constants
+    for name, sql in constants.items():
+        converted = positional(sql)
+        assert converted is not None, name
+        body, nparams = converted
+        assert nparams == sql.replace("%%", "").count("%s"), name
+        assert "%s" not in body.replace("%%", ""), name
+        for n in range(1, nparams + 1):
+            assert f"${n}" in body, name
+        assert f"${nparams + 1}" not in body, name
+
+
+# ---------------------------------------------------------------------------
+# PreparedStatements
+# ---------------------------------------------------------------------------
+
+class FakeConnection:
+    def __init__(self, autocommit=False):
+        self.autocommit = autocommit
+        self.prepared = set()
+
+
+class FakeCursor:
+    def __init__(self, conn=None, fail_prepare=False):
+        self.connection = conn or FakeConnection()
+        self.fail_prepare = fail_prepare
+        self.sent = []
+
+    def execute(self, query, vars=None):
+        if self.fail_prepare and "PREPARE" in query and "ROLLBACK" not in query:
+            raise psycopg2.ProgrammingError("cannot prepare")
+        self.sent.append((query, vars))
+
+
+@pytest.mark.parametrize("name", sorted(_prepared_constants()))
+def test_statement_for_prepared_constant(name):
+    sql = _prepared_constants()[name]
+    body, nparams = positional(sql)
+    statement_name, prepare, run = PreparedStatements()._statement(sql)
+    assert statement_name == name.lower()
+    assert prepare == f"PREPARE {statement_name} AS {body}"
+    if nparams:
+        assert run == f"EXECUTE {statement_name} ({', '.join(['%s'] * nparams)})"
+    else:
+        assert run == f"EXECUTE {statement_name}"
+
+
+def test_named_placeholders_run_unprepared():
+    statements = PreparedStatements()
+    sql = "SELECT %(id)s, %(id)s"
+    cur = FakeCursor()
+    statements.execute(cur, cur.execute, sql, {"id": 1})
+    assert cur.sent == [(sql, {"id": 1})]
+    assert statements.stats()["statements"] == {}
+
+
+def test_prepares_once_per_connection():
+    statements = PreparedStatements()
+    sql = _prepared_constants()["GET_USER"]
+    name, prepare, run = statements._statement(sql)
+    cur = FakeCursor(FakeConnection(autocommit=True))
+    statements.execute(cur, cur.execute, sql, (7,))
+    statements.execute(cur, cur.execute, sql, (8,))
+    assert cur.sent == [(prepare, None), (run, (7,)), (run, (8,))]
+    assert statements.stats()["statements"][name]["prepares"] == 1
+    assert statements.stats()["statements"][name]["executions"] == 2
+
+
+def test_prepare_failure_falls_back_to_plain_execute():
+    statements = PreparedStatements()
+    sql = _prepared_constants()["GET_USER"]
+    cur = FakeCursor(fail_prepare=True)
+    statements.execute(cur, cur.execute, sql, (7,))
+    assert statements._statement(sql) is None  # cached as not preparable
+    assert cur.sent[0][0].startswith("ROLLBACK TO SAVEPOINT prepare_get_user")
+    assert cur.sent[1:] == [(sql, (7,))]
+    assert not cur.connection.prepared
+
+    cur.sent.clear()
+    statements.execute(cur, cur.execute, sql, (8,))
+    assert cur.sent == [(sql, (8,))]
+
+
+# ---------------------------------------------------------------------------
+# Against Postgres (needs a database with the schema: TEST_DATABASE_URL)
+# ---------------------------------------------------------------------------
+
+@pytest.mark.parametrize("name", sorted(_prepared_constants()))
+def test_prepared_constant_parameter_count_matches_server(pg_conn, name):
+    sql = _prepared_constants()[name]
+    statement_name, prepare, _ = PreparedStatements()._statement(sql)
+    with pg_conn.cursor() as cur:
+        try:
+            cur.execute(prepare)
+        except psycopg2.errors.UndefinedTable:
+            pytest.skip("schema not loaded")
+        cur.execute(
+            "SELECT cardinality(parameter_types) FROM pg_prepared_statements WHERE name = %s",
+            (statement_name,),
+        )
+        assert cur.fetchone()[0] == positional(sql)[1]
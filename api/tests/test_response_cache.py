@@ -0,0 +1,54 @@
+"""On-disk response cache for the enrichment loaders (db/seed/response_cache.py)."""
+import gzip
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db", "seed"))
+
+from response_cache import ResponseCache  # noqa: E402
+
+
+def test_put_then_get(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("movie", 5, 200, {"title": "Heat"})
+    entry = cache.get("movie", 5)
+    assert (entry["status"], entry["body"]) == (200, {"title": "Heat"})
+    assert cache.get("movie", 6) is None
+    assert (cache.hits, cache.misses, cache.corrupt) == (1, 1, 0)
+
+
+def test_expired_entry_is_stale_unless_ignoring_ttl(tmp_path):
+    cache = ResponseCache(str(tmp_path), ttl_days=0)
+    cache.put("movie", 5, 404, None)
+    assert cache.get("movie", 5) is None
+    assert cache.get("movie", 5, ignore_ttl=True)["status"] == 404
+    assert (cache.hits, cache.stale) == (1, 1)
+
+
+def _gzipped(data: bytes) -> bytes:
+    return gzip.compress(data, mtime=0)
+
+
+@pytest.mark.parametrize("blob", [
+    b"",
+    b"not gzip at all",
+    _gzipped(b'{"status": 200, "body": {"ti')[:-12],
+    _gzipped(b'{"status": 200, "body": {"ti'),
+    _gzipped(b"\xff\xfe\xfa"),
+], ids=["empty", "not-gzip", "truncated-gzip", "truncated-json", "not-utf8"])
+def test_unreadable_blob_is_a_miss_and_removed(tmp_path, blob):
+    cache = ResponseCache(str(tmp_path))
+    cache.put("movie", 5, 200, {"title": "Heat"})
+    path = cache._path("movie", 5)
+    with open(path, "wb") as f:
+        f.write(blob)
+
+    assert cache.get("movie", 5) is None
+    assert (cache.hits, cache.misses, cache.corrupt) == (0, 1, 1)
+    assert not os.path.exists(path)
+    assert "1 unreadable" in cache.summary()
+
+    cache.put("movie", 5, 200, {"title": "Heat"})
+    assert cache.get("movie", 5)["body"] == {"title": "Heat"}
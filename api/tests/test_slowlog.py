@@ -0,0 +1,55 @@
+"""SlowQueryLog (app/db_slowlog.py): the slowest statements of the last window."""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("JWT_SECRET", "test")
+
+from app import db_slowlog  # noqa: E402
+from app.db_slowlog import SlowQueryLog  # noqa: E402
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def _log(monkeypatch, **kwargs):
+    clock = Clock()
+    monkeypatch.setattr(db_slowlog.time, "time", clock)
+    # A threshold no test reaches: record only, never log or EXPLAIN.
+    return SlowQueryLog(dsn="", threshold_ms=1e9, **kwargs), clock
+
+
+def _durations(log):
+    return [q["duration_ms"] for q in log.snapshot()["queries"]]
+
+
+def test_keeps_the_slowest_statements(monkeypatch):
+    log, _ = _log(monkeypatch, size=3, window=60)
+    for i, seconds in enumerate([1, 5, 2, 7, 3, 6]):
+        log.observe(None, "SELECT 1", None, f"q{i}", seconds)
+    assert _durations(log) == [7000, 6000, 5000]
+
+
+def test_newer_statements_are_kept_once_a_spike_expires(monkeypatch):
+    log, clock = _log(monkeypatch, size=3, window=2)
+    for seconds in (5, 6, 7):
+        log.observe(None, "SELECT 1", None, "spike", seconds)
+    clock.now += 2.5
+    log.observe(None, "SELECT 1", None, "later", 1)
+    log.observe(None, "SELECT 1", None, "later", 2)
+    assert _durations(log) == [2000, 1000]
+
+
+def test_partly_expired_log_accepts_faster_statements(monkeypatch):
+    log, clock = _log(monkeypatch, size=2, window=2)
+    log.observe(None, "SELECT 1", None, "old", 5)
+    clock.now += 1.5
+    log.observe(None, "SELECT 1", None, "new", 6)
+    clock.now += 1.0  # only the first entry is past the window
+    log.observe(None, "SELECT 1", None, "newest", 1)
+    assert _durations(log) == [6000, 1000]
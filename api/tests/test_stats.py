@@ -0,0 +1,64 @@
+"""masked_pearson (app/analytics/stats.py) against np.corrcoef."""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.analytics.stats import masked_pearson  # noqa: E402
+
+
+def _reference(x, x_mask, y, y_mask):
+    a, b = x.shape[1], y.shape[1]
+    corr = np.full((a, b), np.nan)
+    n = np.zeros((a, b), dtype=np.int64)
+    for i in range(a):
+        for j in range(b):
+            both = x_mask[:, i] & y_mask[:, j]
+            n[i, j] = both.sum()
+            xs, ys = x[both, i], y[both, j]
+            if n[i, j] >= 2 and xs.std() > 0 and ys.std() > 0:
+                corr[i, j] = np.corrcoef(xs, ys)[0, 1]
+    return corr, n
+
+
+def test_masked_pearson_matches_corrcoef_on_shared_rows():
+    rng = np.random.default_rng(7)
+    x = rng.normal(3.0, 1.0, (40, 5))
+    y = 0.5 * x[:, :4] + rng.normal(0, 0.5, (40, 4))
+    x_mask = rng.random(x.shape) < 0.7
+    y_mask = rng.random(y.shape) < 0.6
+    # Garbage in the masked-out cells must not leak into the result.
+    x[~x_mask] = 1e6
+    y[~y_mask] = -1e6
+
+    corr, n = masked_pearson(x, x_mask, y, y_mask)
+    expected_corr, expected_n = _reference(x, x_mask, y, y_mask)
+    assert corr.shape == (5, 4) and n.dtype == np.int64
+    np.testing.assert_array_equal(n, expected_n)
+    np.testing.assert_allclose(corr, expected_corr, rtol=1e-9, atol=1e-12)
+
+
+def test_masked_pearson_is_nan_where_undefined():
+    x = np.array([[1.0, 4.0, 2.0], [2.0, 4.0, 0.0], [3.0, 4.0, 0.0], [5.0, 4.0, 0.0]])
+    x_mask = np.array([[1, 1, 1], [1, 1, 0], [1, 1, 0], [1, 1, 0]], dtype=bool)
+    y = np.array([[2.0], [1.0], [7.0], [3.0]])
+    y_mask = np.ones_like(y, dtype=bool)
+
+    corr, n = masked_pearson(x, x_mask, y, y_mask)
+    assert n.tolist() == [[4], [4], [1]]
+    assert np.isclose(corr[0, 0], np.corrcoef(x[:, 0], y[:, 0])[0, 1])
+    assert np.isnan(corr[1, 0])  # constant column
+    assert np.isnan(corr[2, 0])  # a single shared row
+
+
+def test_masked_pearson_ignores_large_offsets():
+    # Centring keeps ratings shifted far from zero as accurate as small ones.
+    rng = np.random.default_rng(3)
+    x = rng.normal(0, 1, (30, 2))
+    y = x + rng.normal(0, 0.1, (30, 2))
+    mask = np.ones_like(x, dtype=bool)
+    near, _ = masked_pearson(x, mask, y, mask)
+    far, _ = masked_pearson(x + 1e7, mask, y + 1e7, mask)
+    np.testing.assert_allclose(far, near, rtol=1e-6)
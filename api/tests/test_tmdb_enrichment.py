@@ -0,0 +1,243 @@
+"""
+TMDB enrichment pipeline (db/seed/load_tmdb.py) against the fake TMDB server
+in benchmarks/fake_tmdb.py, served in-process through httpx.ASGITransport.
+"""
+import asyncio
+import os
+import sys
+import time
+from email.utils import formatdate
+
+import httpx
+import pytest
+
+API_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(API_DIR, "db", "seed"))
+sys.path.insert(0, os.path.join(API_DIR, "benchmarks"))
+
+import fake_tmdb  # noqa: E402
+import load_tmdb  # noqa: E402
+from ratelimit import TokenBucket, retry_after_seconds  # noqa: E402
+from response_cache import ResponseCache  # noqa: E402
+
+
+def fake_app(rate=10_000.0):
+    return fake_tmdb.create_app(fake_tmdb.ServerLimits(rate=rate, latency_ms=0, error_rate=0))
+
+
+class ScriptedTransport(httpx.AsyncBaseTransport):
+    """Answers the first request for chosen tmdb ids with a canned response,
+    and everything else from the fake TMDB app."""
+
+    def __init__(self, app, first: dict):
+        self.inner = httpx.ASGITransport(app=app)
+        self.first = dict(first)
+        self.requests: dict[int, int] = {}
+
+    async def handle_async_request(self, request):
+        tmdb_id = int(request.url.path.rsplit("/", 1)[1])
+        self.requests[tmdb_id] = self.requests.get(tmdb_id, 0) + 1
+        canned = self.first.pop(tmdb_id, None)
+        if canned is not None:
+            return canned
+        return await self.inner.handle_async_request(request)
+
+
+def enrich(movies, transport, **kwargs):
+    written = []
+
+    def write_batch(batch):
+        written.extend(batch)
+
+    async def run():
+        async with httpx.AsyncClient(transport=transport) as client:
+            return await asyncio.wait_for(
+                load_tmdb.run_enrichment(
+                    movies, write_batch, rate=1000.0, batch_size=10, flush_seconds=0.05, client=client, **kwargs
+                ),
+                timeout=10,
+            )
+
+    return asyncio.run(run()), dict(written)
+
+
+# ---------------------------------------------------------------------------
+# Rate limiting helpers
+# ---------------------------------------------------------------------------
+
+def test_token_bucket_allows_burst_then_paces():
+    async def run():
+        bucket = TokenBucket(rate=50, capacity=5)
+        started = time.monotonic()
+        for _ in range(5):
+            await bucket.acquire()
+        burst = time.monotonic() - started
+        for _ in range(5):
+            await bucket.acquire()
+        return burst, time.monotonic() - started
+
+    burst, total = asyncio.run(run())
+    assert burst < 0.05
+    assert total >= 5 / 50 * 0.8
+
+
+def test_token_bucket_pause_blocks_acquire():
+    async def run():
+        bucket = TokenBucket(rate=1000)
+        bucket.pause(0.2)
+        started = time.monotonic()
+        await bucket.acquire()
+        return time.monotonic() - started
+
+    assert asyncio.run(run()) >= 0.15
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("", None),
+    ("7", 7.0),
+    (" 0 ", 0.0),
+    ("soon", None),
+])
+def test_retry_after_seconds(value, expected):
+    assert retry_after_seconds(value) == expected
+
+
+def test_retry_after_http_date():
+    assert 25 <= retry_after_seconds(formatdate(time.time() + 30, usegmt=True)) <= 30
+    assert retry_after_seconds(formatdate(time.time() - 30, usegmt=True)) == 0.0
+
+
+# ---------------------------------------------------------------------------
+# run_enrichment
+# ---------------------------------------------------------------------------
+
+def test_enrichment_writes_found_movies_and_skips_404():
+    # The fake server answers 404 for every 97th tmdb id
+    stats, written = enrich([(1, 5), (2, 97), (3, 12)], httpx.ASGITransport(app=fake_app()))
+    assert set(written) == {1, 3}
+    assert written[1]["overview"] == "Synthetic overview for movie 5."
+    assert (stats.written, stats.not_found, stats.failed) == (2, 1, 0)
+
+
+def test_enrichment_refetches_unreadable_cache_entries(tmp_path):
+    cache = ResponseCache(str(tmp_path))
+    cache.put(load_tmdb.CACHE_ENDPOINT, 5, 200, {"overview": "cached"})
+    cache.put(load_tmdb.CACHE_ENDPOINT, 12, 200, {"overview": "cached"})
+    with open(cache._path(load_tmdb.CACHE_ENDPOINT, 12), "wb") as f:
+        f.write(b"\x1f\x8b truncated")
+    transport = ScriptedTransport(fake_app(), {})
+
+    stats, written = enrich([(1, 5), (2, 12)], transport, cache=cache)
+    assert written[1]["overview"] == "cached"
+    assert written[2]["overview"] == "Synthetic overview for movie 12."
+    assert transport.requests == {12: 1}
+    assert cache.corrupt == 1
+    assert cache.get(load_tmdb.CACHE_ENDPOINT, 12)["body"]["overview"] == "Synthetic overview for movie 12."
+
+
+@pytest.mark.parametrize("status, headers", [(429, {"Retry-After": "0"}), (503, {})])
+def test_enrichment_requeues_throttled_and_unavailable(monkeypatch, status, headers):
+    monkeypatch.setattr(load_tmdb, "backoff_seconds", lambda attempt: 0.01)
+    transport = ScriptedTransport(fake_app(), {5: httpx.Response(status, headers=headers, json={})})
+    stats, written = enrich([(1, 5), (2, 6)], transport)
+    assert set(written) == {1, 2}
+    assert transport.requests[5] == 2
+    assert (stats.retries, stats.failed) == (1, 0)
+
+
+def test_enrichment_gives_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(load_tmdb, "backoff_seconds", lambda attempt: 0.01)
+
+    class AlwaysUnavailable(httpx.AsyncBaseTransport):
+        async def handle_async_request(self, request):
+            return httpx.Response(503)
+
+    stats, written = enrich([(1, 5)], AlwaysUnavailable())
+    assert written == {}
+    assert (stats.retries, stats.failed) == (load_tmdb.MAX_ATTEMPTS - 1, 1)
+
+
+def test_enrichment_survives_non_json_response():
+    transport = ScriptedTransport(fake_app(), {6: httpx.Response(200, text="<html>")})
+    stats, written = enrich([(1, 5), (2, 6), (3, 7)], transport)
+    assert set(written) == {1, 3}
+    assert (stats.written, stats.failed) == (2, 1)
+
+
+def test_enrichment_counts_movies_the_writer_skipped():
+    def write_batch(batch):
+        return sum(1 for movie_id, _ in batch if movie_id != 2)
+
+    async def run():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=fake_app())) as client:
+            return await load_tmdb.run_enrichment(
+                [(1, 5), (2, 6), (3, 7)], write_batch, batch_size=10, flush_seconds=0.05, client=client
+            )
+
+    stats = asyncio.run(run())
+    assert (stats.written, stats.failed) == (2, 1)
+
+
+# ---------------------------------------------------------------------------
+# BatchWriter
+# ---------------------------------------------------------------------------
+
+class FakeConn:
+    def __init__(self):
+        self.commits = 0
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor()
+
+    def commit(self):
+        self.commits += 1
+
+    def rollback(self):
+        self.rollbacks += 1
+
+
+class FakeCursor:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql):
+        pass
+
+
+class BadMovieWriter(load_tmdb.BatchWriter):
+    """BatchWriter whose write() rejects movie 2, like a bad payload would."""
+
+    def write(self, cur, batch):
+        if any(movie_id == 2 for movie_id, _ in batch):
+            raise ValueError("bad payload")
+        self.stored.extend(movie_id for movie_id, _ in batch)
+        return {}
+
+
+def test_batch_writer_retries_failed_batch_one_movie_at_a_time():
+    writer = BadMovieWriter(FakeConn())
+    writer.stored = []
+    assert writer([(1, {}), (2, {}), (3, {})]) == 2
+    assert writer.stored == [1, 3]
+    assert writer.conn.rollbacks == 2  # the batch, then movie 2 alone
+
+
+# ---------------------------------------------------------------------------
+# Credits staging (needs a database: TEST_DATABASE_URL)
+# ---------------------------------------------------------------------------
+
+def test_copy_rows_keeps_nulls_and_empty_strings(pg_conn):
+    with pg_conn.cursor() as cur:
+        cur.execute(load_tmdb.CREDITS_STAGE)
+        load_tmdb._copy_rows(cur, "stage_cast", [
+            (1, 2, None, None),
+            (1, 3, "", 0),
+            (1, 4, 'Dr. "Q", Jr.\nII', 7),
+        ])
+        cur.execute('SELECT person_id, "character", cast_order FROM stage_cast ORDER BY person_id')
+        assert cur.fetchall() == [(2, None, None), (3, "", 0), (4, 'Dr. "Q", Jr.\nII', 7)]
@@ -32,6 +32,8 @@ command -v unzip   >/dev/null 2>&1 || error "unzip is not installed"
 
 # ── 2. Download datasets ────────────────────
 mkdir -p "$DATA_DIR"
+# Created here so Docker does not create the bind mount root-owned.
+mkdir -p "$ROOT_DIR/api/models"
 
 MOVIELENS_URL="https://files.grouplens.org/datasets/movielens/ml-latest-small.zip"
 MOVIELENS_ZIP="$DATA_DIR/ml-latest-small.zip"
@@ -88,30 +90,27 @@ info "Running database migrations..."
 docker compose exec api python db/migrate.py
 
 # ── 6. Seed data ────────────────────────────
-info "Loading MovieLens data..."
-docker compose exec api python db/seed/load_movielens.py
-
-info "Loading Personality data..."
-docker compose exec api python db/seed/load_personality.py
-
-# ── 7. Optional enrichment ──────────────────
-if [ "$SKIP_ENRICH" = false ]; then
-  source "$ROOT_DIR/.env"
-  if [ -n "${TMDB_API_KEY:-}" ]; then
-    info "Enriching with TMDB data..."
-    docker compose exec api python db/seed/load_tmdb.py
-  else
-    warn "TMDB_API_KEY not set. Skipping TMDB enrichment."
-  fi
-  if [ -n "${OMDB_API_KEY:-}" ]; then
-    info "Enriching with OMDB data..."
-    docker compose exec api python db/seed/load_omdb.py
-  else
-    warn "OMDB_API_KEY not set. Skipping OMDB enrichment."
-  fi
-else
+# MovieLens, personality and (when API keys are set) TMDB / OMDB enrichment,
+# in dependency order with independent stages in parallel.
+SEED_ARGS=""
+if [ "$SKIP_ENRICH" = true ]; then
   warn "Skipping enrichment (--skip-enrich)."
+  SEED_ARGS="--skip-enrich"
 fi
+info "Seeding database..."
+docker compose exec api python db/seed/seed_all.py $SEED_ARGS
+
+# ── 7. Derived data ─────────────────────────
+# train_model.py runs as appuser, whose uid need not match the host user
+# that owns the bind-mounted models directory.
+docker compose exec -u root api chown appuser:appuser /app/models
+
+info "Training rating prediction model..."
+docker compose exec api python db/train_model.py
+
+info "Computing similar-film neighbours..."
+docker compose exec api python db/compute_neighbours.py --full
+docker compose restart api
 
 # ── 8. Done ─────────────────────────────────
 echo ""